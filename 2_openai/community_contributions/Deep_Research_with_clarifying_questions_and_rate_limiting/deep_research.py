@@ -5,49 +5,14 @@ from dotenv import load_dotenv
 from clarifier_agent import clarifier_agent
 from research_manager import ResearchManagerAgent
 from agents import Runner
-from collections import defaultdict
-from datetime import datetime
-import time
+from rate_limiter import RateLimiter, SQLiteBackend
 import logging
 
 load_dotenv(override=True)
 
 # --- Rate Limiter ---
-class RateLimiter:
-    # Rate limit to 2 requests per minute, 10 requests per day
-    def __init__(self, max_requests=2, time_window=60, daily_quota=10):
-        self.max_requests = max_requests
-        self.time_window = time_window  # seconds
-        self.request_history = defaultdict(list)
-        self.daily_quota = daily_quota
-        self.daily_counts = defaultdict(lambda: {'date': self._today(), 'count': 0})
-
-    def _today(self):
-        return datetime.utcnow().strftime('%Y-%m-%d')
-
-    def is_rate_limited(self, user_id):
-        now = time.time()
-        self.request_history[user_id] = [
-            t for t in self.request_history[user_id] if now - t < self.time_window
-        ]
-        if len(self.request_history[user_id]) >= self.max_requests:
-            return True
-        self.request_history[user_id].append(now)
-        return False
-
-    def is_quota_exceeded(self, user_id):
-        today = self._today()
-        user_quota = self.daily_counts[user_id]
-        if user_quota['date'] != today:
-            user_quota['date'] = today
-            user_quota['count'] = 0
-        if user_quota['count'] >= self.daily_quota:
-            return True
-        user_quota['count'] += 1
-        self.daily_counts[user_id] = user_quota
-        return False
-
-rate_limiter = RateLimiter()
+# Rate limit to 2 requests per minute, 10 requests per day, shared by all worker processes
+rate_limiter = RateLimiter(max_requests=2, time_window=60, daily_quota=10, backend=SQLiteBackend("rate_limits.db"))
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
@@ -68,10 +33,11 @@ async def get_user_id(request: gr.Request = None):
 # Step 1 — Generate clarifying questions
 async def get_clarifying_questions(query, request: gr.Request = None):
     user_id = await get_user_id(request)
-    if rate_limiter.is_rate_limited(user_id):
-        return ["Rate limit exceeded. Please wait a minute."], "", "", ""
-    if rate_limiter.is_quota_exceeded(user_id):
-        return ["Daily quota exceeded. Try again tomorrow."], "", "", ""
+    decision = rate_limiter.check(user_id)
+    if decision.reason == "rate":
+        return f"Rate limit exceeded. Please wait {decision.retry_after:.0f} seconds.", "", ""
+    if decision.reason == "quota":
+        return "Daily quota exceeded. Try again tomorrow.", "", ""
 
     result = await Runner.run(clarifier_agent, input=query)
     return result.final_output.questions
@@ -79,10 +45,11 @@ async def get_clarifying_questions(query, request: gr.Request = None):
 # Step 2 — Run full research pipeline via coordinator agent (handoff style)
 async def run_with_handoff(query, q1, q2, q3, a1, a2, a3, send_email_flag, recipient_email, request: gr.Request = None):
     user_id = await get_user_id(request)
-    if rate_limiter.is_rate_limited(user_id):
-        yield "Rate limit exceeded. Please wait a minute."
+    decision = rate_limiter.check(user_id)
+    if decision.reason == "rate":
+        yield f"Rate limit exceeded. Please wait {decision.retry_after:.0f} seconds."
         return
-    if rate_limiter.is_quota_exceeded(user_id):
+    if decision.reason == "quota":
         yield "You have reached your daily quota. Try again tomorrow."
         return
 
@@ -97,6 +64,11 @@ async def run_with_handoff(query, q1, q2, q3, a1, a2, a3, send_email_flag, recip
     ):
         yield chunk
 
+async def show_usage(request: gr.Request = None):
+    user_id = await get_user_id(request)
+    usage = rate_limiter.usage(user_id)
+    return f"**Requests today:** {usage['used_today']} of {rate_limiter.daily_quota} ({usage['remaining_today']} left)"
+
 with gr.Blocks(theme=gr.themes.Default(primary_hue="sky")) as ui:
     gr.Markdown("# 🔍 Deep Research Agent (Clarify ➡️ Research ➡️ Email)")
 
@@ -121,6 +93,11 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="sky")) as ui:
     submit_answers_btn = gr.Button("✅ Submit & Run Full Research")
     report = gr.Markdown(label="📄 Research Report")
 
+    with gr.Accordion("📊 My usage", open=False):
+        usage_btn = gr.Button("Refresh")
+        usage_text = gr.Markdown()
+    usage_btn.click(fn=show_usage, outputs=usage_text)
+
     # Step 1
     get_questions_btn.click(
         fn=get_clarifying_questions,
@@ -0,0 +1,176 @@
+# rate_limiter.py
+"""
+Rate limiting and daily quotas with constant state per user.
+
+Requests are limited with GCRA (the generic cell rate algorithm): instead of a list of request
+timestamps, each user keeps a single "theoretical arrival time", so a check is O(1) no matter how
+busy the user is. The daily quota is a (date, count) pair next to it.
+
+State lives in a pluggable backend. MemoryBackend suits a single process; SQLiteBackend keeps
+limits across restarts and shares them between Gradio worker processes. The module only uses
+the standard library, so other apps (e.g. the 1_foundations chatbots) can copy it in and call
+is_rate_limited(user_id) as they do today.
+"""
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    reason: str = ""            # "rate" or "quota" when rejected
+    retry_after: float = 0.0    # seconds until the next request would be allowed
+    remaining_today: int = 0
+
+
+def _new_state() -> dict:
+    return {"tat": 0.0, "day": "", "day_count": 0, "allowed": 0, "rejected": 0, "last_seen": 0.0}
+
+
+class MemoryBackend:
+    """ Keeps state in a dict; limits apply per process and reset on restart """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def transact(self, key: str, update):
+        """ Apply update(state) -> (state, result) atomically for one key """
+        with self._lock:
+            state, result = update(dict(self._states.get(key) or _new_state()))
+            self._states[key] = state
+            return result
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            state = self._states.get(key)
+            return dict(state) if state else None
+
+    def all(self) -> dict[str, dict]:
+        with self._lock:
+            return {key: dict(state) for key, state in self._states.items()}
+
+
+class SQLiteBackend:
+    """ Keeps state in SQLite, one row per key, so every worker process shares the same limits """
+
+    def __init__(self, path: str = "rate_limits.db"):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    tat REAL,
+                    day TEXT,
+                    day_count INTEGER,
+                    allowed INTEGER,
+                    rejected INTEGER,
+                    last_seen REAL
+                )
+            ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def transact(self, key: str, update):
+        """ Apply update(state) -> (state, result) atomically for one key, across processes """
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front, so concurrent workers cannot interleave
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                'SELECT tat, day, day_count, allowed, rejected, last_seen FROM rate_limits WHERE key = ?', (key,)
+            ).fetchone()
+            state = dict(zip(_new_state(), row)) if row else _new_state()
+            state, result = update(state)
+            conn.execute('''
+                INSERT INTO rate_limits (key, tat, day, day_count, allowed, rejected, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET tat=excluded.tat, day=excluded.day, day_count=excluded.day_count,
+                    allowed=excluded.allowed, rejected=excluded.rejected, last_seen=excluded.last_seen
+            ''', (key, state["tat"], state["day"], state["day_count"], state["allowed"], state["rejected"], state["last_seen"]))
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT tat, day, day_count, allowed, rejected, last_seen FROM rate_limits WHERE key = ?', (key,)
+            ).fetchone()
+        return dict(zip(_new_state(), row)) if row else None
+
+    def all(self) -> dict[str, dict]:
+        with self._connect() as conn:
+            rows = conn.execute('SELECT key, tat, day, day_count, allowed, rejected, last_seen FROM rate_limits').fetchall()
+        return {row[0]: dict(zip(_new_state(), row[1:])) for row in rows}
+
+
+class RateLimiter:
+    # Defaults match the original limiter: 2 requests per minute, 10 requests per day
+    def __init__(self, max_requests=2, time_window=60, daily_quota=10, backend=None, clock=time.time):
+        self.max_requests = max_requests
+        self.time_window = time_window  # seconds
+        self.daily_quota = daily_quota
+        self.backend = backend or MemoryBackend()
+        self.clock = clock
+        # GCRA: one request "costs" this many seconds, and up to a full window may be banked
+        self.interval = time_window / max_requests
+
+    def _today(self, now: float) -> str:
+        return datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%d')
+
+    def check(self, user_id: str) -> Decision:
+        """ Decide whether a request may go ahead, recording it if so; rejected requests use no quota """
+        now = self.clock()
+        today = self._today(now)
+
+        def update(state):
+            if state["day"] != today:
+                state["day"], state["day_count"] = today, 0
+            state["last_seen"] = now
+            new_tat = max(state["tat"], now) + self.interval
+            if new_tat - now > self.time_window:
+                state["rejected"] += 1
+                retry_after = new_tat - now - self.time_window
+                return state, Decision(False, "rate", retry_after, self.daily_quota - state["day_count"])
+            if state["day_count"] >= self.daily_quota:
+                state["rejected"] += 1
+                tomorrow = (int(now // 86400) + 1) * 86400
+                return state, Decision(False, "quota", tomorrow - now, 0)
+            state["tat"] = new_tat
+            state["day_count"] += 1
+            state["allowed"] += 1
+            return state, Decision(True, remaining_today=self.daily_quota - state["day_count"])
+
+        return self.backend.transact(user_id, update)
+
+    def is_rate_limited(self, user_id: str) -> bool:
+        """ Drop-in for the older limiters: True if the request should be refused """
+        return not self.check(user_id).allowed
+
+    def usage(self, user_id: str) -> dict:
+        """ Per-user stats: requests today, quota left, totals allowed and rejected """
+        state = self.backend.get(user_id) or _new_state()
+        today = self._today(self.clock())
+        used = state["day_count"] if state["day"] == today else 0
+        return {
+            "user_id": user_id,
+            "used_today": used,
+            "remaining_today": self.daily_quota - used,
+            "allowed_total": state["allowed"],
+            "rejected_total": state["rejected"],
+            "last_seen": datetime.fromtimestamp(state["last_seen"], timezone.utc).isoformat() if state["last_seen"] else None,
+        }
+
+    def all_usage(self) -> list[dict]:
+        return [self.usage(user_id) for user_id in self.backend.all()]
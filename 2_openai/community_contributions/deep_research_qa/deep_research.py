@@ -1,10 +1,29 @@
 import gradio as gr
 from dotenv import load_dotenv
-from research_manager import ResearchManager, ResearchManagerAgent
+from orchestrator import ResearchOrchestrator, ResearchSession
 from agents import Runner, trace, gen_trace_id
 
 load_dotenv(override=True)
 
+orchestrator = ResearchOrchestrator()
+
+
+async def run_session_with_progress(session: ResearchSession, email_address: str, send_email: bool, header: str = ""):
+    """Run a session through the deterministic orchestrator, streaming progress and the final report"""
+    from research_manager import _send_report_email_to_address
+
+    progress_updates = [header] if header else []
+    async for update in orchestrator.run(session):
+        progress_updates.append(update)
+        yield "\n\n".join(progress_updates)
+
+    if send_email and email_address:
+        result = await _send_report_email_to_address(session.final_report, email_address)
+        progress_updates.append(f"📧 **{result['status']}**\n\n---\n\n")
+
+    progress_updates.append(f"🎉 **Research Complete!**\n\n**📊 Final Report:**\n\n{session.final_report}")
+    yield "\n\n".join(progress_updates)
+
 async def handle_query_submission(query: str, current_state: dict):
     """Handle initial query submission - generate clarifying questions with progress"""
     if not query.strip():
@@ -14,18 +33,17 @@ async def handle_query_submission(query: str, current_state: dict):
         # Show progress
         progress_update = "🔄 **Generating clarifying questions...**\n\nPlease wait while our AI analyzes your query and creates focused questions to improve the research quality."
         
-        research_manager = ResearchManager()
-        result = await research_manager.run_with_clarification(query)
+        session = await orchestrator.clarify(query)
         
         # Format questions for display
-        questions_text = "\n\n".join([f"**{i+1}.** {q}" for i, q in enumerate(result["questions"])])
+        questions_text = "\n\n".join([f"**{i+1}.** {q}" for i, q in enumerate(session.questions)])
         display_text = f"**✅ Clarifying Questions Generated:**\n\n{questions_text}\n\n**Please answer these questions to help focus the research:**"
         
         # Update state with query and questions
         new_state = {
             "query": query,
-            "questions": result["questions"],
-            "trace_id": result["trace_id"]
+            "questions": session.questions,
+            "session_id": session.session_id
         }
         
         return display_text, gr.update(visible=True), gr.update(visible=True), new_state
@@ -218,20 +236,10 @@ async def run_enhanced_research_with_progress(query: str, email_address: str = "
         yield "Please enter a research query."
         return
     
-    # Import the new progress function
-    from research_manager import run_research_with_progress
-    
     try:
-        # Collect all progress updates
-        progress_updates = []
-        async for update in run_research_with_progress(
-            query=query,
-            email_address=email_address if send_email else None,
-            send_email=send_email
-        ):
-            progress_updates.append(update)
-            # Return current progress to update the UI
-            yield "\n\n".join(progress_updates)
+        session = orchestrator.store.create(query)
+        async for update in run_session_with_progress(session, email_address, send_email):
+            yield update
         
     except Exception as e:
         import traceback
@@ -249,35 +257,19 @@ async def run_clarified_research_with_progress(answers: str, current_state: dict
         yield "Please provide answers to the clarifying questions."
         return
     
-    # Import the new progress function
-    from research_manager import run_research_with_progress
-    
     try:
         # Parse answers (one per line)
         answer_list = [line.strip() for line in answers.split('\n') if line.strip()]
         
-        # Format the query with clarifications
-        clarified_query = f"""Original query: {current_state['query']}
-
-Clarifications provided:
-{chr(10).join([f"{i+1}. {answer}" for i, answer in enumerate(answer_list)])}
-
-Please use these clarifications to focus and refine the research approach."""
-        
-        # Show initial setup
-        yield f"🚀 **Starting Focused Research with Clarifications**\n\n**Original Query:** {current_state['query']}\n\n**Your Clarifications:**\n{chr(10).join([f'• {answer}' for answer in answer_list if answer])}\n\n---\n\n"
+        # Reuse the session from the clarification step, so a re-run with the same answers keeps its plan and results
+        session = orchestrator.store.load(current_state.get("session_id", "")) or orchestrator.store.create(current_state['query'])
+        orchestrator.answer(session, answer_list)
         
-        # Collect all progress updates
-        progress_updates = [f"🚀 **Starting Focused Research with Clarifications**\n\n**Original Query:** {current_state['query']}\n\n**Your Clarifications:**\n{chr(10).join([f'• {answer}' for answer in answer_list if answer])}\n\n---\n\n"]
+        header = f"🚀 **Starting Focused Research with Clarifications**\n\n**Original Query:** {current_state['query']}\n\n**Your Clarifications:**\n{chr(10).join([f'• {answer}' for answer in answer_list if answer])}\n\n---\n\n"
+        yield header
         
-        async for update in run_research_with_progress(
-            query=clarified_query,
-            email_address=email_address if send_email else None,
-            send_email=send_email
-        ):
-            progress_updates.append(update)
-            # Return current progress to update the UI
-            yield "\n\n".join(progress_updates)
+        async for update in run_session_with_progress(session, email_address, send_email, header):
+            yield update
         
     except Exception as e:
         yield f"❌ Error during research: {str(e)}"
@@ -21,6 +21,9 @@ class EvaluationResult(BaseModel):
     refined_requirements: str
     """If refinement needed, what specific requirements should guide it"""
 
+    additional_searches: List[str]
+    """Search terms that would fill gaps in coverage or sourcing; empty if the existing research is enough"""
+
 EVALUATION_INSTRUCTIONS = """
 You are a Research Quality Evaluator. Your job is to assess the quality of research reports and determine if they need refinement.
 
@@ -41,6 +44,8 @@ Scoring scale:
 CRITICAL: A report without proper source citations should not score above 6, regardless of other qualities.
 
 If needs_refinement is True, provide specific, actionable requirements for improvement.
+Only list additional_searches when the report lacks facts or sources that new web research must supply;
+leave it empty when the problems can be fixed by rewriting the existing report.
 """
 
 evaluator_agent = Agent(
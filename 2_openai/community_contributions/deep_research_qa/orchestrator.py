@@ -0,0 +1,235 @@
+"""
+Deterministic research orchestration with a shared session store.
+
+The Research Manager Agent decides which tool to call next with an LLM turn, and each tool spawns
+its own nested Runner.run. Here the same stages run as plain async code, and everything they
+produce (plan, search results, drafts, evaluations) is kept in a ResearchSession. Clarifying
+questions and the research that follows share one session, and refinement only re-runs what the
+evaluator flagged: extra searches when it asks for them, then a rewrite of the existing draft.
+"""
+
+import asyncio
+import sqlite3
+import uuid
+from datetime import datetime
+from typing import AsyncGenerator, List, Optional
+from pydantic import BaseModel
+from agents import Runner, trace, gen_trace_id
+from search_agent import search_agent
+from planner_agent import planner_agent, WebSearchPlan
+from writer_agent import writer_agent, ReportData
+from clarifier_agent import clarifier_agent, ClarificationData
+from evaluator_agent import evaluator_agent, optimizer_agent, EvaluationResult, OptimizedReport
+
+DB = "research_sessions.db"
+
+PASSING_SCORE = 7
+MAX_REFINEMENTS = 2
+
+
+def _passed(evaluation: EvaluationResult) -> bool:
+    return not evaluation.needs_refinement or evaluation.overall_score >= PASSING_SCORE
+
+
+class SearchResult(BaseModel):
+    query: str
+    reason: str
+    summary: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ResearchSession(BaseModel):
+    session_id: str
+    query: str
+    questions: List[str] = []
+    answers: List[str] = []
+    plan: Optional[WebSearchPlan] = None
+    results: List[SearchResult] = []
+    draft: Optional[ReportData] = None
+    evaluations: List[EvaluationResult] = []
+    final_report: Optional[str] = None
+    llm_calls: int = 0
+
+    @property
+    def clarified_query(self) -> str:
+        """ The original query with any clarification answers folded in """
+        answers = [answer.strip() for answer in self.answers if answer.strip()]
+        if not answers:
+            return self.query
+        clarifications = "\n".join(f"{i}. {answer}" for i, answer in enumerate(answers, 1))
+        return f"""Original query: {self.query}
+
+Clarifications provided:
+{clarifications}
+
+Please use these clarifications to focus and refine the research approach."""
+
+
+with sqlite3.connect(DB) as conn:
+    cursor = conn.cursor()
+    cursor.execute('CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, updated DATETIME, data TEXT)')
+    conn.commit()
+
+
+class SessionStore:
+    """ Keeps research sessions in SQLite so every handler, and a restarted app, sees the same state """
+
+    def create(self, query: str) -> ResearchSession:
+        session = ResearchSession(session_id=uuid.uuid4().hex, query=query)
+        self.save(session)
+        return session
+
+    def save(self, session: ResearchSession) -> None:
+        with sqlite3.connect(DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO sessions (session_id, updated, data)
+                VALUES (?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET updated=excluded.updated, data=excluded.data
+            ''', (session.session_id, datetime.now().isoformat(), session.model_dump_json()))
+            conn.commit()
+
+    def load(self, session_id: str) -> Optional[ResearchSession]:
+        with sqlite3.connect(DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT data FROM sessions WHERE session_id = ?', (session_id,))
+            row = cursor.fetchone()
+            return ResearchSession.model_validate_json(row[0]) if row else None
+
+
+class ResearchOrchestrator:
+
+    def __init__(self, store: Optional[SessionStore] = None):
+        self.store = store or SessionStore()
+
+    async def _run(self, session: ResearchSession, agent, input_text: str):
+        result = await Runner.run(agent, input_text)
+        session.llm_calls += 1
+        return result
+
+    async def clarify(self, query: str) -> ResearchSession:
+        """ Start a session with clarifying questions for the query """
+        session = self.store.create(query)
+        result = await self._run(session, clarifier_agent, f"Query: {query}")
+        session.questions = result.final_output_as(ClarificationData).questions
+        self.store.save(session)
+        return session
+
+    def answer(self, session: ResearchSession, answers: List[str]) -> None:
+        """ Record clarification answers; a changed query invalidates everything built on the old one """
+        if answers != session.answers:
+            session.answers = answers
+            session.plan = None
+            session.results = []
+            session.draft = None
+            session.evaluations = []
+            session.final_report = None
+        self.store.save(session)
+
+    async def plan(self, session: ResearchSession) -> WebSearchPlan:
+        if session.plan is None:
+            result = await self._run(session, planner_agent, f"Query: {session.clarified_query}")
+            session.plan = result.final_output_as(WebSearchPlan)
+            session.results = [SearchResult(query=item.query, reason=item.reason) for item in session.plan.searches]
+            self.store.save(session)
+        return session.plan
+
+    async def _search(self, session: ResearchSession, item: SearchResult) -> None:
+        input_text = f"Search term: {item.query}\nReason for searching: {item.reason}"
+        try:
+            result = await self._run(session, search_agent, input_text)
+            item.summary = str(result.final_output)
+            item.error = None
+        except Exception as e:
+            item.error = str(e)
+
+    async def search(self, session: ResearchSession) -> List[SearchResult]:
+        """ Run every search that has no summary yet, concurrently """
+        pending = [item for item in session.results if item.summary is None]
+        await asyncio.gather(*(self._search(session, item) for item in pending))
+        self.store.save(session)
+        return pending
+
+    async def write(self, session: ResearchSession) -> ReportData:
+        summaries = "\n\n".join(item.summary for item in session.results if item.summary)
+        input_text = f"Original query: {session.clarified_query}\nSummarized search results: {summaries}"
+        result = await self._run(session, writer_agent, input_text)
+        session.draft = result.final_output_as(ReportData)
+        session.final_report = session.draft.markdown_report
+        self.store.save(session)
+        return session.draft
+
+    async def evaluate(self, session: ResearchSession) -> EvaluationResult:
+        input_text = f"Original Query: {session.clarified_query}\n\nReport to Evaluate:\n{session.final_report}"
+        result = await self._run(session, evaluator_agent, input_text)
+        evaluation = result.final_output_as(EvaluationResult)
+        session.evaluations.append(evaluation)
+        self.store.save(session)
+        return evaluation
+
+    async def refine(self, session: ResearchSession, evaluation: EvaluationResult, new_results: List[SearchResult]) -> str:
+        """ Rewrite the current report against the feedback, folding in any new search results """
+        feedback = (
+            f"Score: {evaluation.overall_score}/10\nWeaknesses: {evaluation.weaknesses}\n"
+            f"Suggestions: {evaluation.suggestions}\nRequirements: {evaluation.refined_requirements}"
+        )
+        extra = "\n\n".join(item.summary for item in new_results if item.summary)
+        input_text = f"""Original Query: {session.clarified_query}
+
+Original Report:
+{session.final_report}
+
+Evaluation Feedback:
+{feedback}
+"""
+        if extra:
+            input_text += f"\nAdditional Research:\n{extra}\n"
+        input_text += "\nPlease improve the report based on this feedback."
+        result = await self._run(session, optimizer_agent, input_text)
+        session.final_report = result.final_output_as(OptimizedReport).improved_markdown_report
+        self.store.save(session)
+        return session.final_report
+
+    async def run(self, session: ResearchSession, max_refinements: int = MAX_REFINEMENTS) -> AsyncGenerator[str, None]:
+        """ Run the stages that the session does not already have results for, yielding progress """
+        trace_id = gen_trace_id()
+        with trace("Deterministic Research", trace_id=trace_id):
+            yield f"🚀 **Starting Research**\n\n**Query:** {session.query}\n\n**Trace ID:** {trace_id}\n\n---\n\n"
+
+            if session.plan is None:
+                yield "📋 **Planning** research strategy..."
+            plan = await self.plan(session)
+            yield f"✅ **Plan Ready** - {len(plan.searches)} searches\n\n"
+
+            pending = [item for item in session.results if item.summary is None]
+            if pending:
+                yield f"🔍 **Searching** {len(pending)} terms concurrently..."
+                await self.search(session)
+                failed = [item for item in pending if item.error]
+                yield f"✅ **Searches Complete** ({len(pending) - len(failed)}/{len(pending)} succeeded)\n\n"
+
+            if session.draft is None:
+                yield "✍️ **Writing** initial report..."
+                await self.write(session)
+                yield "✅ **Draft Complete**\n\n"
+
+            for iteration in range(max_refinements + 1):
+                # A resumed session whose report already passed is not evaluated again; a passing
+                # evaluation always ends the loop, so it was made on the current report
+                if iteration == 0 and session.evaluations and _passed(session.evaluations[-1]):
+                    yield f"✅ **Already Approved** - Score: {session.evaluations[-1].overall_score}/10\n\n"
+                    break
+                evaluation = await self.evaluate(session)
+                yield f"🔍 **Evaluation {iteration + 1}** - Score: {evaluation.overall_score}/10\n\n"
+                if _passed(evaluation) or iteration == max_refinements:
+                    break
+                new_results = [SearchResult(query=term, reason=evaluation.refined_requirements)
+                               for term in evaluation.additional_searches]
+                if new_results:
+                    session.results.extend(new_results)
+                    yield f"🔍 **Filling gaps** with {len(new_results)} new searches..."
+                    await self.search(session)
+                yield "🔧 **Refining** the report..."
+                await self.refine(session, evaluation, new_results)
+
+            yield f"✅ **Research Complete** using {session.llm_calls} model calls\n\n---\n\n"
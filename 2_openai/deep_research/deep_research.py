@@ -1,8 +1,10 @@
 import gradio as gr
 from dotenv import load_dotenv
 from research_manager import ResearchManager
+from profiler import enable_profiling
 
 load_dotenv(override=True)
+enable_profiling()
 
 
 async def run(query: str):
@@ -0,0 +1,166 @@
+"""
+Report delivery without an LLM round trip.
+
+Markdown is rendered to HTML deterministically, and emails go out through one transport
+that is created once and reused. The SendGrid transport talks to the v3 API over a pooled
+httpx.AsyncClient with retries; the file and SMTP transports are local stand-ins for tests.
+
+Set EMAIL_TRANSPORT to "sendgrid" (default), "smtp" or "file" to choose the transport.
+"""
+
+import asyncio
+import html
+import os
+import re
+import smtplib
+from datetime import datetime
+from email.message import EmailMessage
+from pathlib import Path
+
+import httpx
+
+FROM_EMAIL = "ed@edwarddonner.com"  # put your verified sender here
+TO_EMAIL = "ed.donner@gmail.com"  # put your recipient here
+
+SENDGRID_URL = "https://api.sendgrid.com/v3/mail/send"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def render_markdown(markdown: str) -> str:
+    """ Convert a markdown report into a standalone HTML email body """
+    try:
+        from markdown_it import MarkdownIt
+        body = MarkdownIt("commonmark").enable("table").render(markdown)
+    except ImportError:
+        body = f"<pre>{html.escape(markdown)}</pre>"
+    return (
+        "<html><body style=\"font-family: Arial, sans-serif; line-height: 1.5; max-width: 800px;\">"
+        f"{body}</body></html>"
+    )
+
+
+def subject_for(markdown: str, default: str = "Research report") -> str:
+    """ Use the first heading of the report as the subject line """
+    match = re.search(r"^#+\s+(.+)$", markdown, re.MULTILINE)
+    return match.group(1).strip() if match else default
+
+
+class SendGridTransport:
+    """ Sends through the SendGrid v3 API, reusing one connection pool for every email """
+
+    def __init__(self, api_key: str | None = None, retries: int = 3, timeout: float = 10.0):
+        self.api_key = api_key or os.environ.get("SENDGRID_API_KEY")
+        self.retries = retries
+        self.timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def send(self, subject: str, html_body: str, to_email: str = TO_EMAIL, from_email: str = FROM_EMAIL) -> int:
+        payload = {
+            "personalizations": [{"to": [{"email": to_email}]}],
+            "from": {"email": from_email},
+            "subject": subject,
+            "content": [{"type": "text/html", "value": html_body}],
+        }
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.post(SENDGRID_URL, json=payload)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    response.raise_for_status()
+                    return response.status_code
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+
+class SMTPTransport:
+    """ Sends through an SMTP server, e.g. a local debugging server, without blocking the event loop """
+
+    def __init__(self, host: str | None = None, port: int | None = None):
+        self.host = host or os.environ.get("SMTP_HOST", "localhost")
+        self.port = port or int(os.environ.get("SMTP_PORT", "1025"))
+
+    def _send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port) as smtp:
+            smtp.send_message(message)
+
+    async def send(self, subject: str, html_body: str, to_email: str = TO_EMAIL, from_email: str = FROM_EMAIL) -> int:
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = from_email
+        message["To"] = to_email
+        message.set_content(html_body, subtype="html")
+        await asyncio.to_thread(self._send, message)
+        return 250
+
+    async def close(self) -> None:
+        pass
+
+
+class FileTransport:
+    """ Writes each email to an HTML file in a folder instead of sending it """
+
+    def __init__(self, folder: str | None = None):
+        self.folder = Path(folder or os.environ.get("EMAIL_OUTBOX", "outbox"))
+        self.sent: list[Path] = []
+
+    async def send(self, subject: str, html_body: str, to_email: str = TO_EMAIL, from_email: str = FROM_EMAIL) -> int:
+        self.folder.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = self.folder / f"{stamp}.html"
+        header = f"<!-- From: {from_email} | To: {to_email} | Subject: {html.escape(subject)} -->\n"
+        await asyncio.to_thread(path.write_text, header + html_body, "utf-8")
+        self.sent.append(path)
+        return 200
+
+    async def close(self) -> None:
+        pass
+
+
+TRANSPORTS = {"sendgrid": SendGridTransport, "smtp": SMTPTransport, "file": FileTransport}
+
+_transport = None
+
+
+def get_transport():
+    """ Return the shared transport, creating it on first use """
+    global _transport
+    if _transport is None:
+        _transport = TRANSPORTS[os.environ.get("EMAIL_TRANSPORT", "sendgrid")]()
+    return _transport
+
+
+def set_transport(transport) -> None:
+    """ Replace the shared transport, e.g. with a FileTransport in tests """
+    global _transport
+    _transport = transport
+
+
+async def send_report(markdown: str, subject: str | None = None, to_email: str = TO_EMAIL) -> int:
+    """ Render a markdown report and email it, returning the transport's status code """
+    return await get_transport().send(subject or subject_for(markdown), render_markdown(markdown), to_email)
+
+
+async def send_reports(markdowns: list[str], max_concurrency: int = 5) -> list[int | Exception]:
+    """ Send a batch of reports concurrently; failures are returned rather than raised """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def send_one(markdown: str) -> int:
+        async with semaphore:
+            return await send_report(markdown)
+
+    return await asyncio.gather(*(send_one(markdown) for markdown in markdowns), return_exceptions=True)
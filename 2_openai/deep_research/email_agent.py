@@ -1,20 +1,13 @@
-import os
 from typing import Dict
 
-import sendgrid
-from sendgrid.helpers.mail import Email, Mail, Content, To
 from agents import Agent, function_tool
+from delivery import get_transport
 
 @function_tool
-def send_email(subject: str, html_body: str) -> Dict[str, str]:
+async def send_email(subject: str, html_body: str) -> Dict[str, str]:
     """ Send an email with the given subject and HTML body """
-    sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'))
-    from_email = Email("ed@edwarddonner.com") # put your verified sender here
-    to_email = To("ed.donner@gmail.com") # put your recipient here
-    content = Content("text/html", html_body)
-    mail = Mail(from_email, to_email, subject, content).get()
-    response = sg.client.mail.send.post(request_body=mail)
-    print("Email response", response.status_code)
+    status_code = await get_transport().send(subject, html_body)
+    print("Email response", status_code)
     return {"status": "success"}
 
 INSTRUCTIONS = """You are able to send a nicely formatted HTML email based on a detailed report.
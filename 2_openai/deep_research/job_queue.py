@@ -0,0 +1,277 @@
+"""
+Batch job queue for deep research.
+
+Queries are stored in a SQLite database so the queue survives restarts. A running job
+refreshes its heartbeat while it works; a job whose heartbeat is older than the lease (its
+process died) is put back to pending the next time a queue starts. Jobs are claimed inside
+a write transaction, so several queue processes can share one database.
+All jobs share one concurrency budget, so searches from different jobs interleave.
+
+Usage:
+    python job_queue.py submit queries.txt
+    python job_queue.py run --concurrency 8
+    python job_queue.py status
+    python job_queue.py report
+"""
+
+import argparse
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from research_manager import ResearchManager
+from profiler import enable_profiling, estimate_cost
+
+load_dotenv(override=True)
+
+DB = "research_jobs.db"
+
+# The research agents all run on this model, so it prices the tokens of a whole job
+MODEL = "gpt-4o-mini"
+
+# A running job whose heartbeat is older than this is considered abandoned
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = 60
+
+
+with sqlite3.connect(DB) as conn:
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            query TEXT,
+            status TEXT,
+            created_at TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            input_tokens INTEGER DEFAULT 0,
+            output_tokens INTEGER DEFAULT 0,
+            cost REAL DEFAULT 0,
+            report TEXT,
+            error TEXT,
+            heartbeat_at TEXT
+        )
+    ''')
+    # Databases created before heartbeats were added
+    if "heartbeat_at" not in [row[1] for row in cursor.execute("PRAGMA table_info(jobs)")]:
+        cursor.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at TEXT")
+    conn.commit()
+
+
+def submit_jobs(queries: list[str]) -> list[int]:
+    """ Add queries to the queue as pending jobs, returning their ids """
+    now = datetime.now().isoformat()
+    ids = []
+    with sqlite3.connect(DB) as conn:
+        cursor = conn.cursor()
+        for query in queries:
+            cursor.execute(
+                'INSERT INTO jobs (query, status, created_at) VALUES (?, ?, ?)',
+                (query, "pending", now),
+            )
+            ids.append(cursor.lastrowid)
+        conn.commit()
+    return ids
+
+
+def submit_file(path: str) -> list[int]:
+    """ Add one job per non-blank line of a text file """
+    with open(path, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    return submit_jobs(queries)
+
+
+def recover_jobs(lease_seconds: float = LEASE_SECONDS) -> int:
+    """ Put running jobs whose heartbeat expired, because their process died, back in the queue """
+    expired = (datetime.now() - timedelta(seconds=lease_seconds)).isoformat()
+    with sqlite3.connect(DB) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs SET status = 'pending', started_at = NULL, heartbeat_at = NULL
+            WHERE status = 'running' AND julianday(COALESCE(heartbeat_at, started_at)) < julianday(?)
+        ''', (expired,))
+        conn.commit()
+        return cursor.rowcount
+
+
+def claim_job() -> tuple[int, str] | None:
+    """ Mark the oldest pending job as running and return its id and query """
+    now = datetime.now().isoformat()
+    conn = sqlite3.connect(DB, isolation_level=None, timeout=30)
+    try:
+        cursor = conn.cursor()
+        # Take the write lock before reading, so two queues cannot claim the same job
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT id, query FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1")
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (now, now, row[0]),
+            )
+        cursor.execute("COMMIT")
+        return row
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def heartbeat(job_id: int) -> None:
+    with sqlite3.connect(DB) as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                     (datetime.now().isoformat(), job_id))
+        conn.commit()
+
+
+async def keep_alive(job_id: int) -> None:
+    """ Refresh a job's heartbeat until cancelled """
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        heartbeat(job_id)
+
+
+def finish_job(job_id: int, manager: ResearchManager, report: str | None, error: str | None = None) -> None:
+    """ Record the outcome of a job along with its token usage and estimated cost """
+    cost = estimate_cost(MODEL, manager.input_tokens, manager.output_tokens)
+    with sqlite3.connect(DB) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs
+            SET status = ?, finished_at = ?, input_tokens = ?, output_tokens = ?, cost = ?, report = ?, error = ?
+            WHERE id = ?
+        ''', (
+            "failed" if error else "done",
+            datetime.now().isoformat(),
+            manager.input_tokens,
+            manager.output_tokens,
+            cost,
+            report,
+            error,
+            job_id,
+        ))
+        conn.commit()
+
+
+async def run_job(job_id: int, query: str, concurrency: asyncio.Semaphore) -> None:
+    """ Run one job through the ResearchManager, keeping only the final report """
+    manager = ResearchManager(concurrency=concurrency, email=False)
+    report = None
+    beat = asyncio.create_task(keep_alive(job_id))
+    try:
+        async for chunk in manager.run(query):
+            report = chunk
+        finish_job(job_id, manager, report)
+        print(f"Job {job_id} done")
+    except Exception as e:
+        finish_job(job_id, manager, None, error=str(e))
+        print(f"Job {job_id} failed: {e}")
+    finally:
+        beat.cancel()
+
+
+async def run_queue(concurrency: int = 8, max_jobs: int = 4) -> None:
+    """
+    Work through the pending jobs until the queue is empty.
+
+    Args:
+        concurrency (int): Agent runs allowed in flight across all jobs
+        max_jobs (int): Jobs allowed in flight at once
+    """
+    recovered = recover_jobs()
+    if recovered:
+        print(f"Recovered {recovered} interrupted jobs")
+    budget = asyncio.Semaphore(concurrency)
+
+    async def worker():
+        while job := claim_job():
+            await run_job(job[0], job[1], budget)
+
+    await asyncio.gather(*(worker() for _ in range(max_jobs)))
+
+
+def job_status() -> dict[str, int]:
+    """ Count the jobs in each status """
+    with sqlite3.connect(DB) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status')
+        return dict(cursor.fetchall())
+
+
+def read_job(job_id: int) -> dict | None:
+    with sqlite3.connect(DB) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def throughput_report() -> dict:
+    """
+    Summarise completed jobs: throughput over the span they ran in, and cost per job.
+
+    Returns:
+        dict: jobs done and failed, jobs per hour, average seconds, tokens and cost per job
+    """
+    with sqlite3.connect(DB) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*), MIN(started_at), MAX(finished_at),
+                   AVG((julianday(finished_at) - julianday(started_at)) * 86400),
+                   AVG(input_tokens), AVG(output_tokens), AVG(cost), SUM(cost)
+            FROM jobs WHERE status = 'done'
+        ''')
+        done, first, last, seconds, input_tokens, output_tokens, cost, total_cost = cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM jobs WHERE status = 'failed'")
+        failed = cursor.fetchone()[0]
+    hours = 0.0
+    if first and last:
+        hours = (datetime.fromisoformat(last) - datetime.fromisoformat(first)).total_seconds() / 3600
+    return {
+        "jobs_done": done,
+        "jobs_failed": failed,
+        "jobs_per_hour": round(done / hours, 2) if hours else 0.0,
+        "avg_seconds_per_job": round(seconds or 0.0, 1),
+        "avg_input_tokens": round(input_tokens or 0),
+        "avg_output_tokens": round(output_tokens or 0),
+        "avg_cost_per_job": round(cost or 0.0, 4),
+        "total_cost": round(total_cost or 0.0, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch job queue for deep research")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="Queue one job per line of a file")
+    submit.add_argument("path")
+    run = commands.add_parser("run", help="Run pending jobs until the queue is empty")
+    run.add_argument("--concurrency", type=int, default=8, help="Agent runs in flight across all jobs")
+    run.add_argument("--max-jobs", type=int, default=4, help="Jobs in flight at once")
+    commands.add_parser("status", help="Count jobs by status")
+    commands.add_parser("report", help="Show throughput and cost per job")
+    show = commands.add_parser("show", help="Print the report for a job")
+    show.add_argument("job_id", type=int)
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        ids = submit_file(args.path)
+        print(f"Queued {len(ids)} jobs")
+    elif args.command == "run":
+        enable_profiling()
+        asyncio.run(run_queue(args.concurrency, args.max_jobs))
+    elif args.command == "status":
+        for status, count in job_status().items():
+            print(f"{status}: {count}")
+    elif args.command == "report":
+        for key, value in throughput_report().items():
+            print(f"{key}: {value}")
+    elif args.command == "show":
+        job = read_job(args.job_id)
+        print(job["report"] or job["error"] if job else f"No job {args.job_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Cost and latency profiler for Runner pipelines.
+
+ProfileProcessor is a tracing processor that records every span of a run into a local SQLite
+store: wall time, time spent queueing for a concurrency slot, tokens in/out, tool calls and
+estimated cost, each attributed to the agent it ran under. The reports below read that store.
+
+Usage:
+    python profiler.py runs
+    python profiler.py show <trace_id>
+    python profiler.py folded <trace_id> > run.folded   # for flamegraph.pl or speedscope
+    python profiler.py compare <trace_id> <trace_id>
+"""
+
+import argparse
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from agents import TracingProcessor, Trace, Span, add_trace_processor
+
+DB = "profiles.db"
+
+# USD per million tokens (input, output), used to estimate cost per generation
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "o3-mini": (1.10, 4.40),
+    "o4-mini": (1.10, 4.40),
+}
+
+# Name of the custom span ResearchManager opens while waiting for a concurrency slot
+QUEUE_SPAN = "queue"
+
+
+with sqlite3.connect(DB) as conn:
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS runs (
+            trace_id TEXT PRIMARY KEY,
+            name TEXT,
+            started_at TEXT,
+            ended_at TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS spans (
+            span_id TEXT PRIMARY KEY,
+            trace_id TEXT,
+            parent_id TEXT,
+            type TEXT,
+            name TEXT,
+            agent TEXT,
+            model TEXT,
+            started_at TEXT,
+            ended_at TEXT,
+            duration_ms REAL,
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            tool_calls INTEGER,
+            cost REAL,
+            error TEXT
+        )
+    ''')
+    conn.commit()
+
+
+def estimate_cost(model: str | None, input_tokens: int, output_tokens: int) -> float:
+    """ Estimate the cost of a generation, matching the longest known model name prefix """
+    matches = [name for name in PRICES if model and model.startswith(name)]
+    if not matches:
+        return 0.0
+    input_price, output_price = PRICES[max(matches, key=len)]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def describe(span: Span) -> dict:
+    """ Pull the name, model, usage and tool calls out of a span's data """
+    data = span.span_data
+    row = {"type": data.type, "name": getattr(data, "name", None) or data.type, "agent": None, "model": None,
+           "input_tokens": 0, "output_tokens": 0, "tool_calls": 0}
+    if data.type == "agent":
+        row["agent"] = data.name
+    elif data.type == "custom":
+        row["agent"] = (data.data or {}).get("agent")
+    elif data.type == "function":
+        row["tool_calls"] = 1
+    elif data.type == "generation":
+        row["model"] = data.model
+        usage = data.usage or {}
+        row["input_tokens"] = usage.get("input_tokens", 0)
+        row["output_tokens"] = usage.get("output_tokens", 0)
+    elif data.type == "response" and data.response is not None:
+        response = data.response
+        row["name"] = "response"
+        row["model"] = response.model
+        if response.usage:
+            row["input_tokens"] = response.usage.input_tokens
+            row["output_tokens"] = response.usage.output_tokens
+        # Hosted tools such as web search show up as output items rather than function spans
+        row["tool_calls"] = sum(1 for item in response.output if item.type.endswith("_call") and item.type != "function_call")
+    return row
+
+
+class ProfileProcessor(TracingProcessor):
+
+    def on_trace_start(self, trace: Trace) -> None:
+        with sqlite3.connect(DB) as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO runs (trace_id, name, started_at) VALUES (?, ?, ?)',
+                (trace.trace_id, trace.name, datetime.now().isoformat()),
+            )
+
+    def on_trace_end(self, trace: Trace) -> None:
+        with sqlite3.connect(DB) as conn:
+            conn.execute(
+                'UPDATE runs SET ended_at = ? WHERE trace_id = ?',
+                (datetime.now().isoformat(), trace.trace_id),
+            )
+
+    def on_span_start(self, span: Span) -> None:
+        pass
+
+    def on_span_end(self, span: Span) -> None:
+        if not span.span_data or not span.started_at or not span.ended_at:
+            return
+        row = describe(span)
+        duration = datetime.fromisoformat(span.ended_at) - datetime.fromisoformat(span.started_at)
+        cost = estimate_cost(row["model"], row["input_tokens"], row["output_tokens"])
+        with sqlite3.connect(DB) as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO spans
+                (span_id, trace_id, parent_id, type, name, agent, model, started_at, ended_at, duration_ms,
+                 input_tokens, output_tokens, tool_calls, cost, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                span.span_id, span.trace_id, span.parent_id, row["type"], row["name"], row["agent"], row["model"],
+                span.started_at, span.ended_at, duration.total_seconds() * 1000,
+                row["input_tokens"], row["output_tokens"], row["tool_calls"], cost,
+                str(span.error) if span.error else None,
+            ))
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self) -> None:
+        pass
+
+
+def enable_profiling() -> ProfileProcessor:
+    """ Register the profiler alongside the default OpenAI trace exporter """
+    processor = ProfileProcessor()
+    add_trace_processor(processor)
+    return processor
+
+
+def read_runs(last_n: int = 20) -> list[tuple]:
+    with sqlite3.connect(DB) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT r.trace_id, r.name, r.started_at,
+                   (julianday(r.ended_at) - julianday(r.started_at)) * 86400000,
+                   COALESCE(SUM(s.cost), 0)
+            FROM runs r LEFT JOIN spans s ON s.trace_id = r.trace_id
+            GROUP BY r.trace_id ORDER BY r.started_at DESC LIMIT ?
+        ''', (last_n,))
+        return cursor.fetchall()
+
+
+def read_spans(trace_id: str) -> list[dict]:
+    with sqlite3.connect(DB) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM spans WHERE trace_id = ? ORDER BY started_at', (trace_id,))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def owning_agent(span: dict, by_id: dict[str, dict]) -> str:
+    """ Walk up the parents of a span to the agent it ran under, or is queueing for """
+    current = span
+    while current is not None:
+        if current["agent"]:
+            return current["agent"]
+        current = by_id.get(current["parent_id"])
+    return "(none)"
+
+
+def agent_summary(trace_id: str) -> dict[str, dict]:
+    """
+    Total up a run per agent.
+
+    Returns:
+        dict: agent name -> runs, wall_ms, queue_ms, input_tokens, output_tokens, tool_calls, cost
+    """
+    spans = read_spans(trace_id)
+    by_id = {span["span_id"]: span for span in spans}
+    summary = defaultdict(lambda: defaultdict(float))
+    for span in spans:
+        agent = owning_agent(span, by_id)
+        totals = summary[agent]
+        if span["type"] == "custom" and span["name"] == QUEUE_SPAN:
+            totals["queue_ms"] += span["duration_ms"]
+        elif span["type"] == "agent":
+            totals["runs"] += 1
+            totals["wall_ms"] += span["duration_ms"]
+        totals["input_tokens"] += span["input_tokens"]
+        totals["output_tokens"] += span["output_tokens"]
+        totals["tool_calls"] += span["tool_calls"]
+        totals["cost"] += span["cost"]
+    return {agent: dict(totals) for agent, totals in summary.items()}
+
+
+def folded_stacks(trace_id: str) -> list[str]:
+    """ Render a run in the folded stack format read by flamegraph.pl and speedscope (self time in ms) """
+    spans = read_spans(trace_id)
+    by_id = {span["span_id"]: span for span in spans}
+    child_ms = defaultdict(float)
+    for span in spans:
+        if span["parent_id"]:
+            child_ms[span["parent_id"]] += span["duration_ms"]
+    lines = []
+    for span in spans:
+        stack = []
+        current = span
+        while current is not None:
+            stack.append(current["name"].replace(";", ","))
+            current = by_id.get(current["parent_id"])
+        self_ms = max(span["duration_ms"] - child_ms[span["span_id"]], 0)
+        if self_ms:
+            lines.append(f"{';'.join(reversed(stack))} {round(self_ms)}")
+    return lines
+
+
+def breakdown(trace_id: str, width: int = 40) -> str:
+    """ Draw the span tree of a run as an indented timeline, flame-graph style """
+    spans = read_spans(trace_id)
+    if not spans:
+        return f"No spans recorded for {trace_id}"
+    start = min(datetime.fromisoformat(span["started_at"]) for span in spans)
+    end = max(datetime.fromisoformat(span["ended_at"]) for span in spans)
+    total_ms = max((end - start).total_seconds() * 1000, 1)
+    children = defaultdict(list)
+    ids = {span["span_id"] for span in spans}
+    for span in spans:
+        children[span["parent_id"] if span["parent_id"] in ids else None].append(span)
+
+    lines = [f"{trace_id}  {total_ms:,.0f} ms total"]
+
+    def draw(span: dict, depth: int) -> None:
+        offset = (datetime.fromisoformat(span["started_at"]) - start).total_seconds() * 1000
+        left = int(offset / total_ms * width)
+        length = max(int(span["duration_ms"] / total_ms * width), 1)
+        bar = " " * left + "#" * length
+        label = "  " * depth + span["name"]
+        detail = f"{span['duration_ms']:>9,.0f} ms"
+        if span["input_tokens"] or span["output_tokens"]:
+            detail += f"  {span['input_tokens']}/{span['output_tokens']} tok  ${span['cost']:.4f}"
+        lines.append(f"{label:<40} |{bar:<{width}}| {detail}")
+        for child in children[span["span_id"]]:
+            draw(child, depth + 1)
+
+    for root in children[None]:
+        draw(root, 0)
+    return "\n".join(lines)
+
+
+def compare(trace_a: str, trace_b: str) -> str:
+    """ Compare two runs agent by agent, showing B relative to A """
+    a, b = agent_summary(trace_a), agent_summary(trace_b)
+    lines = [f"{'agent':<24}{'wall ms A':>12}{'wall ms B':>12}{'queue ms B':>12}{'tokens A':>10}{'tokens B':>10}{'cost A':>10}{'cost B':>10}"]
+    for agent in sorted(set(a) | set(b)):
+        x, y = a.get(agent, {}), b.get(agent, {})
+        tokens_a = x.get("input_tokens", 0) + x.get("output_tokens", 0)
+        tokens_b = y.get("input_tokens", 0) + y.get("output_tokens", 0)
+        lines.append(
+            f"{agent:<24}{x.get('wall_ms', 0):>12,.0f}{y.get('wall_ms', 0):>12,.0f}{y.get('queue_ms', 0):>12,.0f}"
+            f"{tokens_a:>10,.0f}{tokens_b:>10,.0f}{x.get('cost', 0):>10.4f}{y.get('cost', 0):>10.4f}"
+        )
+    cost_a = sum(x.get("cost", 0) for x in a.values())
+    cost_b = sum(y.get("cost", 0) for y in b.values())
+    lines.append(f"Total cost: {cost_a:.4f} -> {cost_b:.4f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost and latency profiles of research runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("runs", help="List recent runs")
+    show = commands.add_parser("show", help="Per-agent totals and span timeline for a run")
+    show.add_argument("trace_id")
+    folded = commands.add_parser("folded", help="Folded stacks for flame graph tools")
+    folded.add_argument("trace_id")
+    diff = commands.add_parser("compare", help="Compare two runs agent by agent")
+    diff.add_argument("trace_a")
+    diff.add_argument("trace_b")
+    args = parser.parse_args()
+
+    if args.command == "runs":
+        for trace_id, name, started_at, wall_ms, cost in read_runs():
+            print(f"{trace_id}  {started_at}  {name:<20} {wall_ms or 0:>10,.0f} ms  ${cost:.4f}")
+    elif args.command == "show":
+        for agent, totals in agent_summary(args.trace_id).items():
+            print(f"{agent}: " + ", ".join(f"{key}={value:,.4g}" for key, value in totals.items()))
+        print()
+        print(breakdown(args.trace_id))
+    elif args.command == "folded":
+        print("\n".join(folded_stacks(args.trace_id)))
+    elif args.command == "compare":
+        print(compare(args.trace_a, args.trace_b))
+
+
+if __name__ == "__main__":
+    main()
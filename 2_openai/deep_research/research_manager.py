@@ -1,12 +1,36 @@
-from agents import Runner, trace, gen_trace_id
+from agents import Runner, trace, gen_trace_id, custom_span
 from search_agent import search_agent
 from planner_agent import planner_agent, WebSearchItem, WebSearchPlan
 from writer_agent import writer_agent, ReportData
-from email_agent import email_agent
+from delivery import send_report
 import asyncio
 
 class ResearchManager:
 
+    def __init__(self, concurrency: asyncio.Semaphore | None = None, email: bool = True):
+        """ concurrency is an optional semaphore shared with other managers, capping agent runs in flight """
+        self.concurrency = concurrency
+        self.email = email
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    async def run_agent(self, agent, input: str):
+        """ Run an agent under the shared concurrency budget, keeping a tally of tokens used """
+        if self.concurrency is None:
+            result = await Runner.run(agent, input)
+        else:
+            # The span measures time spent waiting for a slot, so profiles can show queueing
+            with custom_span("queue", {"agent": agent.name}):
+                await self.concurrency.acquire()
+            try:
+                result = await Runner.run(agent, input)
+            finally:
+                self.concurrency.release()
+        usage = result.context_wrapper.usage
+        self.input_tokens += usage.input_tokens
+        self.output_tokens += usage.output_tokens
+        return result
+
     async def run(self, query: str):
         """ Run the deep research process, yielding the status updates and the final report"""
         trace_id = gen_trace_id()
@@ -19,19 +43,19 @@ class ResearchManager:
             search_results = await self.perform_searches(search_plan)
             yield "Searches complete, writing report..."
             report = await self.write_report(query, search_results)
-            yield "Report written, sending email..."
-            await self.send_email(report)
-            yield "Email sent, research complete"
+            if self.email:
+                yield "Report written, sending email..."
+                await self.send_email(report)
+                yield "Email sent, research complete"
+            else:
+                yield "Report written, research complete"
             yield report.markdown_report
         
 
     async def plan_searches(self, query: str) -> WebSearchPlan:
         """ Plan the searches to perform for the query """
         print("Planning searches...")
-        result = await Runner.run(
-            planner_agent,
-            f"Query: {query}",
-        )
+        result = await self.run_agent(planner_agent, f"Query: {query}")
         print(f"Will perform {len(result.final_output.searches)} searches")
         return result.final_output_as(WebSearchPlan)
 
@@ -54,10 +78,7 @@ class ResearchManager:
         """ Perform a search for the query """
         input = f"Search term: {item.query}\nReason for searching: {item.reason}"
         try:
-            result = await Runner.run(
-                search_agent,
-                input,
-            )
+            result = await self.run_agent(search_agent, input)
             return str(result.final_output)
         except Exception:
             return None
@@ -66,19 +87,14 @@ class ResearchManager:
         """ Write the report for the query """
         print("Thinking about report...")
         input = f"Original query: {query}\nSummarized search results: {search_results}"
-        result = await Runner.run(
-            writer_agent,
-            input,
-        )
+        result = await self.run_agent(writer_agent, input)
 
         print("Finished writing report")
         return result.final_output_as(ReportData)
     
     async def send_email(self, report: ReportData) -> None:
-        print("Writing email...")
-        result = await Runner.run(
-            email_agent,
-            report.markdown_report,
-        )
+        """ Render the report to HTML and email it directly, without an agent turn """
+        print("Sending email...")
+        await send_report(report.markdown_report)
         print("Email sent")
         return report
\ No newline at end of file
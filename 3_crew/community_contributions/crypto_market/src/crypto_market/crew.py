@@ -6,6 +6,7 @@ from typing import List
 from crewai.memory import LongTermMemory, ShortTermMemory, EntityMemory
 from crewai.memory.storage.rag_storage import RAGStorage
 from crewai.memory.storage.ltm_sqlite_storage import LTMSQLiteStorage
+from .tools.screen_tool import CryptoScreenTool
 
 
 class TrendingCrypto(BaseModel):
@@ -52,6 +53,18 @@ class CryptoInvestmentDecision(BaseModel):
     investment_thesis: str = Field(description="Detailed rationale for selection")
     rejected_cryptos: List[str] = Field(description="Names of cryptos not selected and reasons why")
 
+class CryptoScreenPick(BaseModel):
+    """An asset that passed the batch screen"""
+    symbol: str = Field(description="Crypto ticker symbol")
+    rationale: str = Field(description="Why the metrics make it worth deeper research")
+    key_risks: str = Field(description="The main risks visible in the metrics")
+
+class CryptoScreenReport(BaseModel):
+    """Result of screening a batch of assets from the metrics table"""
+    shortlist: List[CryptoScreenPick] = Field(description="Assets worth deeper research, best first")
+    watchlist: List[str] = Field(description="Symbols to keep watching but not research yet")
+    summary: str = Field(description="Why the remaining assets were rejected, grouped by reason")
+
 
 
 @CrewBase
@@ -72,14 +85,14 @@ class CryptoMarket():
     def defi_researcher(self) -> Agent:
         return Agent(
             config=self.agents_config['defi_researcher'],
-            tools=[SerperDevTool()],
+            tools=[SerperDevTool(), CryptoScreenTool()],
         )
         
     @agent
     def risk_analyst(self) -> Agent:
         return Agent(
             config=self.agents_config['risk_analyst'],
-            tools=[SerperDevTool()],
+            tools=[SerperDevTool(), CryptoScreenTool()],
         )
         
     @agent
@@ -117,6 +130,22 @@ class CryptoMarket():
             output_pydantic=CryptoInvestmentDecision,
         )
 
+    # Not a @task: it belongs to the batch crew only, not the hierarchical pipeline
+    def screen_crypto_batch(self) -> Task:
+        return Task(
+            config=self.tasks_config['screen_crypto_batch'],
+            output_pydantic=CryptoScreenReport,
+        )
+
+    def batch_crew(self) -> Crew:
+        """Screens a list of assets in one LLM pass over a precomputed metrics table"""
+        return Crew(
+            agents=[self.portfolio_manager()],
+            tasks=[self.screen_crypto_batch()],
+            process=Process.sequential,
+            verbose=True,
+        )
+
     @crew
     def crew(self) -> Crew:
         """Creates the CryptoMarket crew"""
@@ -1,8 +1,10 @@
 import sys
 import warnings
 import os
+import json
 
 from crypto_market.crew import CryptoMarket
+from crypto_market.risk import screen_assets
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -26,5 +28,43 @@ def run():
     print(result.raw)
 
 
+def load_symbols(args):
+    """
+    Symbols from the command line, a file named by CRYPTO_SYMBOLS_FILE (one per line or comma-separated),
+    or CRYPTO_SYMBOLS.
+    """
+    if args:
+        text = ",".join(args)
+    elif os.getenv("CRYPTO_SYMBOLS_FILE"):
+        with open(os.environ["CRYPTO_SYMBOLS_FILE"], "r", encoding="utf-8") as f:
+            text = f.read().replace("\n", ",")
+    else:
+        text = os.getenv("CRYPTO_SYMBOLS", "BTC,ETH,AAVE,UNI,LDO,CRV,PENDLE")
+    return [s for s in text.split(",") if s.strip()]
+
+
+def run_batch():
+    """
+    Screen a list of assets in one pass: data is fetched concurrently, metrics are computed
+    up front, and a single agent reasons over the resulting table.
+    """
+    os.makedirs('output', exist_ok=True)
+    symbols = load_symbols(sys.argv[1:])
+    screen = screen_assets(symbols)
+    with open('output/batch_metrics.json', 'w', encoding='utf-8') as f:
+        json.dump(screen['rows'], f, indent=2)
+
+    inputs = {
+        'market_focus': os.getenv("CRYPTO_MARKET_FOCUS", 'DeFi protocols'),
+        'asset_count': len(screen['rows']),
+        'asset_table': screen['table'],
+        'shortlist_size': int(os.getenv("CRYPTO_SHORTLIST_SIZE", "5")),
+    }
+    result = CryptoMarket().batch_crew().kickoff(inputs=inputs)
+
+    print("\n\n=== BATCH SCREEN ===\n\n")
+    print(result.raw)
+
+
 if __name__ == "__main__":
     run()
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+# Days of daily closes fetched per asset
+HISTORY_DAYS = int(os.getenv("CRYPTO_HISTORY_DAYS", "90"))
+# Concurrent history requests; CoinGecko's free tier allows roughly 30 calls a minute
+DATA_WORKERS = int(os.getenv("CRYPTO_DATA_WORKERS", "4"))
+# CoinGecko calls are spaced to stay under this rate, whatever the number of workers
+COINGECKO_CALLS_PER_MINUTE = float(os.getenv("COINGECKO_CALLS_PER_MINUTE", "30"))
+# Attempts per request when the API answers 429 Too Many Requests
+MAX_ATTEMPTS = int(os.getenv("CRYPTO_MAX_ATTEMPTS", "4"))
+REQUEST_TIMEOUT = float(os.getenv("CRYPTO_REQUEST_TIMEOUT", "20"))
+
+COINGECKO_URL = os.getenv("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
+DEFILLAMA_URL = "https://api.llama.fi"
+
+
+def normalize_symbols(symbols: List[str]) -> List[str]:
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+
+def empty_asset(symbol: str) -> Dict[str, Any]:
+    """ The record every provider returns per symbol; missing values stay None """
+    return {"symbol": symbol, "name": None, "price": None, "market_cap": None, "volume_24h": None, "tvl": None, "prices": []}
+
+
+class MarketDataProvider:
+    """ Fetches snapshot and price history for many symbols; subclasses implement fetch() or override fetch_many() """
+
+    def __init__(self, workers: int = DATA_WORKERS):
+        self.workers = max(1, workers)
+
+    def fetch(self, symbol: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def fetch_many(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        symbols = normalize_symbols(symbols)
+
+        def safe_fetch(symbol: str) -> Dict[str, Any]:
+            try:
+                return self.fetch(symbol)
+            except Exception as e:
+                return {**empty_asset(symbol), "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(symbols, pool.map(safe_fetch, symbols)))
+
+
+class FixtureProvider(MarketDataProvider):
+    """ Serves assets from <folder>/<SYMBOL>.json files, for offline runs and tests """
+
+    def __init__(self, folder: str, **kwargs):
+        super().__init__(**kwargs)
+        self.folder = folder
+
+    def fetch(self, symbol: str) -> Dict[str, Any]:
+        path = os.path.join(self.folder, f"{symbol}.json")
+        if not os.path.exists(path):
+            return {**empty_asset(symbol), "error": "no fixture"}
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {**empty_asset(symbol), **data, "symbol": symbol}
+
+
+class RateLimiter:
+    """ Spaces calls at least 60 / calls_per_minute seconds apart across all threads """
+
+    def __init__(self, calls_per_minute: float):
+        self.interval = 60.0 / calls_per_minute if calls_per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float) -> None:
+        """ Hold back every caller, e.g. for a server's Retry-After """
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+def _retry_after(response: requests.Response, attempt: int) -> float:
+    """ Seconds to wait after a 429: the Retry-After header when it is a number, else exponential backoff """
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return min(60.0, 2.0 ** (attempt + 1))
+
+
+class LiveProvider(MarketDataProvider):
+    """
+    CoinGecko for prices, market cap and volume, DefiLlama for TVL. The snapshot and TVL come from
+    one request each for the whole list; only the price histories are per asset, fetched concurrently.
+    CoinGecko calls go through a rate limiter and are retried after a 429 as Retry-After asks.
+    """
+
+    def __init__(self, history_days: int = HISTORY_DAYS, calls_per_minute: float = COINGECKO_CALLS_PER_MINUTE, **kwargs):
+        super().__init__(**kwargs)
+        self.history_days = history_days
+        self.limiter = RateLimiter(calls_per_minute)
+        self.session = requests.Session()
+        api_key = os.getenv("COINGECKO_API_KEY")
+        if api_key:
+            self.session.headers["x-cg-demo-api-key"] = api_key
+
+    def _get(self, url: str, **params) -> Any:
+        limited = url.startswith(COINGECKO_URL)
+        for attempt in range(MAX_ATTEMPTS):
+            if limited:
+                self.limiter.wait()
+            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            if response.status_code != 429 or attempt == MAX_ATTEMPTS - 1:
+                break
+            delay = _retry_after(response, attempt)
+            if limited:
+                self.limiter.pause(delay)
+            else:
+                time.sleep(delay)
+        response.raise_for_status()
+        return response.json()
+
+    def _markets(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        markets: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(symbols), 100):
+            rows = self._get(
+                f"{COINGECKO_URL}/coins/markets",
+                vs_currency="usd",
+                symbols=",".join(s.lower() for s in symbols[start:start + 100]),
+                per_page=250,
+            )
+            # Several coins can share a symbol; keep the largest
+            for row in sorted(rows, key=lambda r: r.get("market_cap") or 0):
+                markets[row["symbol"].upper()] = row
+        return markets
+
+    def _tvl(self) -> Dict[str, float]:
+        tvl: Dict[str, float] = {}
+        for protocol in self._get(f"{DEFILLAMA_URL}/protocols"):
+            symbol = (protocol.get("symbol") or "").upper()
+            if symbol and symbol != "-" and protocol.get("tvl"):
+                tvl[symbol] = max(tvl.get(symbol, 0.0), float(protocol["tvl"]))
+        return tvl
+
+    def _history(self, coin_id: str) -> List[float]:
+        data = self._get(
+            f"{COINGECKO_URL}/coins/{coin_id}/market_chart", vs_currency="usd", days=self.history_days, interval="daily"
+        )
+        return [price for _, price in data.get("prices", [])]
+
+    def fetch(self, symbol: str) -> Dict[str, Any]:
+        return self.fetch_many([symbol])[symbol]
+
+    def fetch_many(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        symbols = normalize_symbols(symbols)
+        assets = {s: empty_asset(s) for s in symbols}
+        with ThreadPoolExecutor(max_workers=self.workers + 1) as pool:
+            tvl_job = pool.submit(self._tvl)
+            try:
+                markets = self._markets(symbols)
+            except Exception as e:
+                for asset in assets.values():
+                    asset["error"] = f"market data: {e}"
+                markets = {}
+            histories = {s: pool.submit(self._history, markets[s]["id"]) for s in symbols if s in markets}
+
+            for symbol, asset in assets.items():
+                row = markets.get(symbol)
+                if row is None:
+                    asset.setdefault("error", "not found on CoinGecko")
+                    continue
+                asset.update(
+                    name=row.get("name"), price=row.get("current_price"),
+                    market_cap=row.get("market_cap"), volume_24h=row.get("total_volume"),
+                )
+                try:
+                    asset["prices"] = histories[symbol].result()
+                except Exception as e:
+                    asset["error"] = f"history: {e}"
+            try:
+                tvl = tvl_job.result()
+            except Exception:
+                tvl = {}
+        for symbol, asset in assets.items():
+            asset["tvl"] = tvl.get(symbol)
+        return assets
+
+
+def get_provider() -> MarketDataProvider:
+    """ CRYPTO_FIXTURES=<dir> serves assets from fixture files instead of the live APIs """
+    fixtures = os.getenv("CRYPTO_FIXTURES")
+    return FixtureProvider(fixtures) if fixtures else LiveProvider()
@@ -0,0 +1,125 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .market_data import MarketDataProvider, get_provider
+
+RETURN_WINDOWS = [7, 30, 90]
+RISK_LEVELS = np.array(["Low", "Medium", "High"])
+# Upper bounds of Low and Medium for each component
+VOLATILITY_BANDS = [0.6, 1.0]        # annualized volatility of daily log returns
+DRAWDOWN_BANDS = [0.3, 0.6]          # depth of the worst peak-to-trough fall in the window
+ILLIQUIDITY_BANDS = [1e-6, 1e-4]     # 1 / 24h USD volume: Low above $1M a day, High under $10k
+
+
+def price_matrix(assets: Dict[str, Dict[str, Any]]) -> np.ndarray:
+    """ One row per asset, closes aligned on the most recent day; shorter histories are NaN-padded at the start """
+    length = max((len(a.get("prices") or []) for a in assets.values()), default=0)
+    matrix = np.full((len(assets), max(length, 1)), np.nan)
+    for row, asset in enumerate(assets.values()):
+        prices = [p if p is not None else np.nan for p in asset.get("prices") or []]
+        if prices:
+            matrix[row, -len(prices):] = prices
+    return matrix
+
+
+def _column(assets: Dict[str, Dict[str, Any]], key: str) -> np.ndarray:
+    return np.array([a.get(key) if a.get(key) is not None else np.nan for a in assets.values()], dtype=float)
+
+
+def risk_metrics(assets: Dict[str, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """ Volatility, drawdown, returns and liquidity for all assets at once, one array per metric """
+    prices = price_matrix(assets)
+    market_cap = _column(assets, "market_cap")
+    volume = _column(assets, "volume_24h")
+    tvl = _column(assets, "tvl")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(prices), axis=1)
+        counts = np.sum(~np.isnan(returns), axis=1)
+        mean = np.nansum(returns, axis=1) / counts
+        variance = np.nansum((returns - mean[:, None]) ** 2, axis=1) / (counts - 1)
+        volatility = np.where(counts > 1, np.sqrt(variance) * np.sqrt(365), np.nan)
+        # fmax skips the NaN padding, so each row's running peak starts at its first close
+        peaks = np.fmax.accumulate(prices, axis=1)
+        drawdown = -np.nanmin(np.where(np.isnan(prices), 0.0, prices / peaks - 1), axis=1)
+        last = prices[:, -1]
+        metrics = {
+            "volatility": volatility,
+            "max_drawdown": np.where(counts > 0, drawdown, np.nan),
+            "market_cap": market_cap,
+            "volume_24h": volume,
+            "turnover": volume / market_cap,
+            "tvl": tvl,
+            "mcap_to_tvl": market_cap / tvl,
+        }
+        for window in RETURN_WINDOWS:
+            past = prices[:, -window - 1] if prices.shape[1] > window else np.full(len(last), np.nan)
+            metrics[f"return_{window}d"] = last / past - 1
+
+        # Each component scores 0 (Low), 1 (Medium) or 2 (High); missing data counts as High
+        components = [
+            np.where(np.isnan(volatility), 2, np.digitize(volatility, VOLATILITY_BANDS)),
+            np.where(np.isnan(metrics["max_drawdown"]), 2, np.digitize(metrics["max_drawdown"], DRAWDOWN_BANDS)),
+            np.where(np.isnan(volume) | (volume <= 0), 2, np.digitize(1 / volume, ILLIQUIDITY_BANDS)),
+        ]
+    score = np.mean(components, axis=0)
+    metrics["risk_score"] = score
+    # Low allows at most one Medium component; one High component makes it at least Medium
+    metrics["risk_level"] = RISK_LEVELS[np.digitize(score, [0.5, 1.2])]
+    return metrics
+
+
+def risk_rows(assets: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ Per-asset metric dicts, largest market cap first """
+    if not assets:
+        return []
+    metrics = risk_metrics(assets)
+    rows = []
+    for i, (symbol, asset) in enumerate(assets.items()):
+        row = {"symbol": symbol, "name": asset.get("name"), "price": asset.get("price")}
+        for key, values in metrics.items():
+            value = values[i]
+            if isinstance(value, (np.floating, float)):
+                row[key] = None if np.isnan(value) else round(float(value), 6)
+            else:
+                row[key] = str(value)
+        if asset.get("error"):
+            row["error"] = asset["error"]
+        rows.append(row)
+    return sorted(rows, key=lambda r: -(r["market_cap"] or 0))
+
+
+def _money(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    for limit, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= limit:
+            return f"{value / limit:.1f}{suffix}"
+    return f"{value:.2f}"
+
+
+def _pct(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 100:.0f}%"
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    """ Compact markdown table, one line per asset, for an agent prompt """
+    header = "| symbol | mcap | vol24h | turnover | TVL | mcap/TVL | 7d | 30d | 90d | ann.vol | maxDD | risk |"
+    lines = [header, "|" + "---|" * (header.count("|") - 1)]
+    for r in rows:
+        ratio = "-" if r["mcap_to_tvl"] is None else f"{r['mcap_to_tvl']:.1f}"
+        risk = r["risk_level"] if not r.get("error") else f"{r['risk_level']} ({r['error']})"
+        lines.append(
+            f"| {r['symbol']} | {_money(r['market_cap'])} | {_money(r['volume_24h'])} | {_pct(r['turnover'])} | "
+            f"{_money(r['tvl'])} | {ratio} | {_pct(r['return_7d'])} | {_pct(r['return_30d'])} | {_pct(r['return_90d'])} | "
+            f"{_pct(r['volatility'])} | {_pct(r['max_drawdown'])} | {risk} |"
+        )
+    return "\n".join(lines)
+
+
+def screen_assets(symbols: List[str], provider: Optional[MarketDataProvider] = None) -> Dict[str, Any]:
+    """ Fetch every symbol concurrently, compute risk metrics in one pass and render the table """
+    assets = (provider or get_provider()).fetch_many(symbols)
+    rows = risk_rows(assets)
+    return {"rows": rows, "table": format_table(rows)}
@@ -0,0 +1,21 @@
+from crewai.tools import BaseTool
+from typing import Type
+from pydantic import BaseModel, Field
+
+from ..risk import screen_assets
+
+
+class CryptoScreenInput(BaseModel):
+    """Symbols to screen."""
+    symbols: str = Field(..., description="Comma-separated ticker symbols, e.g. 'AAVE, UNI, LDO'.")
+
+class CryptoScreenTool(BaseTool):
+    name: str = "Crypto market and risk metrics"
+    description: str = (
+        "Returns one table row per symbol with market cap, 24h volume, turnover, TVL, mcap/TVL, 7/30/90-day returns, "
+        "annualized volatility, max drawdown and a Low/Medium/High risk level. Pass all symbols in one call."
+    )
+    args_schema: Type[BaseModel] = CryptoScreenInput
+
+    def _run(self, symbols: str) -> str:
+        return screen_assets(symbols.replace(";", ",").split(","))["table"]
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # src/financial_researcher/main.py
 import os
+from financial_researcher.cache import kickoff_cached
 from financial_researcher.crew import ResearchCrew
 
 # Create output directory if it doesn't exist
@@ -14,8 +15,8 @@ def run():
         'company': 'Apple'
     }
 
-    # Create and run the crew
-    result = ResearchCrew().crew().kickoff(inputs=inputs)
+    # Create and run the crew; a same-day report on the same company is reused from the shared cache
+    result = kickoff_cached(ResearchCrew().crew(), inputs, crew_name="financial_researcher")
 
     # Print the result
     print("\n\n=== FINAL REPORT ===\n\n")
@@ -0,0 +1,55 @@
+import json
+from typing import Any, Type
+
+from crewai.tools import BaseTool
+from crewai_tools import SerperDevTool
+from pydantic import BaseModel, Field
+
+from ..cache import get_cache, normalize_subject
+
+
+class CachedSerperDevTool(SerperDevTool):
+    """SerperDevTool that answers repeated queries from the shared result cache for the rest of the day."""
+
+    def _run(self, **kwargs: Any) -> Any:
+        query = kwargs.get("search_query") or kwargs.get("query") or ""
+        # Not a subject key, so only case and whitespace are normalized: "apple stock" stays distinct from "apple"
+        key = {
+            "search": query,
+            **{k: str(getattr(self, k, "")) for k in ("n_results", "search_type", "country", "location", "locale")},
+        }
+        cache = get_cache()
+        hit = cache.get("serper_search", key)
+        if hit:
+            return json.loads(hit["output"])
+        result = super()._run(**kwargs)
+        cache.put("serper_search", key, json.dumps(result), crew="serper")
+        return result
+
+
+class CachedResearchInput(BaseModel):
+    """A company to look up in the research cache"""
+    company: str = Field(..., description="Company name, e.g. 'Apple' or 'Nvidia Corp'.")
+
+
+class CachedResearchTool(BaseTool):
+    name: str = "Look up cached company research"
+    description: str = (
+        "Returns research and reports on a company that any crew already produced today. "
+        "Use it before searching the web; only search for what the cached research does not cover."
+    )
+    args_schema: Type[BaseModel] = CachedResearchInput
+    max_chars: int = 6000
+
+    def _run(self, company: str) -> str:
+        entries = [e for e in get_cache().find(normalize_subject(company)) if e["task"] != "serper_search"]
+        if not entries:
+            return f"No cached research on {company} today."
+        parts, used = [], 0
+        for entry in entries:
+            text = entry["output"][: max(0, self.max_chars - used)]
+            if not text:
+                break
+            parts.append(f"--- {entry['crew']}/{entry['task']} ({entry['bucket']}) ---\n{text}")
+            used += len(text)
+        return "\n\n".join(parts)
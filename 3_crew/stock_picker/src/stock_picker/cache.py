@@ -0,0 +1,311 @@
+"""
+Task result cache shared between crews.
+
+Task outputs are keyed by task name, normalized inputs and a date bucket, and kept in one
+SQLite file (CREW_CACHE_PATH, default ~/.cache/crewai_results.db) that the financial_researcher
+and stock_picker crews both use, so work done by one crew today is reused by the other.
+The same module lives in both projects; keep the two in sync.
+
+    crew_cache list [--task T] [--subject S] [--current]
+    crew_cache show KEY
+    crew_cache evict [--key K] [--task T] [--subject S] [--older-than DAYS] [--all]
+    crew_cache stats
+"""
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+DEFAULT_PATH = os.getenv("CREW_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "crewai_results.db"))
+# How long a result stays reusable: "day", "week" or "month"
+DEFAULT_BUCKET = os.getenv("CREW_CACHE_BUCKET", "day")
+# Inputs that change on every run without changing the work to do
+VOLATILE_INPUTS = {"current_date"}
+# Inputs that name what a task is about, in order of preference
+SUBJECT_KEYS = ("company", "sector")
+
+_SUFFIXES = re.compile(r"\b(inc|incorporated|corp|corporation|co|company|ltd|limited|plc|llc|holdings|group)\b")
+
+
+def normalize_subject(text: Any) -> str:
+    """'Apple Inc.' and 'apple' map to the same subject."""
+    text = re.sub(r"[^\w\s&-]", " ", str(text).lower())
+    return " ".join(_SUFFIXES.sub(" ", text).split())
+
+
+def normalize_inputs(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    normalized = {}
+    for key, value in sorted((inputs or {}).items()):
+        key = key.lower()
+        if key in VOLATILE_INPUTS:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            normalized[key] = sorted(" ".join(str(v).lower().split()) for v in value)
+        elif key in SUBJECT_KEYS:
+            normalized[key] = normalize_subject(value)
+        else:
+            normalized[key] = " ".join(str(value).lower().split())
+    return normalized
+
+
+def date_bucket(when: Optional[dt.date] = None, bucket: str = DEFAULT_BUCKET) -> str:
+    when = when or dt.date.today()
+    if bucket == "week":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    if bucket == "month":
+        return when.strftime("%Y-%m")
+    return when.isoformat()
+
+
+def make_key(task: str, inputs: Dict[str, Any], bucket: str) -> str:
+    raw = json.dumps([task, normalize_inputs(inputs), bucket], sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def subject_of(inputs: Dict[str, Any]) -> str:
+    normalized = normalize_inputs(inputs)
+    return next((str(normalized[k]) for k in SUBJECT_KEYS if k in normalized), "")
+
+
+class ResultCache:
+    """
+    Persistent store of task outputs. Only entries from the current date bucket are returned as
+    hits; older ones stay on disk until evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, bucket: str = DEFAULT_BUCKET):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.bucket = bucket
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, task TEXT, subject TEXT, inputs TEXT, "
+                "bucket TEXT, crew TEXT, output TEXT, created_at REAL, hits INTEGER DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_subject ON results (subject, bucket)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def current_bucket(self) -> str:
+        return date_bucket(bucket=self.bucket)
+
+    def get(self, task: str, inputs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Output of `task` for these inputs from the current bucket, or None."""
+        key = make_key(task, inputs, self.current_bucket())
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM results WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE results SET hits = hits + 1 WHERE key = ?", (key,))
+        return dict(row) if row else None
+
+    def put(self, task: str, inputs: Dict[str, Any], output: str, crew: str = "") -> str:
+        bucket = self.current_bucket()
+        key = make_key(task, inputs, bucket)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, task, subject, inputs, bucket, crew, output, created_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, task, subject_of(inputs), json.dumps(normalize_inputs(inputs)), bucket, crew, output, time.time()),
+            )
+        return key
+
+    def find(self, subject: str, tasks: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Current-bucket outputs about a subject from any crew, newest first."""
+        rows = self.entries(subject=subject, bucket=self.current_bucket())
+        return [r for r in rows if not tasks or r["task"] in tasks]
+
+    def entries(
+        self,
+        task: Optional[str] = None,
+        subject: Optional[str] = None,
+        crew: Optional[str] = None,
+        bucket: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        where, params = self._filters(task=task, subject=subject, crew=crew, bucket=bucket)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM results{where} ORDER BY created_at DESC", params).fetchall()
+        return [dict(r) for r in rows]
+
+    def lookup(self, key_prefix: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM results WHERE key LIKE ?", (key_prefix + "%",)).fetchone()
+        return dict(row) if row else None
+
+    def evict(
+        self,
+        key: Optional[str] = None,
+        task: Optional[str] = None,
+        subject: Optional[str] = None,
+        crew: Optional[str] = None,
+        older_than_days: Optional[float] = None,
+    ) -> int:
+        """Delete matching entries; with no filters everything is deleted. Returns the number removed."""
+        where, params = self._filters(key=key, task=task, subject=subject, crew=crew, older_than_days=older_than_days)
+        with self._connect() as conn:
+            return conn.execute(f"DELETE FROM results{where}", params).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            total, hits, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(LENGTH(output)), 0) FROM results"
+            ).fetchone()
+            by_task = conn.execute("SELECT crew, task, COUNT(*) FROM results GROUP BY crew, task ORDER BY crew, task").fetchall()
+            current = conn.execute("SELECT COUNT(*) FROM results WHERE bucket = ?", (self.current_bucket(),)).fetchone()[0]
+        return {
+            "path": self.path,
+            "entries": total,
+            "current_bucket": current,
+            "hits": hits,
+            "output_chars": size,
+            "by_task": {f"{c}/{t}": n for c, t, n in by_task},
+        }
+
+    @staticmethod
+    def _filters(key=None, task=None, subject=None, crew=None, bucket=None, older_than_days=None):
+        clauses, params = [], []
+        if key:
+            clauses.append("key LIKE ?")
+            params.append(key + "%")
+        if task:
+            clauses.append("task = ?")
+            params.append(task)
+        if subject:
+            clauses.append("subject = ?")
+            params.append(normalize_subject(subject))
+        if crew:
+            clauses.append("crew = ?")
+            params.append(crew)
+        if bucket:
+            clauses.append("bucket = ?")
+            params.append(bucket)
+        if older_than_days is not None:
+            clauses.append("created_at < ?")
+            params.append(time.time() - older_than_days * 86400)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+_CACHE: Optional[ResultCache] = None
+
+
+def get_cache() -> ResultCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResultCache()
+    return _CACHE
+
+
+@dataclass
+class CachedResult:
+    """Stands in for a CrewOutput when a kickoff is served from the cache."""
+    raw: str
+    tasks_output: List[Any] = field(default_factory=list)
+    cached: bool = True
+
+
+def _task_name(task: Any, index: int) -> str:
+    return getattr(task, "name", None) or f"task_{index}"
+
+
+def kickoff_cached(crew: Any, inputs: Dict[str, Any], crew_name: str, cache: Optional[ResultCache] = None, refresh: bool = False):
+    """
+    Kick off `crew` unless its final task already ran on the same inputs in the current bucket.
+
+    On a hit the cached outputs are written to the tasks' output files as a real run would. On a
+    miss every task output is stored, so other crews can reuse the intermediate results too.
+    Set CREW_CACHE_DISABLE=1 or pass refresh=True to always run.
+    """
+    cache = cache or get_cache()
+    tasks = list(crew.tasks)
+    final = _task_name(tasks[-1], len(tasks) - 1)
+    if not refresh and os.getenv("CREW_CACHE_DISABLE") != "1":
+        hit = cache.get(final, inputs)
+        if hit:
+            outputs = []
+            for i, task in enumerate(tasks):
+                entry = hit if i == len(tasks) - 1 else cache.get(_task_name(task, i), inputs)
+                if entry and getattr(task, "output_file", None):
+                    os.makedirs(os.path.dirname(task.output_file) or ".", exist_ok=True)
+                    with open(task.output_file, "w", encoding="utf-8") as f:
+                        f.write(entry["output"])
+                outputs.append(entry)
+            print(f"[CACHE] {crew_name}/{final} served from cache ({hit['key']}, {hit['bucket']})")
+            return CachedResult(raw=hit["output"], tasks_output=outputs)
+
+    result = crew.kickoff(inputs=inputs)
+    for i, (task, output) in enumerate(zip(tasks, getattr(result, "tasks_output", None) or [])):
+        name = getattr(output, "name", None) or _task_name(task, i)
+        cache.put(name, inputs, str(getattr(output, "raw", output)), crew=crew_name)
+    return result
+
+
+def _print_entries(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        print("No cached results.")
+        return
+    print(f"{'KEY':<16}  {'BUCKET':<10}  {'CREW':<20}  {'TASK':<28}  {'SUBJECT':<24}  {'CHARS':>7}  {'HITS':>4}")
+    for r in rows:
+        print(
+            f"{r['key']:<16}  {r['bucket']:<10}  {r['crew'][:20]:<20}  {r['task'][:28]:<28}  "
+            f"{r['subject'][:24]:<24}  {len(r['output'] or ''):>7}  {r['hits']:>4}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect and evict cached crew task results.")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="Cache database (CREW_CACHE_PATH)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ls = sub.add_parser("list", help="List cached entries, newest first")
+    ls.add_argument("--task")
+    ls.add_argument("--subject")
+    ls.add_argument("--crew")
+    ls.add_argument("--current", action="store_true", help="Only entries from the current date bucket")
+
+    show = sub.add_parser("show", help="Print one entry's output")
+    show.add_argument("key", help="Key or key prefix")
+
+    ev = sub.add_parser("evict", help="Delete entries matching the filters")
+    ev.add_argument("--key")
+    ev.add_argument("--task")
+    ev.add_argument("--subject")
+    ev.add_argument("--crew")
+    ev.add_argument("--older-than", type=float, metavar="DAYS")
+    ev.add_argument("--all", action="store_true", help="Delete everything")
+
+    sub.add_parser("stats", help="Entry counts and sizes")
+
+    args = parser.parse_args(argv)
+    cache = ResultCache(args.path)
+
+    if args.command == "list":
+        bucket = cache.current_bucket() if args.current else None
+        _print_entries(cache.entries(task=args.task, subject=args.subject, crew=args.crew, bucket=bucket))
+    elif args.command == "show":
+        entry = cache.lookup(args.key)
+        if not entry:
+            print(f"No entry with key {args.key}")
+            return 1
+        print(f"{entry['crew']}/{entry['task']}  subject={entry['subject']}  bucket={entry['bucket']}  inputs={entry['inputs']}\n")
+        print(entry["output"])
+    elif args.command == "evict":
+        filters = dict(key=args.key, task=args.task, subject=args.subject, crew=args.crew, older_than_days=args.older_than)
+        if not args.all and all(v is None for v in filters.values()):
+            parser.error("evict needs a filter, or --all")
+        print(f"Evicted {cache.evict(**filters)} entries")
+    elif args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,12 +1,11 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import SerperDevTool
+from crewai.project import CrewBase, agent, crew, task, after_kickoff
 from pydantic import BaseModel, Field
 from typing import List
 from .tools.push_tool import PushNotificationTool
+from .tools.cached_search import CachedResearchTool, CachedSerperDevTool
 from crewai.memory import LongTermMemory, ShortTermMemory, EntityMemory
-from crewai.memory.storage.rag_storage import RAGStorage
-from crewai.memory.storage.ltm_sqlite_storage import LTMSQLiteStorage
+from .memory_store import create_memory_stores, memory_stats
 
 class TrendingCompany(BaseModel):
     """ A company that is in the news and attracting attention """
@@ -40,12 +39,12 @@ class StockPicker():
     @agent
     def trending_company_finder(self) -> Agent:
         return Agent(config=self.agents_config['trending_company_finder'],
-                     tools=[SerperDevTool()], memory=True)
+                     tools=[CachedSerperDevTool()], memory=True)
     
     @agent
     def financial_researcher(self) -> Agent:
         return Agent(config=self.agents_config['financial_researcher'], 
-                     tools=[SerperDevTool()])
+                     tools=[CachedResearchTool(), CachedSerperDevTool()])
 
     @agent
     def stock_picker(self) -> Agent:
@@ -71,9 +70,12 @@ class StockPicker():
         return Task(
             config=self.tasks_config['pick_best_company'],
         )
-    
-
 
+    @after_kickoff
+    def flush_memory(self, result):
+        """Write buffered memories and report what this run stored"""
+        print(f"Memory: {memory_stats(self.memory_stores)}")
+        return result
 
     @crew
     def crew(self) -> Crew:
@@ -83,7 +85,10 @@ class StockPicker():
             config=self.agents_config['manager'],
             allow_delegation=True
         )
-            
+
+        # Local embeddings, one bounded collection per memory type (see memory_store.py)
+        self.memory_stores = create_memory_stores()
+
         return Crew(
             agents=self.agents,
             tasks=self.tasks, 
@@ -92,34 +97,9 @@ class StockPicker():
             manager_agent=manager,
             memory=True,
             # Long-term memory for persistent storage across sessions
-            long_term_memory = LongTermMemory(
-                storage=LTMSQLiteStorage(
-                    db_path="./memory/long_term_memory_storage.db"
-                )
-            ),
+            long_term_memory=LongTermMemory(storage=self.memory_stores["long_term"]),
             # Short-term memory for current context using RAG
-            short_term_memory = ShortTermMemory(
-                storage = RAGStorage(
-                        embedder_config={
-                            "provider": "openai",
-                            "config": {
-                                "model": 'text-embedding-3-small'
-                            }
-                        },
-                        type="short_term",
-                        path="./memory/"
-                    )
-                ),            # Entity memory for tracking key information about entities
-            entity_memory = EntityMemory(
-                storage=RAGStorage(
-                    embedder_config={
-                        "provider": "openai",
-                        "config": {
-                            "model": 'text-embedding-3-small'
-                        }
-                    },
-                    type="short_term",
-                    path="./memory/"
-                )
-            ),
+            short_term_memory=ShortTermMemory(storage=self.memory_stores["short_term"]),
+            # Entity memory for tracking key information about entities
+            entity_memory=EntityMemory(storage=self.memory_stores["entities"]),
         )
@@ -4,26 +4,44 @@ import warnings
 import os
 from datetime import datetime
 
+from stock_picker.cache import get_cache, kickoff_cached
 from stock_picker.crew import StockPicker
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 
+def cache_company_research(result):
+    """
+    Store each company's research on its own, so later runs in other sectors and the
+    financial_researcher crew can reuse it by company name.
+    """
+    if getattr(result, "cached", False):
+        return
+    for output in result.tasks_output:
+        research = getattr(output, "pydantic", None)
+        for item in getattr(research, "research_list", None) or []:
+            get_cache().put("company_research", {"company": item.name}, item.model_dump_json(indent=2), crew="stock_picker")
+
+
 def run():
     """
-    Run the research crew.
+    Run the research crew once per sector (STOCK_PICKER_SECTORS, comma-separated).
     """
-    inputs = {
-        'sector': 'Technology',
-        "current_date": str(datetime.now())
-    }
+    sectors = [s.strip() for s in os.getenv("STOCK_PICKER_SECTORS", "Technology").split(",") if s.strip()]
+
+    for sector in sectors:
+        inputs = {
+            'sector': sector,
+            "current_date": str(datetime.now())
+        }
 
-    # Create and run the crew
-    result = StockPicker().crew().kickoff(inputs=inputs)
+        # Create and run the crew; a sector already decided today is served from the shared cache
+        result = kickoff_cached(StockPicker().crew(), inputs, crew_name="stock_picker")
+        cache_company_research(result)
 
-    # Print the result
-    print("\n\n=== FINAL DECISION ===\n\n")
-    print(result.raw)
+        # Print the result
+        print(f"\n\n=== FINAL DECISION: {sector} ===\n\n")
+        print(result.raw)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,261 @@
+import atexit
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from crewai.memory.storage.ltm_sqlite_storage import LTMSQLiteStorage
+from crewai.memory.storage.rag_storage import RAGStorage
+
+# "sentence-transformers" (local CPU model), "hash" (no model, for tests and offline runs) or "openai"
+EMBEDDER = os.getenv("STOCK_PICKER_EMBEDDER", "sentence-transformers")
+EMBEDDING_MODEL = os.getenv("STOCK_PICKER_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+MEMORY_DIR = os.getenv("STOCK_PICKER_MEMORY_DIR", "./memory")
+MAX_ITEMS = int(os.getenv("STOCK_PICKER_MEMORY_MAX_ITEMS", "500"))
+MAX_AGE_DAYS = float(os.getenv("STOCK_PICKER_MEMORY_MAX_AGE_DAYS", "30"))
+BATCH_SIZE = int(os.getenv("STOCK_PICKER_MEMORY_BATCH_SIZE", "16"))
+LTM_MAX_ROWS = int(os.getenv("STOCK_PICKER_LTM_MAX_ROWS", "1000"))
+
+OPENAI_EMBEDDER = {"provider": "openai", "config": {"model": "text-embedding-3-small"}}
+
+
+class LocalEmbedder(EmbeddingFunction[Documents]):
+    """ Base for in-process embedders: embeds a batch at a time and remembers recent texts """
+
+    def __init__(self, cache_size: int = 2048):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "texts": 0, "embedded": 0, "cache_hits": 0}
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = list(input)
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["texts"] += len(texts)
+            vectors = [self._cache.get(t) for t in texts]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            fresh = dict(zip(missing, self._embed(missing)))
+            with self._lock:
+                self.stats["embedded"] += len(missing)
+                for text, vector in fresh.items():
+                    self._cache[text] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            vectors = [v if v is not None else fresh[t] for t, v in zip(texts, vectors)]
+        with self._lock:
+            self.stats["cache_hits"] += len(texts) - len(missing)
+        return vectors
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class HashEmbedder(LocalEmbedder):
+    """ Signed feature hashing of words and word pairs; deterministic, no model download """
+
+    def __init__(self, dims: int = 384, **kwargs):
+        super().__init__(**kwargs)
+        self.dims = dims
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            words = re.findall(r"\w+", text.lower())
+            vector = [0.0] * self.dims
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                vector[int.from_bytes(digest[:4], "little") % self.dims] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+
+class SentenceTransformerEmbedder(LocalEmbedder):
+    """ Sentence embedding model run on the CPU (sentence-transformers), loaded on first use """
+
+    def __init__(self, model: str = EMBEDDING_MODEL, batch_size: int = 32, **kwargs):
+        super().__init__(**kwargs)
+        self.model_name = model
+        self.batch_size = batch_size
+        self._model = None
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True).tolist()
+
+
+def create_embedder(backend: str = EMBEDDER) -> Dict[str, Any]:
+    """ Embedder config for RAGStorage; falls back to hashing when sentence-transformers is not installed """
+    if backend == "openai":
+        return OPENAI_EMBEDDER
+    if backend == "sentence-transformers":
+        try:
+            import sentence_transformers  # noqa: F401
+            return {"provider": "custom", "config": {"embedder": SentenceTransformerEmbedder()}}
+        except ImportError:
+            print("sentence-transformers is not installed; using the hashing embedder for memory")
+    return {"provider": "custom", "config": {"embedder": HashEmbedder()}}
+
+
+def embedder_slug(embedder: Dict[str, Any]) -> str:
+    """ Folder name per embedding model, so collections of different dimensions never mix """
+    function = embedder["config"].get("embedder")
+    if isinstance(function, SentenceTransformerEmbedder):
+        return re.sub(r"\W+", "-", function.model_name).strip("-").lower()
+    if isinstance(function, HashEmbedder):
+        return f"hash-{function.dims}"
+    return f"{embedder['provider']}-{embedder['config'].get('model', 'default')}"
+
+
+class BoundedRAGStorage(RAGStorage):
+    """
+    RAGStorage with its own collection per memory type, writes buffered and embedded in batches,
+    and retention bounded by item count and age.
+    """
+
+    def __init__(
+        self,
+        type: str,
+        embedder_config: Dict[str, Any],
+        path: str,
+        max_items: int = MAX_ITEMS,
+        max_age_days: float = MAX_AGE_DAYS,
+        batch_size: int = BATCH_SIZE,
+        **kwargs,
+    ):
+        os.makedirs(path, exist_ok=True)
+        super().__init__(type=type, allow_reset=True, embedder_config=embedder_config, path=path, **kwargs)
+        self.max_items = max_items
+        self.max_age_days = max_age_days
+        self.batch_size = max(1, batch_size)
+        self._pending: List[tuple] = []
+        self._write_lock = threading.Lock()
+        self.stats = {"saved": 0, "batches": 0, "searches": 0, "pruned": 0}
+        atexit.register(self.flush)
+
+    def _ensure_collection(self) -> None:
+        if not hasattr(self, "app") or not hasattr(self, "collection"):
+            self._initialize_app()
+
+    def save(self, value: Any, metadata: Dict[str, Any]) -> None:
+        # Chroma rejects empty metadata; the timestamp also drives age-based retention
+        item = (str(value), {**(metadata or {}), "saved_at": time.time()})
+        with self._write_lock:
+            self._pending.append(item)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Embed and store buffered writes in one call, then enforce the retention limits """
+        with self._write_lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        self._ensure_collection()
+        self.collection.add(
+            documents=[text for text, _ in pending],
+            metadatas=[meta for _, meta in pending],
+            ids=[str(uuid.uuid4()) for _ in pending],
+        )
+        self.stats["saved"] += len(pending)
+        self.stats["batches"] += 1
+        self.compact()
+
+    def search(self, query: str, limit: int = 3, filter: Optional[dict] = None, score_threshold: float = 0.35) -> List[Any]:
+        # Buffered writes must be visible to reads in the same run
+        self.flush()
+        self.stats["searches"] += 1
+        return super().search(query=query, limit=limit, filter=filter, score_threshold=score_threshold)
+
+    def compact(self) -> int:
+        """ Drop items older than max_age_days, then the oldest beyond max_items """
+        self._ensure_collection()
+        stale: List[str] = []
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            stale = self.collection.get(where={"saved_at": {"$lt": cutoff}}, include=["metadatas"])["ids"]
+            if stale:
+                self.collection.delete(ids=stale)
+        overflow: List[str] = []
+        count = self.collection.count()
+        if self.max_items and count > self.max_items:
+            data = self.collection.get(include=["metadatas"])
+            ordered = sorted(zip(data["ids"], data["metadatas"]), key=lambda item: (item[1] or {}).get("saved_at", 0))
+            overflow = [item_id for item_id, _ in ordered[: count - self.max_items]]
+            self.collection.delete(ids=overflow)
+        self.stats["pruned"] += len(stale) + len(overflow)
+        return len(stale) + len(overflow)
+
+    def reset(self) -> None:
+        with self._write_lock:
+            self._pending = []
+        super().reset()
+
+
+class BoundedLTMSQLiteStorage(LTMSQLiteStorage):
+    """ Long-term memory SQLite file kept to the newest max_rows rows within max_age_days """
+
+    def __init__(self, db_path: str, max_rows: int = LTM_MAX_ROWS, max_age_days: float = MAX_AGE_DAYS):
+        super().__init__(db_path=db_path)
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.compact()
+
+    def compact(self) -> int:
+        removed = 0
+        with sqlite3.connect(self.db_path) as conn:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += conn.execute(
+                    "DELETE FROM long_term_memories WHERE CAST(datetime AS REAL) < ?", (cutoff,)
+                ).rowcount
+            if self.max_rows:
+                removed += conn.execute(
+                    "DELETE FROM long_term_memories WHERE id NOT IN "
+                    "(SELECT id FROM long_term_memories ORDER BY CAST(datetime AS REAL) DESC LIMIT ?)",
+                    (self.max_rows,),
+                ).rowcount
+        if removed:
+            # Give the freed pages back to the file system
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("VACUUM")
+            conn.close()
+        return removed
+
+
+def create_memory_stores(embedder: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """ Storages for short-term, entity and long-term memory under MEMORY_DIR/<embedding model>/ """
+    embedder = embedder or create_embedder()
+    root = os.path.join(MEMORY_DIR, embedder_slug(embedder))
+    return {
+        "short_term": BoundedRAGStorage("short_term", embedder, os.path.join(root, "short_term")),
+        "entities": BoundedRAGStorage("entities", embedder, os.path.join(root, "entities")),
+        "long_term": BoundedLTMSQLiteStorage(os.path.join(MEMORY_DIR, "long_term_memory_storage.db")),
+    }
+
+
+def memory_stats(stores: Dict[str, Any]) -> Dict[str, Any]:
+    stats = {}
+    for name, store in stores.items():
+        if isinstance(store, BoundedRAGStorage):
+            store.flush()
+            stats[name] = {**store.stats, "items": store.collection.count() if hasattr(store, "collection") else 0}
+            function = store.embedder_config if isinstance(store.embedder_config, LocalEmbedder) else None
+            if function:
+                stats["embedder"] = function.stats
+        elif isinstance(store, BoundedLTMSQLiteStorage):
+            with sqlite3.connect(store.db_path) as conn:
+                stats[name] = {"rows": conn.execute("SELECT COUNT(*) FROM long_term_memories").fetchone()[0]}
+    return stats
@@ -1,6 +1,5 @@
 # src/knowledge_bot/crew.py
 from typing import Any, Dict, List
-import hashlib
 import os
 from dataclasses import dataclass
 from pathlib import Path
@@ -12,6 +11,8 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 
 from .tools.custom_tool import LocalFileReader, GitHubRepoCloner, GoogleDriveReader
+from .embeddings import OllamaEmbedder, embed_chunks
+from .chunking import chunk_text, dedupe_chunks
 from .agents.file_agent import build_file_agent
 from .agents.github_agent import build_github_agent
 from .agents.drive_agent import build_drive_agent
@@ -24,44 +25,6 @@ BASE_DIR = Path(__file__).resolve().parent
 AGENTS_YAML = (BASE_DIR / "config" / "agents.yaml").as_posix()
 TASKS_YAML  = (BASE_DIR / "config" / "tasks.yaml").as_posix()
 
-def _chunk_text(text: str, chunk_size: int = 800, overlap: int = 100) -> List[str]:
-    if not text:
-        return []
-    n = len(text)
-    chunks: List[str] = []
-    start = 0
-    while start < n:
-        end = min(n, start + chunk_size)
-        chunks.append(text[start:end])
-        start = start + chunk_size - overlap
-        if start <= 0 or start >= n:
-            break
-    return chunks
-
-def _doc_id(s: str) -> str:
-    return hashlib.sha1(s.encode("utf-8")).hexdigest()
-
-def _ollama_embed_batch(base_url: str, model: str, texts: List[str]) -> List[List[float]]:
-    try:
-        resp = requests.post(f"{base_url}/api/embed", json={"model": model, "input": texts}, timeout=180)
-        if resp.status_code == 200:
-            data = resp.json()
-            if isinstance(data, dict) and "embeddings" in data:
-                return data["embeddings"]
-            if isinstance(data, dict) and "data" in data:
-                return [item.get("embedding", []) for item in data["data"]]
-            if isinstance(data, dict) and "embedding" in data:
-                return [data["embedding"]] * len(texts)
-    except Exception:
-        pass
-    vectors: List[List[float]] = []
-    for t in texts:
-        r = requests.post(f"{base_url}/api/embeddings", json={"model": model, "prompt": t}, timeout=180)
-        r.raise_for_status()
-        jd = r.json()
-        vectors.append(jd.get("embedding", []))
-    return vectors
-
 @dataclass
 class RAGStore:
     client: chromadb.PersistentClient
@@ -130,19 +93,16 @@ class KnowledgeBotCrew:
             base_url = os.getenv("OLLAMA_BASE_URL", "http://ollama-service.ollama.svc.cluster.local:11434")
             embed_model = inputs.get("embed_model") or "nomic-embed-text"
             collection = self.rag_store.get_or_create()
-            ids: List[str] = []
-            metadatas: List[Dict[str, Any]] = []
-            texts: List[str] = []
+            chunks: List[Dict[str, Any]] = []
             for d in documents:
                 meta = d.get("metadata", {})
-                chunks = _chunk_text(d["content"], chunk_size=800, overlap=100)
-                for ch in chunks:
-                    ids.append(_doc_id(ch + str(meta)))
-                    metadatas.append(meta)
-                    texts.append(ch)
-            vectors = _ollama_embed_batch(base_url, embed_model, texts)
-            collection.upsert(ids=ids, embeddings=vectors, metadatas=metadatas, documents=texts)
-            return {"embedded": len(ids), "collection": self.collection_name}
+                for i, ch in enumerate(chunk_text(d["content"])):
+                    chunks.append({"content": ch, "metadata": {**meta, "chunk_id": i}})
+            chunks = dedupe_chunks(chunks)
+            embedder = OllamaEmbedder(base_url=base_url, model=embed_model)
+            # Drops each file's chunks from earlier runs (and the old content-hash ids) before upserting
+            stats = embed_chunks(collection, chunks, embedder, replace_paths=True)
+            return {"embedded": stats.upserted, "collection": self.collection_name, "stats": stats.as_dict()}
         return Task(config=self.tasks_config["embed_task"], agent=self.embed_agent(), function=run)  # type: ignore[index]
 
     @task
@@ -157,7 +117,7 @@ class KnowledgeBotCrew:
             model = inputs.get("model") or "llama3"
             save_md = inputs.get("save_markdown")
             collection = self.rag_store.get_or_create()
-            qvec = _ollama_embed_batch(base_url, embed_model, [question])[0]
+            qvec = OllamaEmbedder(base_url=base_url, model=embed_model).embed([question])[0]
             results = collection.query(query_embeddings=[qvec], n_results=top_k)
             contexts: List[str] = results.get("documents", [[]])[0]
             metas: List[Dict[str, Any]] = results.get("metadatas", [[]])[0]
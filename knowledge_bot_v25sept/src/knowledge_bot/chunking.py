@@ -0,0 +1,200 @@
+# src/knowledge_bot/chunking.py
+"""
+Structure-aware chunking sized in tokens.
+
+Text is first split into units that should not be cut: headings, list items (with their
+continuation lines), table rows and paragraphs. Units are then packed into chunks of at most
+`max_tokens`. A chunk never straddles a heading once it has some content. Each chunk starts
+with its section heading, and a table split across chunks repeats its header row. Only a
+unit that is larger than a whole chunk is split, at sentence and then word boundaries. PDF
+pages arrive as separate documents, so chunks never cross pages.
+
+Token counts use tiktoken when it is installed, otherwise an estimate that tracks the BPE
+tokenizers of the llama/mistral family closely enough for sizing.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import math
+import os
+import re
+
+DEFAULT_MAX_TOKENS = int(os.getenv("KB_CHUNK_TOKENS", "200"))
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_HEADING_RE = re.compile(
+    r"^\s{0,3}(?:#{1,6}\s+\S.*"              # markdown heading
+    r"|\d+(?:\.\d+)+\s+[A-Z].{0,80}"          # numbered section: 2.1 Installation
+    r"|[A-Z][A-Z0-9 /&()\-]{2,60}:?"          # ALL CAPS line
+    r"|[A-Z][\w /&()\-]{1,58}:)\s*$"          # short label ending in a colon
+)
+_LIST_RE = re.compile(r"^\s*(?:[-*+•▪◦]|\d{1,3}[.)]|[a-zA-Z][.)])\s+\S")
+_TABLE_RE = re.compile(r"\|.*\||\t|\S {2,}\S+ {2,}\S")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # Words cost about one token per four characters, punctuation one each
+    return sum(max(1, math.ceil(len(w) / 4)) if w[0].isalnum() or w[0] == "_" else 1
+               for w in _WORD_RE.findall(text))
+
+
+def _units(text: str) -> List[Tuple[str, str, str]]:
+    """Split text into (kind, text, section) units; kind is heading, item, row or para."""
+    units: List[Tuple[str, str, str]] = []
+    section = ""
+    para: List[str] = []
+    item: List[str] = []
+
+    def flush() -> None:
+        if para:
+            units.append(("para", "\n".join(para), section))
+            para.clear()
+        if item:
+            units.append(("item", "\n".join(item), section))
+            item.clear()
+
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        if not line.strip():
+            flush()
+            continue
+        if _LIST_RE.match(line):
+            flush()
+            item.append(line)
+        elif _TABLE_RE.search(line):
+            flush()
+            units.append(("row", line, section))
+        elif _HEADING_RE.match(line) and len(line) <= 100:
+            flush()
+            section = line.strip().lstrip("#").strip()
+            units.append(("heading", line.strip(), section))
+        elif item:
+            # Continuation of the current list item
+            item.append(line)
+        else:
+            para.append(line)
+    flush()
+    return units
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def _split_long(text: str, max_tokens: int) -> List[str]:
+    """Split an oversized unit at sentence boundaries, falling back to words."""
+    pieces: List[str] = []
+    current: List[str] = []
+    size = 0
+    for sentence in split_sentences(text):
+        for part in ([sentence] if count_tokens(sentence) <= max_tokens else sentence.split()):
+            n = count_tokens(part)
+            if current and size + n > max_tokens:
+                pieces.append(" ".join(current))
+                current, size = [], 0
+            current.append(part)
+            size += n
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> List[str]:
+    """Chunks of at most roughly `max_tokens` tokens that follow the structure of the text."""
+    if not text or not text.strip():
+        return []
+    min_tokens = max_tokens // 4
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    table_header: Optional[str] = None
+    previous_kind = ""
+
+    def emit() -> None:
+        nonlocal current, size
+        # A chunk holding only a heading carries no content of its own
+        if current and not (len(current) == 1 and _HEADING_RE.match(current[0])):
+            chunks.append("\n".join(current))
+        current, size = [], 0
+
+    for kind, unit, section in _units(text):
+        if kind == "row":
+            if previous_kind != "row":
+                table_header = unit
+        else:
+            table_header = None
+        previous_kind = kind
+
+        if kind == "heading":
+            if size >= min_tokens:
+                emit()
+            current.append(unit)
+            size += count_tokens(unit)
+            continue
+
+        # Leave room for the heading and table header a continuation chunk starts with
+        overhead = (count_tokens(section) if section else 0) + (count_tokens(table_header) if table_header else 0)
+        budget = max(min_tokens, max_tokens - overhead)
+        n = count_tokens(unit)
+        parts = [unit] if n <= budget else _split_long(unit, budget)
+        for part in parts:
+            n = count_tokens(part)
+            if current and size + n > max_tokens:
+                emit()
+                # Carry context into the new chunk: the section heading and any table header
+                if section:
+                    current.append(section)
+                    size += count_tokens(section)
+                if table_header and part != table_header:
+                    current.append(table_header)
+                    size += count_tokens(table_header)
+            current.append(part)
+            size += n
+    emit()
+    return chunks
+
+
+# Bump when chunk_document changes so persisted indexes are rebuilt
+CHUNKER_VERSION = f"struct-tokens-{DEFAULT_MAX_TOKENS}"
+
+
+def chunk_document(d: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Chunks of one parsed document, each carrying the document's metadata plus its position."""
+    content = (d.get("content") or "").strip()
+    meta = d.get("metadata", {})
+    if not content or len(content) < 50:
+        return []
+    chunks = chunk_text(content, DEFAULT_MAX_TOKENS)
+    out: List[Dict[str, Any]] = []
+    for i, ch in enumerate(chunks):
+        md = meta.copy()
+        md["chunk_id"] = i
+        md["total_chunks"] = len(chunks)
+        md["name"] = md.get("name") or os.path.basename(md.get("path", "") or "") or "unknown"
+        out.append({"content": ch, "metadata": md})
+    return out
+
+
+def content_hash(text: str) -> str:
+    """Hash of a chunk's text ignoring case and whitespace, for spotting duplicates across documents."""
+    return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+def dedupe_chunks(chunks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop chunks whose text already appeared in an earlier chunk."""
+    seen = set()
+    out: List[Dict[str, Any]] = []
+    for chunk in chunks:
+        h = content_hash(chunk["content"])
+        if h not in seen:
+            seen.add(h)
+            out.append(chunk)
+    return out
@@ -0,0 +1,118 @@
+# src/knowledge_bot/context_packer.py
+"""
+Fit retrieved chunks into the model's context window.
+
+Chunks arrive in rank order. Neighbouring chunks of the same page are merged first so a
+procedure split across two chunks reads as one passage. Passages are then added, best first,
+until the token budget is spent. A passage that does not fit is cut at a sentence boundary
+rather than mid-word when enough room is left, or skipped, and packing moves on to the next
+one, which may be short enough to fit whole.
+"""
+from typing import Any, Dict, List, Tuple
+from dataclasses import dataclass, field
+
+from .chunking import count_tokens, split_sentences
+
+# Passages shorter than this after trimming are not worth the space
+MIN_TRIMMED_TOKENS = 40
+
+
+@dataclass
+class PackedContext:
+    contexts: List[str] = field(default_factory=list)
+    docs: List[Dict[str, Any]] = field(default_factory=list)
+    tokens_used: int = 0
+    budget: int = 0
+    chunks_used: int = 0
+    trimmed: bool = False
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "context_tokens": self.tokens_used,
+            "context_budget": self.budget,
+            "chunks_used": self.chunks_used,
+            "passages": len(self.contexts),
+            "trimmed": self.trimmed,
+        }
+
+
+def _header(md: Dict[str, Any]) -> str:
+    name = md.get("name", "unknown")
+    page = md.get("page")
+    return f"Source: {name}" + (f" (page {page})" if page else "")
+
+
+def merge_adjacent(docs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], int]]:
+    """
+    Merge chunks that are consecutive on the same page into one passage.
+    Returns (passage, number of chunks merged) in the rank of each passage's best chunk.
+    """
+    groups: Dict[Tuple[Any, Any], List[Tuple[int, Dict[str, Any]]]] = {}
+    for rank, d in enumerate(docs):
+        md = d.get("metadata", {})
+        groups.setdefault((md.get("path") or md.get("name"), md.get("page")), []).append((rank, d))
+
+    passages: List[Tuple[int, Dict[str, Any], int]] = []
+    for members in groups.values():
+        members.sort(key=lambda m: m[1].get("metadata", {}).get("chunk_id", 0))
+        run = [members[0]]
+        for member in members[1:]:
+            prev_id = run[-1][1].get("metadata", {}).get("chunk_id")
+            cur_id = member[1].get("metadata", {}).get("chunk_id")
+            if prev_id is not None and cur_id == prev_id + 1:
+                run.append(member)
+            else:
+                passages.append(_merge(run))
+                run = [member]
+        passages.append(_merge(run))
+    passages.sort(key=lambda p: p[0])
+    return [(passage, count) for _, passage, count in passages]
+
+
+def _merge(run: List[Tuple[int, Dict[str, Any]]]) -> Tuple[int, Dict[str, Any], int]:
+    best_rank = min(rank for rank, _ in run)
+    if len(run) == 1:
+        return best_rank, run[0][1], 1
+    first = run[0][1]
+    content = "\n".join(d["content"] for _, d in run)
+    return best_rank, {**first, "content": content}, len(run)
+
+
+def _trim(text: str, max_tokens: int) -> str:
+    kept: List[str] = []
+    used = 0
+    for sentence in split_sentences(text):
+        n = count_tokens(sentence)
+        if used + n > max_tokens:
+            break
+        kept.append(sentence)
+        used += n
+    return " ".join(kept)
+
+
+def pack_contexts(docs: List[Dict[str, Any]], budget: int) -> PackedContext:
+    """Pack ranked chunks into at most `budget` tokens of context."""
+    packed = PackedContext(budget=max(0, budget))
+    separator = count_tokens("\n\n---\n\n")
+    for passage, count in merge_adjacent(docs):
+        header = _header(passage.get("metadata", {}))
+        text = f"{header}\n\n{passage['content']}"
+        cost = count_tokens(text) + (separator if packed.contexts else 0)
+        remaining = packed.budget - packed.tokens_used
+        if cost > remaining:
+            room = remaining - count_tokens(header) - separator - 2
+            body = _trim(passage["content"], room) if room >= MIN_TRIMMED_TOKENS else ""
+            if body:
+                text = f"{header}\n\n{body}"
+                packed.contexts.append(text)
+                packed.docs.append(passage)
+                packed.tokens_used += count_tokens(text) + (separator if len(packed.contexts) > 1 else 0)
+                packed.chunks_used += count
+                packed.trimmed = True
+            # A shorter passage further down the ranking may still fit whole
+            continue
+        packed.contexts.append(text)
+        packed.docs.append(passage)
+        packed.tokens_used += cost
+        packed.chunks_used += count
+    return packed
@@ -9,6 +9,8 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 
 from .tools.custom_tool import LocalFileReader, GitHubRepoCloner, GoogleDriveReader
+from .embeddings import OllamaEmbedder, embed_chunks
+from .chunking import chunk_document, dedupe_chunks
 from .agents.file_agent import build_file_agent
 from .agents.github_agent import build_github_agent
 from .agents.drive_agent import build_drive_agent
@@ -21,6 +23,7 @@ BASE_DIR = Path(__file__).resolve().parent
 AGENTS_YAML = (BASE_DIR / "config" / "agents.yaml").as_posix()
 TASKS_YAML = (BASE_DIR / "config" / "tasks.yaml").as_posix()
 DEFAULT_KNOWLEDGE_DIR = "./knowledge"
+COLLECTION_NAME = "knowledgebot_collection"
 
 def _detect_intent(q: str) -> str:
     """Detect query intent for routing."""
@@ -78,6 +81,7 @@ class KnowledgeBotCrew:
         self.persist_dir = os.path.abspath("./kb_chroma")
         os.makedirs(self.persist_dir, exist_ok=True)
         self.chroma = chromadb.PersistentClient(path=self.persist_dir)
+        self.collection_name = COLLECTION_NAME
 
     @agent
     def file_agent(self) -> Agent:
@@ -102,7 +106,8 @@ class KnowledgeBotCrew:
     @task
     def ingest_task(self) -> Task:
         def run(inputs: Dict[str, Any]) -> Dict[str, Any]:
-            folder = inputs.get("folder_path") or os.path.abspath(DEFAULT_KNOWLEDGE_DIR)
+            # Absolute, so chunk paths and ids match the ones the direct RAG index produces
+            folder = os.path.abspath(inputs.get("folder_path") or DEFAULT_KNOWLEDGE_DIR)
             print(f"[DEBUG] Ingesting from: {folder}")
             
             local_docs = LocalFileReader(folder)
@@ -122,9 +127,17 @@ class KnowledgeBotCrew:
         def run(inputs: Dict[str, Any]) -> Dict[str, Any]:
             documents = inputs.get("documents", [])
             print(f"[DEBUG] Embedding {len(documents)} documents")
-            # Skip actual embedding for now - just return success
-            return {"embedded": len(documents), "collection": "knowledgebot_collection"}
-            
+            if not documents:
+                return {"embedded": 0, "collection": self.collection_name}
+            chunks: List[Dict[str, Any]] = []
+            for d in documents:
+                chunks.extend(chunk_document(d))
+            chunks = dedupe_chunks(chunks)
+            embedder = OllamaEmbedder(model=inputs.get("embed_model") or "nomic-embed-text")
+            collection = self.chroma.get_or_create_collection(self.collection_name)
+            stats = embed_chunks(collection, chunks, embedder)
+            return {"embedded": stats.upserted, "collection": self.collection_name, "stats": stats.as_dict()}
+
         return Task(config=self.tasks_config["embed_task"], agent=self.embed_agent(), function=run)
 
     @task
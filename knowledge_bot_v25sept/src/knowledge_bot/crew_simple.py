@@ -1,6 +1,13 @@
 # src/knowledge_bot/crew_simple.py
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import os, re, json, requests
+from concurrent.futures import ThreadPoolExecutor
+
+from .index_store import get_index
+from .embeddings import OllamaEmbedder, chunk_id
+from .query_cache import get_query_cache
+from .chunking import CHUNKER_VERSION, chunk_document, count_tokens, dedupe_chunks
+from .context_packer import pack_contexts
 
 # Optional BM25 scorer
 try:
@@ -9,6 +16,25 @@ try:
 except Exception:
     HAS_BM25 = False
 
+# Optional vectorized scoring (numpy ships with pandas/chromadb)
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except Exception:
+    HAS_NUMPY = False
+
+PROCEDURE_QUERY_TERMS = ["install", "installation", "steps", "procedure", "runbook", "setup"]
+PROCEDURE_TEXT_TERMS = PROCEDURE_QUERY_TERMS + ["deploy"]
+SECTION_TERMS = ["prerequisites", "requirements", "overview", "installation steps"]
+RRF_K = 60
+RETRIEVE_TOP_K = 7
+DEFAULT_NUM_CTX = int(os.getenv("KB_NUM_CTX", "4096"))
+DEFAULT_ANSWER_TOKENS = int(os.getenv("KB_ANSWER_TOKENS", "700"))
+# Chat template tokens Ollama adds around the messages
+PROMPT_MARGIN_TOKENS = 32
+# Share of num_ctx always kept for retrieved context; longer answer settings are cut down to fit
+MIN_CONTEXT_SHARE = float(os.getenv("KB_MIN_CONTEXT_SHARE", "0.5"))
+
 def _detect_intent(q: str) -> str:
     ql = (q or "").lower().strip()
     if any(x in ql for x in ["who am i", "what is my name", "who i am"]) and "interest" not in ql:
@@ -45,17 +71,15 @@ def _expand_query_terms(q: str) -> List[str]:
         tokens.add(v.replace(".", "_"))
     return list(tokens)
 
-def _chunk_text(text: str, chunk_size: int = 700, overlap: int = 120) -> List[str]:
-    if not text:
-        return []
-    out, n, start = [], len(text), 0
-    while start < n:
-        end = min(n, start + chunk_size)
-        out.append(text[start:end])
-        if end >= n:
-            break
-        start = max(0, end - overlap)
-    return out
+def _load_index(folder_path: str):
+    """
+    Return the persistent index for the folder, re-parsing only files that changed since last use.
+    When a watcher keeps the index current the folder is not rescanned per query.
+    """
+    index = get_index(folder_path, chunk_document, CHUNKER_VERSION)
+    if not index.watched:
+        index.refresh()
+    return index
 
 def _load_documents_from_folder(folder_path: str) -> List[Dict[str, Any]]:
     try:
@@ -68,17 +92,8 @@ def _load_documents_from_folder(folder_path: str) -> List[Dict[str, Any]]:
 
         chunked: List[Dict[str, Any]] = []
         for d in raw_docs:
-            content = (d.get("content") or "").strip()
-            meta = d.get("metadata", {})
-            if not content or len(content) < 50:
-                continue
-            chunks = _chunk_text(content, 700, 120)
-            for i, ch in enumerate(chunks):
-                md = meta.copy()
-                md["chunk_id"] = i
-                md["total_chunks"] = len(chunks)
-                md["name"] = md.get("name") or os.path.basename(md.get("path", "") or "") or "unknown"
-                chunked.append({"content": ch, "metadata": md})
+            chunked.extend(chunk_document(d))
+        chunked = dedupe_chunks(chunked)
 
         print(f"[RAG] Created {len(chunked)} chunks")
         for c in chunked[:2]:
@@ -90,40 +105,193 @@ def _load_documents_from_folder(folder_path: str) -> List[Dict[str, Any]]:
         import traceback; traceback.print_exc()
         return []
 
-def _bm25_search(query: str, docs: List[Dict[str, Any]], top_k: int = 7) -> List[Tuple[float, Dict[str, Any]]]:
-    if not HAS_BM25 or not docs:
-        return []
-    tokenized_corpus = [re.findall(r"\w+", (d["content"] or "").lower()) for d in docs]
-    bm25 = BM25Okapi(tokenized_corpus)
+class _DocFeatures:
+    """Query-independent per-chunk data for boosting, built once per chunk list."""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+        self.lowered = [(d["content"] or "").lower() for d in docs]
+        procedure = [any(k in t for k in PROCEDURE_TEXT_TERMS) for t in self.lowered]
+        section = [any(k in t for k in SECTION_TERMS) for t in self.lowered]
+        if HAS_NUMPY:
+            self.procedure_mask = np.array(procedure, dtype=bool)
+            self.section_mask = np.array(section, dtype=bool)
+        else:
+            self.procedure_mask, self.section_mask = procedure, section
+
+_FEATURES: Optional[_DocFeatures] = None
+
+def _doc_features(docs: List[Dict[str, Any]]) -> _DocFeatures:
+    # The index hands out a new chunk list on every change, so identity is a safe cache key
+    global _FEATURES
+    if _FEATURES is None or _FEATURES.docs is not docs:
+        _FEATURES = _DocFeatures(docs)
+    return _FEATURES
+
+def _bm25_scores(query: str, docs: List[Dict[str, Any]], bm25=None):
+    """
+    Mean BM25 score over the expanded query terms, computed with a single get_scores call.
+    BM25 is additive over query tokens, so scoring the concatenated tokens and dividing by the
+    number of terms equals averaging one get_scores call per term.
+    """
+    if bm25 is None:
+        tokenized_corpus = [re.findall(r"\w+", (d["content"] or "").lower()) for d in docs]
+        bm25 = BM25Okapi(tokenized_corpus)
     expanded = _expand_query_terms(query)
-    scores = [bm25.get_scores(re.findall(r"\w+", t)) for t in expanded]
-    avg_score = [sum(vals) / max(1, len(vals)) for vals in zip(*scores)]
-
+    tokens = [tok for t in expanded for tok in re.findall(r"\w+", t)]
+    raw = bm25.get_scores(tokens) if tokens else [0.0] * len(docs)
+    n_terms = max(1, len(expanded))
+    if HAS_NUMPY:
+        return np.asarray(raw, dtype=float) / n_terms
+    return [v / n_terms for v in raw]
+
+def _boost_scores(query: str, docs: List[Dict[str, Any]]):
+    """Version, procedure and section boosts for every chunk, applied as masks over the chunk list."""
+    features = _doc_features(docs)
     versions = _extract_versions(query)
     phrase = (query or "").lower()
-    scored: List[Tuple[float, Dict[str, Any]]] = []
-    for idx, d in enumerate(docs):
-        s = avg_score[idx]
-        text = (d["content"] or "").lower()
-
-        # Version boosts
-        for v in versions:
-            if v in text or v.lstrip("v") in text or v.replace(".", "_") in text:
-                s += 2.0
-
-        # Procedure/install bias
-        if any(k in phrase for k in ["install", "installation", "steps", "procedure", "runbook", "setup"]):
-            if any(k in text for k in ["install", "installation", "steps", "procedure", "runbook", "setup", "deploy"]):
-                s += 1.5
-
-        # Section hint
-        if any(k in text for k in ["prerequisites", "requirements", "overview", "installation steps"]):
-            s += 0.5
-
-        scored.append((s, d))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return scored[:top_k]
+    procedure_query = any(k in phrase for k in PROCEDURE_QUERY_TERMS)
+    variants = [(v, v.lstrip("v"), v.replace(".", "_")) for v in versions]
+    version_hits = [
+        sum(1 for vs in variants if any(x in text for x in vs)) for text in features.lowered
+    ] if variants else None
+
+    if HAS_NUMPY:
+        boost = 0.5 * features.section_mask
+        if procedure_query:
+            boost = boost + 1.5 * features.procedure_mask
+        if version_hits is not None:
+            boost = boost + 2.0 * np.array(version_hits, dtype=float)
+        return boost
+    boost = [0.5 if m else 0.0 for m in features.section_mask]
+    for i in range(len(docs)):
+        if procedure_query and features.procedure_mask[i]:
+            boost[i] += 1.5
+        if version_hits is not None:
+            boost[i] += 2.0 * version_hits[i]
+    return boost
+
+def _top_k(scores, docs: List[Dict[str, Any]], top_k: int) -> List[Tuple[float, Dict[str, Any]]]:
+    if HAS_NUMPY:
+        k = min(top_k, len(docs))
+        if k <= 0:
+            return []
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        return [(float(scores[i]), docs[i]) for i in idx]
+    ranked = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)[:top_k]
+    return [(scores[i], docs[i]) for i in ranked]
+
+def _bm25_search(query: str, docs: List[Dict[str, Any]], top_k: int = 7, bm25=None) -> List[Tuple[float, Dict[str, Any]]]:
+    """BM25 over docs; pass a prebuilt scorer (e.g. the persistent index) aligned with docs to skip building one."""
+    if not docs or (bm25 is None and not HAS_BM25):
+        return []
+    scores = _bm25_scores(query, docs, bm25)
+    boost = _boost_scores(query, docs)
+    if HAS_NUMPY:
+        total = scores + boost
+    else:
+        total = [a + b for a, b in zip(scores, boost)]
+    return _top_k(total, docs, top_k)
+
+_EMBEDDERS: Dict[str, OllamaEmbedder] = {}
+_COLLECTION = None
+
+def _vector_collection():
+    """The Chroma collection filled by KnowledgeBotCrew.embed_task, or None when there is nothing to search."""
+    global _COLLECTION
+    if _COLLECTION is None:
+        import chromadb
+        client = chromadb.PersistentClient(path=os.path.abspath(os.getenv("KB_CHROMA_DIR", "./kb_chroma")))
+        _COLLECTION = client.get_or_create_collection("knowledgebot_collection")
+    return _COLLECTION if _COLLECTION.count() else None
+
+def _vector_state() -> int:
+    """Chunks in the vector collection (0 when off); part of the retrieval cache key, so newly embedded chunks count."""
+    if os.getenv("KB_VECTOR_SEARCH", "1") == "0":
+        return 0
+    try:
+        collection = _vector_collection()
+        return collection.count() if collection is not None else 0
+    except Exception:
+        return 0
+
+_INDEX_VECTORS: Dict[str, Tuple[int, Dict[str, Dict[str, Any]]]] = {}
+
+def _index_vectors(index) -> Dict[str, Dict[str, Any]]:
+    """An index's current chunks keyed by their Chroma id, rebuilt once per index version."""
+    cached = _INDEX_VECTORS.get(index.folder)
+    if cached is None or cached[0] != index.version:
+        cached = _INDEX_VECTORS[index.folder] = (index.version, {chunk_id(d): d for d in index.chunks})
+    return cached[1]
+
+def _vector_search(query: str, top_k: int = 7, embed_model: Optional[str] = None,
+                   index=None) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    Nearest chunks by embedding; empty when vector search is disabled or unavailable.
+    The collection is shared by every folder ever embedded, so with `index` the query is limited
+    to that folder's files and hits that are not chunks of the current index version are dropped.
+    """
+    if os.getenv("KB_VECTOR_SEARCH", "1") == "0":
+        return []
+    current = None
+    where = None
+    if index is not None:
+        current = _index_vectors(index)
+        if not current:
+            return []
+        where = {"path": {"$in": sorted(index.files)}}
+    try:
+        collection = _vector_collection()
+        if collection is None:
+            return []
+        model = embed_model or os.getenv("KB_EMBED_MODEL", "nomic-embed-text")
+        embedder = _EMBEDDERS.get(model) or _EMBEDDERS.setdefault(model, OllamaEmbedder(model=model))
+        qvec = embedder.embed([query])[0]
+        res = collection.query(query_embeddings=[qvec], n_results=top_k, where=where)
+    except Exception as e:
+        print(f"[RAG] Vector search unavailable: {e}")
+        return []
+    ids = res.get("ids", [[]])[0]
+    texts = res.get("documents", [[]])[0]
+    metas = res.get("metadatas", [[]])[0]
+    dists = (res.get("distances") or [[0.0] * len(ids)])[0]
+    if current is None:
+        return [(-dist, {"id": cid, "content": text, "metadata": meta or {}})
+                for cid, text, meta, dist in zip(ids, texts, metas, dists)]
+    # Stale vectors of an edited file have ids the current index no longer produces
+    return [(-dist, current[cid]) for cid, dist in zip(ids, dists) if cid in current]
+
+def _rrf_fuse(rankings: List[List[Tuple[float, Dict[str, Any]]]], top_k: int = 7, k: int = RRF_K) -> List[Tuple[float, Dict[str, Any]]]:
+    """Reciprocal rank fusion: each list adds 1 / (k + rank) for the chunks it returns."""
+    fused: Dict[str, float] = {}
+    docs: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, (_, d) in enumerate(ranking, 1):
+            # Same id scheme as embed_task, so a chunk found by both retrievers is counted once
+            key = chunk_id(d)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(key, d)
+    ordered = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+    return [(score, docs[key]) for key, score in ordered]
+
+_VECTOR_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="kb-vector")
+
+def _hybrid_search(query: str, docs: List[Dict[str, Any]], top_k: int = 7, bm25=None,
+                   vector_search=None) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    Lexical and vector retrieval run concurrently and are fused with RRF.
+    Falls back to the lexical ranking alone when there are no vector results.
+    """
+    depth = max(top_k * 3, 20)
+    vector_future = _VECTOR_POOL.submit(vector_search or _vector_search, query, depth)
+    lexical = _bm25_search(query, docs, top_k=depth, bm25=bm25)
+    if not lexical:
+        lexical = _simple_search(query, docs, top_k=depth)
+    vector = vector_future.result()
+    if not vector:
+        return lexical[:top_k]
+    return _rrf_fuse([lexical, vector], top_k=top_k)
 
 def _simple_search(query: str, docs: List[Dict[str, Any]], top_k: int = 7) -> List[Tuple[float, Dict[str, Any]]]:
     q_terms = set(re.findall(r"\w+", (query or "").lower()))
@@ -141,17 +309,15 @@ def _simple_search(query: str, docs: List[Dict[str, Any]], top_k: int = 7) -> Li
     out.sort(key=lambda x: x[0], reverse=True)
     return out[:top_k]
 
-def _compose_contexts(chosen: List[Dict[str, Any]]) -> List[str]:
-    contexts: List[str] = []
-    for d in chosen:
-        md = d.get("metadata", {})
-        name = md.get("name", "unknown")
-        page = md.get("page")
-        header = f"Source: {name}" + (f" (page {page})" if page else "")
-        contexts.append(f"{header}\n\n{d['content']}")
-    return contexts
-
-def _ollama_chat_stream_or_json(base_url: str, payload: Dict[str, Any], timeout_connect: int = 20, timeout_read: int = 120) -> str:
+def _ollama_chat_stream(base_url: str, payload: Dict[str, Any], timeout_connect: int = 20, timeout_read: int = 120,
+                        status: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Yield answer text from /api/chat as Ollama produces it.
+    Closing the generator closes the HTTP response, which makes Ollama stop generating.
+    `status["complete"]` is set once Ollama's final frame arrives; a failure part-way through
+    ends the stream early with the reason in `status["error"]`.
+    """
+    status = status if status is not None else {}
     url = f"{base_url.rstrip('/')}/api/chat"
     payload = dict(payload)
     payload.setdefault("stream", True)
@@ -163,10 +329,13 @@ def _ollama_chat_stream_or_json(base_url: str, payload: Dict[str, Any], timeout_
             # Non-stream JSON
             if "application/json" in ctype and not r.headers.get("Transfer-Encoding") == "chunked":
                 jd = r.json()
-                return (jd.get("message", {}) or {}).get("content", "") or jd.get("response", "") or ""
+                content = (jd.get("message", {}) or {}).get("content", "") or jd.get("response", "") or ""
+                status["complete"] = bool(jd.get("done", True))
+                if content:
+                    yield content
+                return
 
             # Streaming JSONL
-            parts: List[str] = []
             for line in r.iter_lines(decode_unicode=True):
                 if not line:
                     continue
@@ -177,13 +346,16 @@ def _ollama_chat_stream_or_json(base_url: str, payload: Dict[str, Any], timeout_
                 msg = obj.get("message") or {}
                 content = msg.get("content") or ""
                 if content:
-                    parts.append(content)
+                    yield content
                 if obj.get("done"):
+                    status["complete"] = True
                     break
-            return "".join(parts).strip()
     except Exception as e:
+        status["error"] = str(e)
         print(f"[OLLAMA] Error: {e}")
-        return ""
+
+def _ollama_chat_stream_or_json(base_url: str, payload: Dict[str, Any], timeout_connect: int = 20, timeout_read: int = 120) -> str:
+    return "".join(_ollama_chat_stream(base_url, payload, timeout_connect, timeout_read)).strip()
 
 def _generate_simple_answer(query: str, contexts: List[str]) -> str:
     if not contexts:
@@ -199,12 +371,7 @@ def _generate_simple_answer(query: str, contexts: List[str]) -> str:
             return "Installation steps derived from context:\n- " + "\n- ".join(lines[:20])
     return f"Based on the context:\n\n{contexts[0][:900]}"
 
-def _generate_answer_with_ollama(query: str, contexts: List[str], base_url: str = None, model: str = "mistral") -> str:
-    base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://ollama-service.ollama.svc.cluster.local:11434")
-    if not contexts:
-        return "No relevant context was found to answer this question."
-
-    context_text = "\n\n---\n\n".join(contexts[:3])[:3500]
+def _build_messages(query: str, context_text: str) -> List[Dict[str, str]]:
     wants_steps = any(k in (query or "").lower() for k in ["install", "installation", "steps", "procedure", "runbook", "setup"])
     style_instr = (
         "Return numbered, actionable steps with prerequisites and post-checks. Cite the page next to each key item when available. "
@@ -216,23 +383,68 @@ def _generate_answer_with_ollama(query: str, contexts: List[str], base_url: str
         "If the context does not contain the answer, say exactly 'Not found in the provided context.'\n\n"
         f"Context:\n{context_text}\n\nQuestion: {query}\nAnswer:"
     )
+    return [
+        {"role": "system", "content": "You answer only from the provided context and never invent details."},
+        {"role": "user", "content": prompt},
+    ]
+
+def _prompt_tokens(query: str) -> int:
+    return sum(count_tokens(m["content"]) for m in _build_messages(query, "")) + PROMPT_MARGIN_TOKENS
+
+def _answer_tokens(query: str, num_ctx: int, max_tokens: int) -> int:
+    """`max_tokens`, reduced if needed so at least MIN_CONTEXT_SHARE of num_ctx is left for context."""
+    limit = num_ctx - _prompt_tokens(query) - int(num_ctx * MIN_CONTEXT_SHARE)
+    return max(1, min(max_tokens, limit))
+
+def _context_budget(query: str, num_ctx: int, max_tokens: int) -> int:
+    """Tokens left for context once the answer and the rest of the prompt have their share of num_ctx."""
+    return max(0, num_ctx - max_tokens - _prompt_tokens(query))
+
+def _generate_answer_stream(query: str, contexts: List[str], base_url: str = None, model: str = "mistral",
+                            status: Optional[Dict[str, Any]] = None, num_ctx: int = DEFAULT_NUM_CTX,
+                            max_tokens: int = DEFAULT_ANSWER_TOKENS) -> Iterator[str]:
+    """
+    Yield the answer as it is generated, or the extractive fallback if Ollama produces nothing.
+    `contexts` should already fit the budget (see pack_contexts); `status["fallback"]` is set
+    to True when the fallback was used, and `status["complete"]` / `status["error"]` as in
+    _ollama_chat_stream.
+    """
+    status = status if status is not None else {}
+    base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://ollama-service.ollama.svc.cluster.local:11434")
+    if not contexts:
+        yield "No relevant context was found to answer this question."
+        return
+
     payload = {
         "model": model,
-        "messages": [
-            {"role": "system", "content": "You answer only from the provided context and never invent details."},
-            {"role": "user", "content": prompt},
-        ],
+        "messages": _build_messages(query, "\n\n---\n\n".join(contexts)),
         "stream": True,
-        "options": {"temperature": 0.2, "num_predict": 700, "num_ctx": 4096},
+        "options": {"temperature": 0.2, "num_predict": max_tokens, "num_ctx": num_ctx},
     }
-    print(f"[OLLAMA] Querying {base_url} with model {model}")
-    answer = _ollama_chat_stream_or_json(base_url, payload)
-    if answer:
-        return answer.strip()
-    print("[OLLAMA] Falling back to simple answer")
-    return _generate_simple_answer(query, [c.split("\n\n", 1)[-1] for c in contexts])
-
-def process_query_direct(query: str, folder_path: str = "./knowledge") -> Dict[str, Any]:
+    print(f"[OLLAMA] Querying {base_url} with model {model} (num_ctx={num_ctx}, num_predict={max_tokens})")
+    produced = False
+    for piece in _ollama_chat_stream(base_url, payload, status=status):
+        if not produced and not piece.strip():
+            continue
+        produced = True
+        yield piece
+    if not produced:
+        print("[OLLAMA] Falling back to simple answer")
+        status["fallback"] = True
+        yield _generate_simple_answer(query, [c.split("\n\n", 1)[-1] for c in contexts])
+
+def _answer_complete(status: Dict[str, Any]) -> bool:
+    """True when the model finished its answer: final frame received, no error, no fallback."""
+    return bool(status.get("complete")) and not status.get("error") and not status.get("fallback")
+
+def _generate_answer_with_ollama(query: str, contexts: List[str], base_url: str = None, model: str = "mistral",
+                                status: Optional[Dict[str, Any]] = None, num_ctx: int = DEFAULT_NUM_CTX,
+                                max_tokens: int = DEFAULT_ANSWER_TOKENS) -> str:
+    return "".join(_generate_answer_stream(query, contexts, base_url=base_url, model=model, status=status,
+                                           num_ctx=num_ctx, max_tokens=max_tokens)).strip()
+
+def process_query_direct(query: str, folder_path: str = "./knowledge", num_ctx: Optional[int] = None,
+                         max_tokens: Optional[int] = None) -> Dict[str, Any]:
     folder_path = os.path.abspath(folder_path)
     intent = _detect_intent(query)
 
@@ -288,34 +500,126 @@ def process_query_direct(query: str, folder_path: str = "./knowledge") -> Dict[s
                 "sources": [{"intent": "list_projects", "base_path": base, "count": len(projects)}]}
 
     # RAG path
-    print("[RAG] Processing document search query...")
-    docs = _load_documents_from_folder(folder_path)
-    if not docs:
-        return {"answer": "No documents found to search. Please add files to your knowledge directory.",
-                "sources": [{"intent": "rag_no_docs"}]}
-
-    chosen_scored: List[Tuple[float, Dict[str, Any]]] = []
-    if HAS_BM25:
-        chosen_scored = _bm25_search(query, docs, top_k=7)
-    if not chosen_scored:
-        chosen_scored = _simple_search(query, docs, top_k=7)
-
-    if not chosen_scored:
-        return {"answer": f"I couldn't find information about '{query}' in your documents.",
-                "sources": [{"intent": "rag_no_results"}]}
-
-    chosen_docs = [d for _, d in chosen_scored[:5]]
-    contexts = _compose_contexts(chosen_docs)
+    retrieved = _retrieve(query, folder_path)
+    if "answer" in retrieved:
+        return retrieved
+    prepared = _prepare(query, retrieved, num_ctx, max_tokens)
+    cache = get_query_cache()
+    cached = cache.get_answer(retrieved["query"], prepared["ids"], prepared["cache_model"])
+    if cached is not None:
+        print("[CACHE] Answer hit")
+        return cached
     base_url = os.getenv("OLLAMA_BASE_URL", "").strip() or None
-    answer = _generate_answer_with_ollama(query, contexts, base_url=base_url, model=os.getenv("KB_MODEL", "mistral"))
-
+    status: Dict[str, Any] = {}
+    answer = _generate_answer_with_ollama(query, prepared["contexts"], base_url=base_url, model=prepared["model"],
+                                          status=status, num_ctx=prepared["num_ctx"], max_tokens=prepared["max_tokens"])
+    result = {"answer": answer, "sources": prepared["sources"] + [{"intent": "rag_query", **prepared["packing"]}]}
+    if _answer_complete(status):
+        cache.put_answer(retrieved["query"], prepared["ids"], prepared["cache_model"], result)
+    return result
+
+def _retrieve(query: str, folder_path: str) -> Dict[str, Any]:
+    """
+    Ranked chunks for a RAG query, or a final answer/sources dict when there is nothing to
+    answer from. Retrieval results are cached per index version and vector collection size.
+    """
+    print("[RAG] Processing document search query...")
+    index = _load_index(folder_path)
+    # A watcher may swap in a new version at any time; hold the views steady while searching
+    with index.lock:
+        docs = index.chunks
+        if not docs:
+            return {"answer": "No documents found to search. Please add files to your knowledge directory.",
+                    "sources": [{"intent": "rag_no_docs"}]}
+
+        cache = get_query_cache()
+        # Chunks embedded since the last query change the vector ranking, not the index version
+        version = (index.version, _vector_state())
+        entry = cache.get_retrieval(index.folder, version, query)
+        if entry is not None:
+            print("[CACHE] Retrieval hit")
+        else:
+            chosen_scored: List[Tuple[float, Dict[str, Any]]] = _hybrid_search(
+                query, docs, top_k=RETRIEVE_TOP_K, bm25=index,
+                vector_search=lambda q, k: _vector_search(q, k, index=index))
+            if not chosen_scored:
+                return {"answer": f"I couldn't find information about '{query}' in your documents.",
+                        "sources": [{"intent": "rag_no_results"}]}
+            chosen_docs = [d for _, d in chosen_scored]
+            entry = cache.put_retrieval(index.folder, version, query, chosen_docs, [chunk_id(d) for d in chosen_docs])
+    return {"docs": entry["docs"], "query": entry["query"], "ids": entry["ids"]}
+
+def _prepare(query: str, retrieved: Dict[str, Any], num_ctx: Optional[int], max_tokens: Optional[int]) -> Dict[str, Any]:
+    """Pack the retrieved chunks into the context budget and describe what was used."""
+    num_ctx = int(num_ctx or DEFAULT_NUM_CTX)
+    requested = int(max_tokens or DEFAULT_ANSWER_TOKENS)
+    max_tokens = _answer_tokens(query, num_ctx, requested)
+    if max_tokens < requested:
+        print(f"[RAG] Answer limit {requested} leaves too little room for context in num_ctx={num_ctx}; using {max_tokens}")
+    budget = _context_budget(query, num_ctx, max_tokens)
+    packed = pack_contexts(retrieved["docs"], budget)
+    print(f"[RAG] Packed {packed.chunks_used} chunks into {packed.tokens_used}/{budget} context tokens"
+          + (" (trimmed)" if packed.trimmed else ""))
     sources = []
-    for d in chosen_docs:
+    for d in packed.docs:
         md = d.get("metadata", {})
         sources.append({
             "name": md.get("name") or os.path.basename(md.get("path", "") or ""),
             "page": md.get("page"),
             "path": md.get("path"),
         })
-    return {"answer": answer, "sources": sources + [{"intent": "rag_query", "chunks_used": len(contexts)}]}
+    model = os.getenv("KB_MODEL", "mistral")
+    return {
+        "contexts": packed.contexts,
+        "sources": sources,
+        "ids": [chunk_id(d) for d in packed.docs],
+        "packing": {**packed.report(), "answer_tokens": max_tokens, "answer_tokens_requested": requested},
+        "model": model,
+        "num_ctx": num_ctx,
+        "max_tokens": max_tokens,
+        # The same chunks answered under a different model or budget may read differently
+        "cache_model": f"{model}:{num_ctx}:{max_tokens}",
+    }
 
+def process_query_stream(query: str, folder_path: str = "./knowledge", num_ctx: Optional[int] = None,
+                         max_tokens: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Like process_query_direct, but as events: {"type": "sources"} right after retrieval,
+    {"type": "token"} for each piece of the answer, then {"type": "done"} with the full result.
+    Closing the generator early aborts the Ollama request.
+    """
+    folder_path = os.path.abspath(folder_path)
+    if _detect_intent(query) != "rag_query":
+        yield {"type": "done", **process_query_direct(query, folder_path)}
+        return
+
+    print(f"[DIRECT] Streaming: '{query}'")
+    retrieved = _retrieve(query, folder_path)
+    if "answer" in retrieved:
+        yield {"type": "done", **retrieved}
+        return
+    prepared = _prepare(query, retrieved, num_ctx, max_tokens)
+    sources = prepared["sources"]
+    yield {"type": "sources", "sources": sources, "packing": prepared["packing"]}
+
+    cache = get_query_cache()
+    cached = cache.get_answer(retrieved["query"], prepared["ids"], prepared["cache_model"])
+    if cached is not None:
+        print("[CACHE] Answer hit")
+        yield {"type": "token", "text": cached["answer"]}
+        yield {"type": "done", **cached}
+        return
+
+    base_url = os.getenv("OLLAMA_BASE_URL", "").strip() or None
+    status: Dict[str, Any] = {}
+    parts: List[str] = []
+    for piece in _generate_answer_stream(query, prepared["contexts"], base_url=base_url, model=prepared["model"],
+                                         status=status, num_ctx=prepared["num_ctx"], max_tokens=prepared["max_tokens"]):
+        parts.append(piece)
+        yield {"type": "token", "text": piece}
+    result = {"answer": "".join(parts).strip(),
+              "sources": sources + [{"intent": "rag_query", **prepared["packing"]}]}
+    # Only complete model answers are reused; a cancelled stream never gets here
+    if _answer_complete(status):
+        cache.put_answer(retrieved["query"], prepared["ids"], prepared["cache_model"], result)
+    yield {"type": "done", **result}
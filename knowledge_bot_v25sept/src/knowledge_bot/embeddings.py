@@ -0,0 +1,282 @@
+# src/knowledge_bot/embeddings.py
+"""
+Batched, cached Ollama embeddings and batched upserts into Chroma.
+
+Texts are embedded in bounded batches with a few requests in flight. Every vector is cached
+in SQLite under (model, sha1(text)), and each batch is written to the cache as soon as it
+returns, so unchanged chunks are never re-embedded and an interrupted run resumes where it stopped.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import requests
+
+DEFAULT_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH", "32"))
+DEFAULT_CONCURRENCY = int(os.getenv("KB_EMBED_CONCURRENCY", "4"))
+DEFAULT_UPSERT_BATCH = int(os.getenv("KB_UPSERT_BATCH", "256"))
+DEFAULT_CACHE_PATH = os.getenv("KB_EMBED_CACHE", "./kb_index/embeddings.db")
+
+
+def text_sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EmbedStats:
+    """Counts for one embedding run; cached texts cost nothing, embedded ones cost a model call."""
+    texts: int = 0
+    unique: int = 0
+    cached: int = 0
+    embedded: int = 0
+    requests: int = 0
+    upserted: int = 0
+    skipped_existing: int = 0
+    deleted_stale: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "texts": self.texts,
+            "unique": self.unique,
+            "cached": self.cached,
+            "embedded": self.embedded,
+            "requests": self.requests,
+            "upserted": self.upserted,
+            "skipped_existing": self.skipped_existing,
+            "deleted_stale": self.deleted_stale,
+            "elapsed_s": round(elapsed, 2),
+            "embeddings_per_s": round(self.embedded / elapsed, 1),
+        }
+
+
+class EmbeddingCache:
+    """Vectors keyed by model and content hash, stored as float32 blobs in SQLite."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT,
+                    sha1 TEXT,
+                    vector BLOB,
+                    PRIMARY KEY (model, sha1)
+                )
+            """)
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with sqlite3.connect(self.path) as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                part = list(hashes[i:i + 500])
+                marks = ",".join("?" * len(part))
+                rows = conn.execute(
+                    f"SELECT sha1, vector FROM embeddings WHERE model = ? AND sha1 IN ({marks})", [model, *part]
+                ).fetchall()
+                for sha1, blob in rows:
+                    found[sha1] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: Sequence[Tuple[str, List[float]]]) -> None:
+        with self._lock, sqlite3.connect(self.path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, sha1, vector) VALUES (?, ?, ?)",
+                [(model, sha1, array("f", vector).tobytes()) for sha1, vector in items],
+            )
+
+    def count(self, model: Optional[str] = None) -> int:
+        with sqlite3.connect(self.path) as conn:
+            if model:
+                return conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (model,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class OllamaEmbedder:
+    """
+    Embeds texts with Ollama in batches of `batch_size`, with up to `concurrency` requests in flight.
+    Uses /api/embed and falls back to per-text /api/embeddings on servers that lack it.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: str = "nomic-embed-text",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        cache: Optional[EmbeddingCache] = None,
+        timeout: float = 180,
+        retries: int = 3,
+    ):
+        self.base_url = (base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")).rstrip("/")
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.timeout = timeout
+        self.retries = retries
+        self._local = threading.local()
+        self._legacy_api = False
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> requests.Response:
+        for attempt in range(self.retries):
+            try:
+                resp = self._session().post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+                if resp.status_code < 500:
+                    return resp
+            except requests.RequestException:
+                if attempt == self.retries - 1:
+                    raise
+            time.sleep(0.5 * 2 ** attempt)
+        return resp
+
+    def _embed_batch(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """Embed one batch, returning the vectors and the number of HTTP requests it took."""
+        if not self._legacy_api:
+            resp = self._post("/api/embed", {"model": self.model, "input": texts})
+            if resp.status_code == 200:
+                data = resp.json()
+                vectors = data.get("embeddings") or [item.get("embedding", []) for item in data.get("data", [])]
+                if len(vectors) == len(texts):
+                    return vectors, 1
+            elif resp.status_code != 404:
+                resp.raise_for_status()
+            print("[EMBED] /api/embed unavailable, falling back to /api/embeddings")
+            self._legacy_api = True
+        vectors = []
+        for text in texts:
+            resp = self._post("/api/embeddings", {"model": self.model, "prompt": text})
+            resp.raise_for_status()
+            vectors.append(resp.json().get("embedding", []))
+        return vectors, len(texts)
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        stats: Optional[EmbedStats] = None,
+        progress: Optional[Callable[[EmbedStats], None]] = None,
+    ) -> List[List[float]]:
+        """Vectors for `texts`, in order. Duplicates and cached texts are not sent to the model."""
+        stats = stats or EmbedStats()
+        hashes = [text_sha1(t) for t in texts]
+        unique: Dict[str, str] = dict(zip(hashes, texts))
+        stats.texts += len(texts)
+        stats.unique += len(unique)
+
+        vectors = self.cache.get_many(self.model, list(unique))
+        stats.cached += len(vectors)
+        missing = [h for h in unique if h not in vectors]
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as pool:
+                futures = {pool.submit(self._embed_batch, [unique[h] for h in batch]): batch for batch in batches}
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    batch_vectors, calls = future.result()
+                    self.cache.put_many(self.model, list(zip(batch, batch_vectors)))
+                    vectors.update(zip(batch, batch_vectors))
+                    stats.embedded += len(batch)
+                    stats.requests += calls
+                    if progress:
+                        progress(stats)
+        return [vectors[h] for h in hashes]
+
+
+def _existing_ids(collection, ids: List[str]) -> set:
+    found = set()
+    for i in range(0, len(ids), DEFAULT_UPSERT_BATCH):
+        try:
+            found.update(collection.get(ids=ids[i:i + DEFAULT_UPSERT_BATCH], include=[])["ids"])
+        except Exception:
+            return set()
+    return found
+
+
+def chunk_id(chunk: Dict[str, Any]) -> str:
+    """Stable Chroma id for a chunk: its source location plus a hash of its text."""
+    md = chunk.get("metadata", {})
+    where = f"{md.get('path') or md.get('name', '')}:{md.get('page') or 0}:{md.get('chunk_id', 0)}"
+    return text_sha1(where + "\n" + chunk["content"])
+
+
+def _delete_stale(collection, by_id: Dict[str, Dict[str, Any]]) -> int:
+    """Delete stored ids of the chunks' source paths that the new chunks no longer produce."""
+    paths = sorted({c.get("metadata", {}).get("path") for c in by_id.values()} - {None, ""})
+    stale: List[str] = []
+    for path in paths:
+        stale.extend(i for i in collection.get(where={"path": path}, include=[])["ids"] if i not in by_id)
+    for i in range(0, len(stale), DEFAULT_UPSERT_BATCH):
+        collection.delete(ids=stale[i:i + DEFAULT_UPSERT_BATCH])
+    return len(stale)
+
+
+def _clean_metadata(md: Dict[str, Any]) -> Dict[str, Any]:
+    # Chroma only accepts scalar metadata values
+    return {k: v for k, v in md.items() if isinstance(v, (str, int, float, bool))}
+
+
+def embed_chunks(
+    collection,
+    chunks: List[Dict[str, Any]],
+    embedder: OllamaEmbedder,
+    upsert_batch: int = DEFAULT_UPSERT_BATCH,
+    skip_existing: bool = True,
+    replace_paths: bool = False,
+) -> EmbedStats:
+    """
+    Embed chunks and upsert them into a Chroma collection in batches of `upsert_batch`.
+    Chunks whose id is already in the collection are skipped, so a rerun only does the remaining work.
+    With `replace_paths`, ids stored for the same source paths that these chunks no longer produce
+    (an edited file, or chunks written under an older id scheme) are deleted first.
+    """
+    stats = EmbedStats()
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for chunk in chunks:
+        by_id.setdefault(chunk_id(chunk), chunk)
+    ids = list(by_id)
+    if replace_paths and ids:
+        stats.deleted_stale = _delete_stale(collection, by_id)
+    if skip_existing and ids:
+        existing = _existing_ids(collection, ids)
+        stats.skipped_existing = len(existing)
+        ids = [i for i in ids if i not in existing]
+
+    last_report = [0.0]
+
+    def report(s: EmbedStats) -> None:
+        if time.perf_counter() - last_report[0] >= 2.0:
+            last_report[0] = time.perf_counter()
+            print(f"[EMBED] {s.embedded} embedded, {s.cached} cached, {s.as_dict()['embeddings_per_s']}/s")
+
+    for i in range(0, len(ids), upsert_batch):
+        part = ids[i:i + upsert_batch]
+        texts = [by_id[cid]["content"] for cid in part]
+        vectors = embedder.embed(texts, stats=stats, progress=report)
+        collection.upsert(
+            ids=part,
+            embeddings=vectors,
+            documents=texts,
+            metadatas=[_clean_metadata(by_id[cid].get("metadata", {})) for cid in part],
+        )
+        stats.upserted += len(part)
+    print(f"[EMBED] Done: {stats.as_dict()}")
+    return stats
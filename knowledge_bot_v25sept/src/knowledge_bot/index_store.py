@@ -0,0 +1,324 @@
+# src/knowledge_bot/index_store.py
+"""
+Persistent, incrementally updated chunk index for the direct RAG path.
+
+The index keeps every chunk together with its term frequencies, so BM25 statistics
+(document frequencies, lengths) are maintained as files come and go instead of being
+rebuilt per query. Files are fingerprinted with the size/mtime that LocalFileReader
+records, plus a content hash that is only computed when size or mtime change.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except Exception:
+    HAS_NUMPY = False
+
+from .tools.custom_tool import IngestStats, iter_local_files, parse_files
+from .chunking import content_hash
+
+INDEX_FORMAT = 1
+DEFAULT_INDEX_DIR = "./kb_index"
+
+# Okapi BM25 parameters, matching rank_bm25.BM25Okapi defaults
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+
+Chunker = Callable[[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def _file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class KnowledgeIndex:
+    """
+    Chunks of one knowledge folder plus the BM25 statistics over them.
+
+    `get_scores(tokens)` has the same contract as BM25Okapi.get_scores, with scores
+    aligned to `self.chunks`, so the index is a drop-in scorer for `_bm25_search`.
+    """
+
+    def __init__(self, folder: str, chunker: Chunker, chunker_version: str = "1", index_dir: Optional[str] = None):
+        self.folder = os.path.abspath(folder)
+        self.chunker = chunker
+        self.chunker_version = chunker_version
+        index_dir = index_dir or os.getenv("KB_INDEX_DIR", DEFAULT_INDEX_DIR)
+        key = hashlib.sha1(self.folder.encode("utf-8")).hexdigest()[:12]
+        self.path = os.path.join(os.path.abspath(index_dir), f"{key}.json")
+
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.store: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.updated_at = 0.0
+        # Held while the store and the views change; readers hold it while they use the views
+        self.lock = threading.RLock()
+        # Set while an IndexWatcher keeps this index current, so queries need not rescan
+        self.watched = False
+        self._load()
+        self._rebuild_views()
+
+    # ---------- persistence ----------
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[INDEX] Could not read {self.path}, rebuilding: {e}")
+            return
+        if data.get("format") != INDEX_FORMAT or data.get("chunker") != self.chunker_version:
+            print("[INDEX] Index format or chunker changed, rebuilding")
+            return
+        self.files = data.get("files", {})
+        self.store = data.get("chunks", {})
+        self.version = data.get("version", 0)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": INDEX_FORMAT,
+                "chunker": self.chunker_version,
+                "folder": self.folder,
+                "version": self.version,
+                "files": self.files,
+                "chunks": self.store,
+            }, f)
+        os.replace(tmp, self.path)
+
+    # ---------- incremental updates ----------
+
+    def refresh(self, paths: Optional[Iterable[str]] = None, workers: Optional[int] = None,
+                removed: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Bring the index in line with the folder: parse new and changed files, drop removed ones.
+        With `paths`, only those files are checked and only the files in `removed` are dropped.
+        Changed files are parsed in parallel (see parse_files) without holding the lock, so
+        queries keep running against the previous version until the new one is swapped in.
+        Files that could not be parsed (too large, timed out, failed) are recorded as skipped
+        with their fingerprint, so they are only retried once they change.
+        Returns counts of added, updated, removed, skipped and unchanged files.
+        """
+        started = time.perf_counter()
+        stats = {"added": 0, "updated": 0, "removed": 0, "skipped": 0, "unchanged": 0}
+        touched = False
+        seen = set()
+        changed: Dict[str, tuple] = {}
+        for path in (paths if paths is not None else iter_local_files(self.folder)):
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            known = self.files.get(path)
+            if known and known["size"] == st.st_size and known["mtime"] == st.st_mtime:
+                stats["unchanged"] += 1
+                continue
+            sha1 = _file_sha1(path)
+            if known and known["sha1"] == sha1:
+                # Touched but not modified: only the fingerprint moves
+                known["mtime"] = st.st_mtime
+                stats["unchanged"] += 1
+                touched = True
+                continue
+            changed[path] = (st.st_size, st.st_mtime, sha1)
+
+        parsed = []
+        skipped: Dict[str, str] = {}
+        if changed:
+            ingest = IngestStats()
+            parsed = list(parse_files(list(changed), workers=workers, stats=ingest))
+            print(f"[INGEST] {ingest.as_dict()}")
+            for reason, failed in (("too_large", ingest.files_too_large), ("timed_out", ingest.files_timed_out),
+                                   ("failed", ingest.files_failed)):
+                skipped.update((path, reason) for path in failed if path in changed)
+
+        if paths is None:
+            gone = [p for p in self.files if p not in seen]
+        else:
+            gone = [p for p in (removed or ()) if p in self.files]
+
+        with self.lock:
+            for path, docs in parsed:
+                size, mtime, sha1 = changed[path]
+                stats["updated" if path in self.files else "added"] += 1
+                self._remove_file(path)
+                self._add_file(path, size, mtime, sha1, docs)
+            for path, reason in skipped.items():
+                size, mtime, sha1 = changed[path]
+                had_chunks = bool(self.files.get(path, {}).get("chunk_ids"))
+                self._remove_file(path)
+                self.files[path] = {"size": size, "mtime": mtime, "sha1": sha1, "chunk_ids": [], "skipped": reason}
+                stats["skipped"] += 1
+                touched = True
+                if had_chunks:
+                    stats["removed"] += 1
+            for path in gone:
+                self._remove_file(path)
+                stats["removed"] += 1
+
+            if stats["added"] or stats["updated"] or stats["removed"]:
+                self.version += 1
+                self._rebuild_views()
+                self.save()
+                print(f"[INDEX] Refreshed in {time.perf_counter() - started:.2f}s: {stats}, {len(self.chunks)} chunks")
+            elif touched:
+                self.save()
+        self.updated_at = time.time()
+        return stats
+
+    def file_chunks(self, path: str) -> List[Dict[str, Any]]:
+        """Stored chunks of one file, in the shape the embedding stage takes."""
+        with self.lock:
+            entry = self.files.get(path) or {}
+            return [{"content": self.store[cid]["content"], "metadata": self.store[cid]["metadata"]}
+                    for cid in entry.get("chunk_ids", []) if cid in self.store]
+
+    def _add_file(self, path: str, size: int, mtime: float, sha1: str, docs: List[Dict[str, Any]]) -> None:
+        chunk_ids: List[str] = []
+        prefix = hashlib.sha1(path.encode("utf-8")).hexdigest()[:10]
+        for doc in docs:
+            for chunk in self.chunker(doc):
+                md = chunk["metadata"]
+                chunk_id = f"{prefix}:{md.get('page') or 0}:{md.get('chunk_id', len(chunk_ids))}"
+                tokens = _tokenize(chunk["content"])
+                self.store[chunk_id] = {
+                    "content": chunk["content"],
+                    "metadata": md,
+                    "tf": dict(Counter(tokens)),
+                    "length": len(tokens),
+                    "hash": content_hash(chunk["content"]),
+                }
+                chunk_ids.append(chunk_id)
+        self.files[path] = {"size": size, "mtime": mtime, "sha1": sha1, "chunk_ids": chunk_ids}
+
+    def _remove_file(self, path: str) -> None:
+        entry = self.files.pop(path, None)
+        if not entry:
+            return
+        for chunk_id in entry["chunk_ids"]:
+            self.store.pop(chunk_id, None)
+
+    # ---------- query-side views ----------
+
+    def _rebuild_views(self) -> None:
+        """
+        Derive the ordered chunk list, postings and IDF table from the stored chunks.
+        A chunk whose text already appears in another file is kept in the store but left out of
+        the views, so removing the first copy brings the next one back.
+        """
+        self.chunk_ids: List[str] = []
+        seen = set()
+        for cid in sorted(self.store):
+            h = self.store[cid].get("hash") or content_hash(self.store[cid]["content"])
+            if h not in seen:
+                seen.add(h)
+                self.chunk_ids.append(cid)
+        self.duplicates = len(self.store) - len(self.chunk_ids)
+        self.chunks: List[Dict[str, Any]] = [
+            {"id": cid, "content": self.store[cid]["content"], "metadata": self.store[cid]["metadata"]}
+            for cid in self.chunk_ids
+        ]
+        self.doc_len: List[int] = [self.store[cid]["length"] for cid in self.chunk_ids]
+        self.avgdl = (sum(self.doc_len) / len(self.doc_len)) if self.doc_len else 0.0
+
+        self.postings: Dict[str, List[tuple]] = {}
+        self._term_cache: Dict[str, tuple] = {}
+        for pos, cid in enumerate(self.chunk_ids):
+            for term, tf in self.store[cid]["tf"].items():
+                self.postings.setdefault(term, []).append((pos, tf))
+
+        n = len(self.chunk_ids)
+        self.idf: Dict[str, float] = {}
+        negative: List[str] = []
+        for term, plist in self.postings.items():
+            value = math.log(n - len(plist) + 0.5) - math.log(len(plist) + 0.5)
+            self.idf[term] = value
+            if value < 0:
+                negative.append(term)
+        average_idf = (sum(self.idf.values()) / len(self.idf)) if self.idf else 0.0
+        for term in negative:
+            self.idf[term] = BM25_EPSILON * average_idf
+
+    def _term_weights(self, term: str):
+        """Positions and BM25 contributions of one term, computed once per index version."""
+        cached = self._term_cache.get(term)
+        if cached is None:
+            idf = self.idf[term]
+            positions, contributions = [], []
+            for pos, tf in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[pos] / self.avgdl)
+                positions.append(pos)
+                contributions.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+            if HAS_NUMPY:
+                positions, contributions = np.array(positions), np.array(contributions)
+            cached = self._term_cache[term] = (positions, contributions)
+        return cached
+
+    def get_scores(self, tokens: List[str]):
+        """
+        BM25 score of every chunk for the query tokens, touching only the postings of those tokens.
+        Repeated tokens are scored once and weighted by their count.
+        """
+        n = len(self.chunk_ids)
+        scores = np.zeros(n) if HAS_NUMPY else [0.0] * n
+        if not self.avgdl:
+            return scores
+        for token, count in Counter(tokens).items():
+            if token not in self.postings:
+                continue
+            positions, contributions = self._term_weights(token)
+            if HAS_NUMPY:
+                # Positions are unique within a posting list, so fancy-index add is safe
+                scores[positions] += count * contributions
+            else:
+                for pos, value in zip(positions, contributions):
+                    scores[pos] += count * value
+        return scores
+
+    def freshness(self) -> Dict[str, Any]:
+        return {
+            "folder": self.folder,
+            "version": self.version,
+            "files": len(self.files),
+            "chunks": len(self.chunks),
+            "duplicate_chunks": self.duplicates,
+            "skipped_files": sum(1 for entry in self.files.values() if entry.get("skipped")),
+            "index_path": self.path,
+            "updated_at": self.updated_at,
+        }
+
+
+_INDEXES: Dict[str, KnowledgeIndex] = {}
+
+
+def get_index(folder: str, chunker: Chunker, chunker_version: str = "1") -> KnowledgeIndex:
+    """Return the process-wide index for a folder, loading it from disk on first use."""
+    key = os.path.abspath(folder)
+    index = _INDEXES.get(key)
+    if index is None or index.chunker_version != chunker_version:
+        index = KnowledgeIndex(key, chunker, chunker_version)
+        _INDEXES[key] = index
+    return index
@@ -1,12 +1,14 @@
 # src/knowledge_bot/main.py
 import os
 import socket
+import time
 import gradio as gr
 from dotenv import load_dotenv
 
 # Import both versions - crew for complex queries, direct for simple ones  
 from knowledge_bot.crew import KnowledgeBotCrew
-from knowledge_bot.crew_simple import process_query_direct, _detect_intent
+from knowledge_bot.crew_simple import process_query_direct, process_query_stream, _detect_intent
+from knowledge_bot.watcher import start_watcher, watcher_status
 
 load_dotenv()
 
@@ -46,6 +48,12 @@ def _drive_connect_and_list_root():
     except Exception as e:
         return gr.update(choices=[]), f"Drive error: {e}"
 
+def _index_status(knowledge_dir):
+    """Freshness and lag of the watched index for the knowledge directory."""
+    import json
+    folder = os.path.abspath((knowledge_dir or DEFAULT_KNOWLEDGE_DIR).strip())
+    return json.dumps(watcher_status(folder), indent=2)
+
 def kickoff_pipeline(
     query,
     folder_path,
@@ -63,10 +71,11 @@ def kickoff_pipeline(
     continue_segments,
     num_ctx,
 ):
-    """Execute the pipeline - uses direct processor for all queries now."""
+    """Execute the pipeline, streaming the answer: sources first, then tokens as Ollama produces them."""
     
     if not query or not query.strip():
-        return "Please enter a query."
+        yield "Please enter a query."
+        return
     
     # Set up the knowledge directory
     knowledge_path = (knowledge_dir or DEFAULT_KNOWLEDGE_DIR).strip()
@@ -79,35 +88,52 @@ def kickoff_pipeline(
     print(f"[MAIN] Processing query: '{query}'")
     print(f"[MAIN] Using folder: {folder_to_use}")
     
+    yield "🔎 Searching your documents..."
+    events = process_query_stream(query, folder_to_use, num_ctx=num_ctx, max_tokens=answer_max_tokens)
+    header, answer, footer, last_render = "", "", "", 0.0
     try:
-        # Use our working direct processor for all queries
-        result = process_query_direct(query, folder_to_use)
-        
-        # Extract the answer
-        answer = result.get("answer", "No answer generated")
-        sources = result.get("sources", [])
+        for event in events:
+            if event["type"] == "sources":
+                # Show where the answer comes from before the model starts talking
+                source_files = [s.get("name", "unknown") for s in event["sources"] if s.get("name")]
+                if source_files:
+                    header = f"📄 Sources: {', '.join(source_files[:3])}\n\n"
+                packing = event.get("packing") or {}
+                if packing:
+                    footer = f"\n\n🧮 Context: {packing['context_tokens']}/{packing['context_budget']} tokens from {packing['chunks_used']} chunks"
+                    if packing.get("answer_tokens", 0) < packing.get("answer_tokens_requested", 0):
+                        footer += (f"\n⚠️ Answer limit lowered to {packing['answer_tokens']} tokens to leave room for "
+                                   "context; raise the context window for longer answers")
+                yield header + "✍️ Generating answer..."
+            elif event["type"] == "token":
+                answer += event["text"]
+                # Re-rendering the textbox per token is wasteful; a few updates per second reads as live
+                if time.monotonic() - last_render >= 0.05:
+                    last_render = time.monotonic()
+                    yield header + answer
+            elif event["type"] == "done":
+                answer = event.get("answer", "No answer generated")
         
-        # Add source information to the answer if available
-        if sources and any(s.get("intent") == "rag_query" for s in sources):
-            source_files = [s.get("name", "unknown") for s in sources if s.get("name")]
-            if source_files:
-                answer += f"\n\n📄 Sources: {', '.join(source_files[:3])}"
+        result = header + answer + footer
         
         # Save to markdown if requested
         if save_markdown and save_markdown.strip():
             try:
                 with open(save_markdown.strip(), 'w', encoding='utf-8') as f:
                     f.write(f"# Query: {query}\n\n{answer}\n")
-                answer += f"\n\n💾 Saved to: {save_markdown.strip()}"
+                result += f"\n\n💾 Saved to: {save_markdown.strip()}"
             except Exception as e:
-                answer += f"\n\n❌ Error saving to file: {e}"
+                result += f"\n\n❌ Error saving to file: {e}"
         
-        return answer
+        yield result
         
     except Exception as e:
         error_msg = f"Error processing query: {str(e)}"
         print(f"[MAIN] Error: {error_msg}")
-        return error_msg
+        yield error_msg
+    finally:
+        # On Stop, Gradio drops this generator; closing the inner one aborts the Ollama request
+        events.close()
 
 # Gradio UI
 with gr.Blocks(title="KnowledgeBot - Enhanced AI Assistant", theme=gr.themes.Soft()) as demo:
@@ -148,6 +174,11 @@ with gr.Blocks(title="KnowledgeBot - Enhanced AI Assistant", theme=gr.themes.Sof
             value=DEFAULT_KNOWLEDGE_DIR,
             placeholder="Path to your knowledge base folder"
         )
+        
+        with gr.Row():
+            status_btn = gr.Button("📈 Index status")
+            index_status = gr.Code(label="Index freshness", language="json")
+            status_btn.click(fn=_index_status, inputs=[knowledge_dir], outputs=index_status)
     
     with gr.Accordion("🔧 Model Configuration", open=False):
         with gr.Row():
@@ -212,7 +243,9 @@ with gr.Blocks(title="KnowledgeBot - Enhanced AI Assistant", theme=gr.themes.Sof
             )
     
     # Execute button and output
-    run_btn = gr.Button("🚀 Run Query", variant="primary", size="lg")
+    with gr.Row():
+        run_btn = gr.Button("🚀 Run Query", variant="primary", size="lg")
+        stop_btn = gr.Button("⏹ Stop", size="lg")
     
     # Output with better formatting
     output = gr.Textbox(
@@ -224,7 +257,7 @@ with gr.Blocks(title="KnowledgeBot - Enhanced AI Assistant", theme=gr.themes.Sof
     )
     
     # Wire up the interface
-    run_btn.click(
+    run_event = run_btn.click(
         kickoff_pipeline,
         inputs=[
             query, folder, github, model, save_md, embed_model, 
@@ -235,7 +268,7 @@ with gr.Blocks(title="KnowledgeBot - Enhanced AI Assistant", theme=gr.themes.Sof
     )
     
     # Allow Enter key to submit
-    query.submit(
+    submit_event = query.submit(
         kickoff_pipeline,
         inputs=[
             query, folder, github, model, save_md, embed_model, 
@@ -244,6 +277,9 @@ with gr.Blocks(title="KnowledgeBot - Enhanced AI Assistant", theme=gr.themes.Sof
         ],
         outputs=output
     )
+    
+    # Cancelling stops the generator, which closes the Ollama stream
+    stop_btn.click(fn=None, inputs=None, outputs=None, cancels=[run_event, submit_event])
 
 def run():
     """CLI entry point for crew execution."""
@@ -256,6 +292,9 @@ def run():
     print(result.get("answer", "No answer"))
 
 if __name__ == "__main__":
+    if os.getenv("KB_WATCH", "1") != "0":
+        # Keep the default knowledge folder indexed in the background so queries skip ingestion
+        start_watcher(DEFAULT_KNOWLEDGE_DIR)
     port = find_free_port()
     print(f"🚀 Starting KnowledgeBot on port {port}")
     print(f"🌐 Access at: http://0.0.0.0:{port}")
@@ -0,0 +1,184 @@
+# src/knowledge_bot/query_cache.py
+"""
+Two-level cache for the direct RAG path.
+
+Level 1 maps (folder, index version, normalized query) to the retrieved chunks, so a repeat
+question skips retrieval. Level 2 maps (normalized query, chunk ids, model) to the final
+answer, so it also skips generation. Because the index version is part of the level-1 key,
+any change to the knowledge folder makes old entries unreachable; they are purged when the
+new version is first seen. The version can be any hashable value; crew_simple passes the index
+version together with the vector collection size. Both levels are in-memory LRUs with a TTL.
+
+With KB_CACHE_SEMANTIC=1, a level-1 miss also compares the query embedding against cached
+queries for the same index version and reuses the closest one above a cosine threshold, so
+"install steps for X 1.2" and "what are the installation steps for X 1.2?" share an answer.
+"""
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_SIZE = int(os.getenv("KB_CACHE_SIZE", "512"))
+DEFAULT_TTL = float(os.getenv("KB_CACHE_TTL", "3600"))
+SEMANTIC_THRESHOLD = float(os.getenv("KB_CACHE_SEMANTIC_THRESHOLD", "0.95"))
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and punctuation-insensitive form of a query."""
+    return " ".join(re.findall(r"[\w.]+", (query or "").lower())).strip(".")
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    return dot / (na * nb) if na and nb else 0.0
+
+
+class LRUCache:
+    """Least-recently-used mapping whose entries also expire `ttl` seconds after being stored."""
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or self.clock() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (self.clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        with self._lock:
+            now = self.clock()
+            return [(k, v) for k, (stored, v) in self._data.items() if now - stored <= self.ttl]
+
+    def discard(self, predicate: Callable[[Any], bool]) -> int:
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class QueryCache:
+    """Retrieval and answer caches keyed as described in the module docstring."""
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE, ttl: float = DEFAULT_TTL,
+                 embed: Optional[Callable[[str], List[float]]] = None,
+                 semantic_threshold: float = SEMANTIC_THRESHOLD):
+        self.retrieval = LRUCache(maxsize, ttl)
+        self.answers = LRUCache(maxsize, ttl)
+        self.embed = embed
+        self.semantic_threshold = semantic_threshold
+        self.semantic_hits = 0
+        self._versions: Dict[str, Hashable] = {}
+
+    def _check_version(self, folder: str, version: Hashable) -> None:
+        """Purge a folder's retrieval entries the first time a newer index version shows up."""
+        if self._versions.get(folder) != version:
+            self._versions[folder] = version
+            self.retrieval.discard(lambda k: k[0] == folder and k[1] != version)
+
+    def get_retrieval(self, folder: str, version: Hashable, query: str) -> Optional[Dict[str, Any]]:
+        """Cached {"query", "ids", "docs", "vector"} for the query, or None."""
+        self._check_version(folder, version)
+        normalized = normalize_query(query)
+        entry = self.retrieval.get((folder, version, normalized))
+        if entry is not None or self.embed is None:
+            return entry
+        try:
+            vector = self.embed(normalized)
+        except Exception as e:
+            print(f"[CACHE] Semantic lookup unavailable: {e}")
+            return None
+        best, best_score = None, self.semantic_threshold
+        for (f, v, _), candidate in self.retrieval.items():
+            if f == folder and v == version and candidate.get("vector"):
+                score = _cosine(vector, candidate["vector"])
+                if score >= best_score:
+                    best, best_score = candidate, score
+        if best is not None:
+            self.semantic_hits += 1
+            print(f"[CACHE] Near-duplicate of '{best['query']}' (cosine {best_score:.3f})")
+            # Remember the alias so the next identical question is an exact hit
+            self.retrieval.put((folder, version, normalized), best)
+        return best
+
+    def put_retrieval(self, folder: str, version: Hashable, query: str, docs: List[Dict[str, Any]], ids: List[str]) -> Dict[str, Any]:
+        normalized = normalize_query(query)
+        vector = None
+        if self.embed is not None:
+            try:
+                vector = self.embed(normalized)
+            except Exception:
+                vector = None
+        entry = {"query": normalized, "ids": list(ids), "docs": docs, "vector": vector}
+        self.retrieval.put((folder, version, normalized), entry)
+        return entry
+
+    def get_answer(self, query: str, ids: Sequence[str], model: str) -> Optional[Dict[str, Any]]:
+        return self.answers.get((normalize_query(query), tuple(ids), model))
+
+    def put_answer(self, query: str, ids: Sequence[str], model: str, result: Dict[str, Any]) -> None:
+        self.answers.put((normalize_query(query), tuple(ids), model), result)
+
+    def clear(self) -> None:
+        self.retrieval.clear()
+        self.answers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retrieval_entries": len(self.retrieval),
+            "retrieval_hits": self.retrieval.hits,
+            "retrieval_misses": self.retrieval.misses,
+            "semantic_hits": self.semantic_hits,
+            "answer_entries": len(self.answers),
+            "answer_hits": self.answers.hits,
+            "answer_misses": self.answers.misses,
+        }
+
+
+_CACHE: Optional[QueryCache] = None
+
+
+def get_query_cache() -> QueryCache:
+    """Process-wide cache; KB_CACHE=0 disables it by returning a zero-size cache."""
+    global _CACHE
+    if _CACHE is None:
+        embed = None
+        if os.getenv("KB_CACHE_SEMANTIC", "0") == "1":
+            from .embeddings import OllamaEmbedder
+            embedder = OllamaEmbedder(model=os.getenv("KB_EMBED_MODEL", "nomic-embed-text"))
+            embed = lambda text: embedder.embed([text])[0]
+        size = DEFAULT_SIZE if os.getenv("KB_CACHE", "1") != "0" else 0
+        _CACHE = QueryCache(maxsize=size, embed=embed)
+    return _CACHE
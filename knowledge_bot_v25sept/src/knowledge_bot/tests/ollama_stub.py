@@ -0,0 +1,196 @@
+"""
+Stub Ollama server for exercising the embedding stage and answer streaming without a model.
+Serves /api/embed and /api/embeddings with deterministic hash-based vectors, and /api/chat
+streaming a canned answer one word at a time.
+
+Run the self-check: python -m knowledge_bot.tests.ollama_stub
+Or serve only:      python -m knowledge_bot.tests.ollama_stub --serve --port 11435
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+DIM = 64
+
+
+def fake_vector(text: str, dim: int = DIM) -> List[float]:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128.0 for i in range(dim)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    calls = {"embed": 0, "embeddings": 0, "texts": 0, "chat": 0, "chat_aborted": 0}
+    latency = 0.0
+    answer = " ".join(f"step{i}" for i in range(200))
+    # Drop the connection after this many words, as a crashed or restarted Ollama would
+    truncate_after = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        if self.path == "/api/embed":
+            texts = payload.get("input") or []
+            texts = [texts] if isinstance(texts, str) else texts
+            self.calls["embed"] += 1
+            self.calls["texts"] += len(texts)
+            self._reply(200, {"model": payload.get("model"), "embeddings": [fake_vector(t) for t in texts]})
+        elif self.path == "/api/chat":
+            self.calls["chat"] += 1
+            self._stream_chat(payload.get("model"))
+        elif self.path == "/api/embeddings":
+            self.calls["embeddings"] += 1
+            self.calls["texts"] += 1
+            self._reply(200, {"embedding": fake_vector(payload.get("prompt", ""))})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def _stream_chat(self, model: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, word in enumerate(self.answer.split(" ")):
+                if self.truncate_after is not None and i == self.truncate_after:
+                    self.close_connection = True
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    return
+                self._chunk({"model": model, "message": {"role": "assistant", "content": word + " "}, "done": False})
+                time.sleep(self.latency / 10)
+            self._chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client hung up mid-answer, as Ollama sees a cancelled request
+            self.calls["chat_aborted"] += 1
+
+    def _chunk(self, obj: dict) -> None:
+        line = (json.dumps(obj) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+
+def start_stub(port: int = 0, latency: float = 0.0, background: bool = True) -> ThreadingHTTPServer:
+    """
+    Bind the stub and, with `background`, serve it from a daemon thread; the bound port is
+    server.server_address[1]. Without it the caller runs server.serve_forever() itself.
+    """
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class _ListCollection:
+    """Just enough of a Chroma collection for embed_chunks and the index watcher."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, ids=None, where=None, include=None):
+        if where is not None:
+            return {"ids": [i for i, (_, _, m) in self.rows.items() if all(m.get(k) == v for k, v in where.items())]}
+        return {"ids": [i for i in ids if i in self.rows]}
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for i, e, d, m in zip(ids, embeddings, documents, metadatas):
+            self.rows[i] = (e, d, m)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per request")
+    args = parser.parse_args()
+
+    server = start_stub(args.port, args.latency, background=not args.serve)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    if args.serve:
+        print(f"Stub Ollama listening on {base_url}")
+        server.serve_forever()
+        return
+
+    from knowledge_bot.embeddings import EmbeddingCache, OllamaEmbedder, embed_chunks
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(os.path.join(tmp, "embeddings.db"))
+        embedder = OllamaEmbedder(base_url=base_url, batch_size=16, concurrency=4, cache=cache)
+        chunks = [{"content": f"chunk number {i}", "metadata": {"path": "doc.txt", "chunk_id": i}} for i in range(500)]
+
+        first = embed_chunks(_ListCollection(), chunks, embedder)
+        assert first.embedded == 500 and first.requests == 32, first.as_dict()
+        assert StubHandler.calls["embed"] == 32, StubHandler.calls
+
+        # A fresh collection with a warm cache needs no model calls
+        second = embed_chunks(_ListCollection(), chunks, embedder)
+        assert second.cached == 500 and second.embedded == 0, second.as_dict()
+
+        # Re-running against the same collection skips what is already stored
+        collection = _ListCollection()
+        embed_chunks(collection, chunks[:200], embedder)
+        third = embed_chunks(collection, chunks, embedder)
+        assert third.skipped_existing == 200 and third.upserted == 300, third.as_dict()
+
+        # Ids left by an older id scheme or an earlier version of the file are replaced, not kept
+        collection.upsert(ids=["legacy-id"], embeddings=[[0.0]], documents=["old"], metadatas=[{"path": "doc.txt"}])
+        fourth = embed_chunks(collection, chunks[:100], embedder, replace_paths=True)
+        assert fourth.deleted_stale == 401 and len(collection.rows) == 100, fourth.as_dict()
+
+        cached = embedder.embed(["chunk number 7"])[0]
+        assert max(abs(a - b) for a, b in zip(cached, fake_vector("chunk number 7"))) < 1e-6
+
+        # Streaming: pieces arrive one by one, and closing the stream early hangs up on the server
+        from knowledge_bot.crew_simple import _ollama_chat_stream
+        payload = {"model": "stub", "messages": [{"role": "user", "content": "hi"}]}
+        started = time.perf_counter()
+        stream = _ollama_chat_stream(base_url, payload)
+        first_piece = next(stream)
+        time_to_first = time.perf_counter() - started
+        assert first_piece == "step0 ", first_piece
+        stream.close()
+        time.sleep(2 * args.latency + 0.2)
+        assert StubHandler.calls["chat_aborted"] == 1, StubHandler.calls
+        status = {}
+        full = "".join(_ollama_chat_stream(base_url, payload, status=status)).strip()
+        assert full == StubHandler.answer, full[:80]
+        assert status.get("complete") and not status.get("error"), status
+
+        # A connection lost mid-answer ends the stream without the final frame, so it is not complete
+        from knowledge_bot.crew_simple import _answer_complete, _generate_answer_stream
+        StubHandler.truncate_after = 5
+        status = {}
+        partial = "".join(_generate_answer_stream("hi", ["context"], base_url=base_url, model="stub", status=status))
+        StubHandler.truncate_after = None
+        assert partial.strip() == "step0 step1 step2 step3 step4", partial[:80]
+        assert not _answer_complete(status), status
+
+        print(json.dumps({"status": "ok", "cold": first.as_dict(), "warm": second.as_dict(),
+                          "time_to_first_token_s": round(time_to_first, 3)}))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Retrieval quality and latency benchmark for the direct RAG path.
+
+Builds a fixture corpus (versioned install guides, FAQs, config tables, and component runbooks
+from hybrid_benchmark.build_corpus as distractors) with a labelled question set, including the version-number and install-procedure queries the
+boosting code targets, then measures for each retriever:
+
+  recall@1/3/5, MRR@10, index build time and peak memory, query p50/p95 latency.
+
+Peak memory is traced Python allocations in this process; file parsing that runs in worker
+processes is not traced, so a step that starts workers also reports their peak RSS.
+
+Retrievers: _bm25_search over the persistent KnowledgeIndex, _simple_search over the loaded
+chunks, Chroma (in-memory client) and _hybrid_search fusing BM25 with Chroma. Chroma uses a
+hashed bag-of-words embedding so the run stays offline; pass --embedder ollama to embed with
+the real model instead. Chroma is reported as skipped when chromadb is not installed.
+
+Run: python -m knowledge_bot.tests.retrieval_benchmark [--scale 4] [--out report.json] [--baseline old.json]
+Own corpus: --corpus ./knowledge --questions questions.json, where each question is
+  {"query": "...", "relevant": [{"file": "guide.pdf", "needle": "optional text in the chunk"}]}
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from knowledge_bot import crew_simple
+from knowledge_bot.crew_simple import (
+    _bm25_search, _hybrid_search, _load_documents_from_folder, _simple_search,
+)
+from knowledge_bot.chunking import CHUNKER_VERSION, chunk_document
+from knowledge_bot.embeddings import chunk_id
+from knowledge_bot.index_store import KnowledgeIndex
+from knowledge_bot.tests.hybrid_benchmark import FILLER, build_corpus
+
+KS = (1, 3, 5)
+MRR_DEPTH = 10
+HASH_DIM = 256
+
+PRODUCTS = ["orion", "vega", "lyra", "draco", "pyxis", "cetus", "hydra", "norma", "tucana", "carina"]
+SETTINGS = ["max_connections", "cache_size_mb", "worker_threads", "request_timeout_s", "log_retention_days"]
+
+Searcher = Callable[[str], List[Tuple[float, Dict[str, Any]]]]
+
+
+# ---------- fixture corpus ----------
+
+def _filler(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(FILLER) for _ in range(words)).capitalize() + "."
+
+
+def _install_guide(rng: random.Random, product: str, version: str, memory: int) -> str:
+    # Guides for different versions of a product share almost all of their text on purpose
+    return "\n".join([
+        f"# {product.capitalize()} {version} Installation Guide",
+        "",
+        "## Overview",
+        f"{product.capitalize()} is the {rng.choice(FILLER)} service of the platform. {_filler(rng, 40)}",
+        "",
+        "## Prerequisites",
+        f"- {product.capitalize()} {version} requires {memory} GB of memory per node.",
+        "- A running cluster with storage provisioned.",
+        "- Access to the internal image registry.",
+        "",
+        "## Installation steps",
+        f"1. Download the {product} {version} bundle from the registry.",
+        "2. Unpack it on the first node and review the configuration file.",
+        f"3. Run the installer: {product}-setup --version {version} --accept-license",
+        f"4. Verify with {product}-ctl status until every node reports ready.",
+        "",
+        "## Upgrade notes",
+        _filler(rng, 50),
+        "",
+    ])
+
+
+def _faq(rng: random.Random, product: str, codes: List[str]) -> str:
+    lines = [f"# {product.capitalize()} troubleshooting FAQ", ""]
+    for code in codes:
+        lines += [f"## Error {code}",
+                  f"Error {code} in {product} means the {rng.choice(FILLER)} {rng.choice(FILLER)} could not be reached. "
+                  f"{_filler(rng, 30)}", ""]
+    return "\n".join(lines)
+
+
+def _config_table(product: str, defaults: Dict[str, int]) -> str:
+    lines = [f"# {product.capitalize()} configuration reference", "",
+             "| Setting | Default | Description |", "|---|---|---|"]
+    for name, value in defaults.items():
+        lines.append(f"| {name} | {value} | Controls {name.replace('_', ' ')} for {product} |")
+    return "\n".join(lines) + "\n"
+
+
+def build_fixture(folder: str, scale: int = 1, seed: int = 11) -> List[Dict[str, Any]]:
+    """Write the fixture corpus into `folder` and return its labelled questions."""
+    rng = random.Random(seed)
+    questions: List[Dict[str, Any]] = []
+
+    def write(name: str, text: str) -> None:
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    for p in range(len(PRODUCTS) * scale):
+        product = PRODUCTS[p % len(PRODUCTS)] + ("" if p < len(PRODUCTS) else str(p // len(PRODUCTS)))
+        major = rng.randint(1, 4)
+        versions = [f"{major}.{minor}.{patch}" for minor, patch in [(rng.randint(0, 5), 0), (6, rng.randint(1, 9)), (7, 0)]]
+        memories = {}
+        for version in versions:
+            memories[version] = rng.choice([4, 8, 16, 32, 64])
+            write(f"{product}-{version}-install.md", _install_guide(rng, product, version, memories[version]))
+        codes = [f"E{rng.randint(1000, 9999)}" for _ in range(4)]
+        write(f"{product}-faq.md", _faq(rng, product, codes))
+        defaults = {name: rng.randint(2, 500) for name in SETTINGS}
+        write(f"{product}-config.md", _config_table(product, defaults))
+
+        # Meeting notes that talk about the product, its versions, installs and errors without answering anything
+        for n in range(2):
+            write(f"{product}-notes-{n}.txt",
+                  f"Team notes on {product}. We discussed the {product} installation schedule, memory usage and "
+                  f"error {codes[n]} seen during the upgrade from {versions[0]} to {versions[-1]}. "
+                  f"Steps for the next {product} procedure review are pending. {_filler(rng, 40)}")
+
+        target = rng.choice(versions)
+        guide = f"{product}-{target}-install.md"
+        setting = SETTINGS[p % len(SETTINGS)]
+        questions += [
+            {"kind": "version_install", "query": f"installation steps for {product} {target}",
+             "relevant": [{"file": guide, "needle": f"--version {target}"}]},
+            {"kind": "version_install", "query": f"how to install {product} v{target}?",
+             "relevant": [{"file": guide, "needle": f"--version {target}"}]},
+            {"kind": "version_fact", "query": f"how much memory does {product} {target} need",
+             "relevant": [{"file": guide, "needle": f"requires {memories[target]} GB"}]},
+            {"kind": "version_fact", "query": f"RAM requirement per node for {product} {target}",
+             "relevant": [{"file": guide, "needle": f"requires {memories[target]} GB"}]},
+            {"kind": "procedure", "query": f"how do I set up {product}?",
+             "relevant": [{"file": f"{product}-{v}-install.md", "needle": f"{product}-setup"} for v in versions]},
+            {"kind": "procedure", "query": f"deployment procedure for {product}",
+             "relevant": [{"file": f"{product}-{v}-install.md", "needle": f"{product}-setup"} for v in versions]},
+            {"kind": "error_code", "query": f"what does error {codes[1]} mean in {product}",
+             "relevant": [{"file": f"{product}-faq.md", "needle": codes[1]}]},
+            {"kind": "config", "query": f"default {setting} for {product}",
+             "relevant": [{"file": f"{product}-config.md", "needle": setting}]},
+            {"kind": "config", "query": f"what is the default {setting.replace('_', ' ')} in {product}",
+             "relevant": [{"file": f"{product}-config.md", "needle": setting}]},
+        ]
+
+    # Runbooks for other components so the relevant chunks are a small fraction of the index;
+    # their own install-steps questions are scored too (paraphrases need a real embedding)
+    for q in build_corpus(folder, 20 * scale, seed=seed):
+        if not q.get("paraphrase"):
+            questions.append({"kind": "runbook", "query": q["query"],
+                              "relevant": [{"file": q["file"], "needle": q["needle"]}]})
+    return questions
+
+
+# ---------- scoring ----------
+
+def _is_relevant(doc: Dict[str, Any], question: Dict[str, Any]) -> bool:
+    md = doc.get("metadata") or {}
+    name = md.get("name") or os.path.basename(md.get("path", "") or "")
+    return any(name == r["file"] and r.get("needle", "") in doc["content"] for r in question["relevant"])
+
+
+def evaluate(name: str, search: Searcher, questions: List[Dict[str, Any]], build: Dict[str, Any]) -> Dict[str, Any]:
+    hits = {k: 0 for k in KS}
+    reciprocal = 0.0
+    latencies: List[float] = []
+    by_kind: Dict[str, List[int]] = {}
+    for q in questions:
+        started = time.perf_counter()
+        results = search(q["query"])
+        latencies.append((time.perf_counter() - started) * 1000)
+        rank = next((i + 1 for i, (_, d) in enumerate(results[:MRR_DEPTH]) if _is_relevant(d, q)), None)
+        for k in KS:
+            hits[k] += bool(rank and rank <= k)
+        reciprocal += 1.0 / rank if rank else 0.0
+        by_kind.setdefault(q.get("kind", "all"), []).append(int(bool(rank and rank <= 3)))
+    latencies.sort()
+    n = len(questions)
+    return {
+        "retriever": name,
+        **{f"recall@{k}": round(hits[k] / n, 3) for k in KS},
+        f"mrr@{MRR_DEPTH}": round(reciprocal / n, 3),
+        "recall@3_by_kind": {kind: round(sum(v) / len(v), 3) for kind, v in sorted(by_kind.items())},
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(0.95 * (n - 1))], 3),
+        **build,
+    }
+
+
+def _children_peak_rss_mb() -> float:
+    """Largest peak RSS of any finished child process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return rss / 2 ** 20 if os.uname().sysname == "Darwin" else rss / 2 ** 10
+
+
+def _measure_build(fn: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Run a build step, returning its result with wall time and peak traced Python memory.
+    tracemalloc only sees this process; when the step ran worker processes, their peak RSS is
+    reported as workers_peak_rss_mb.
+    """
+    children_before = _children_peak_rss_mb()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = {"build_s": round(elapsed, 3), "build_peak_mb": round(peak / 2 ** 20, 2)}
+    children_after = _children_peak_rss_mb()
+    if children_after > children_before:
+        stats["workers_peak_rss_mb"] = round(children_after, 2)
+    return result, stats
+
+
+def _build_index(corpus: str, tmp: str) -> KnowledgeIndex:
+    index = KnowledgeIndex(corpus, chunk_document, CHUNKER_VERSION, index_dir=os.path.join(tmp, "index"))
+    index.refresh(workers=1)
+    return index
+
+
+# ---------- Chroma ----------
+
+def hash_embed(text: str, dim: int = HASH_DIM) -> List[float]:
+    """Signed feature hashing of words and word pairs, L2-normalised: a deterministic offline embedding."""
+    words = re.findall(r"\w+", text.lower())
+    vec = [0.0] * dim
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = int.from_bytes(hashlib.md5(feature.encode("utf-8")).digest()[:4], "little")
+        vec[h % dim] += 1.0 if h & (1 << 31) else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def build_chroma(docs: List[Dict[str, Any]], embed: Callable[[List[str]], List[List[float]]], batch: int = 256):
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.EphemeralClient(Settings(anonymized_telemetry=False))
+    collection = client.create_collection(f"bench_{int(time.time() * 1000)}", metadata={"hnsw:space": "cosine"},
+                                          embedding_function=None)
+    for start in range(0, len(docs), batch):
+        part = docs[start:start + batch]
+        collection.add(ids=[chunk_id(d) for d in part], embeddings=embed([d["content"] for d in part]),
+                       documents=[d["content"] for d in part],
+                       metadatas=[{k: v for k, v in d["metadata"].items() if isinstance(v, (str, int, float, bool))}
+                                  for d in part])
+    return collection
+
+
+def chroma_searcher(collection, embed: Callable[[List[str]], List[List[float]]], top_k: int) -> Searcher:
+    def search(query: str) -> List[Tuple[float, Dict[str, Any]]]:
+        res = collection.query(query_embeddings=embed([query]), n_results=top_k)
+        return [(-dist, {"id": cid, "content": text, "metadata": meta or {}})
+                for cid, text, meta, dist in zip(res["ids"][0], res["documents"][0], res["metadatas"][0], res["distances"][0])]
+    return search
+
+
+# ---------- report ----------
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Per-retriever change of every numeric metric against a previous report."""
+    before = {r["retriever"]: r for r in baseline.get("results", [])}
+    delta: Dict[str, Dict[str, float]] = {}
+    for row in report["results"]:
+        old = before.get(row["retriever"]) or {}
+        changes = {k: round(v - old[k], 3) for k, v in row.items()
+                   if isinstance(v, (int, float)) and not isinstance(v, bool) and isinstance(old.get(k), (int, float))}
+        if changes:
+            delta[row["retriever"]] = changes
+    return delta
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1, help="Multiplies the number of products and filler documents")
+    parser.add_argument("--corpus", help="Benchmark this folder instead of the generated fixture")
+    parser.add_argument("--questions", help="Labelled questions JSON for --corpus")
+    parser.add_argument("--embedder", choices=["hash", "ollama"], default="hash")
+    parser.add_argument("--top-k", type=int, default=MRR_DEPTH)
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="Previous report to diff against")
+    args = parser.parse_args()
+    if args.corpus and not args.questions:
+        parser.error("--corpus needs --questions")
+
+    # Keep every retriever off the live Chroma store; hybrid gets the benchmark's collection
+    os.environ["KB_VECTOR_SEARCH"] = "0"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            corpus = os.path.abspath(args.corpus)
+            with open(args.questions, "r", encoding="utf-8") as f:
+                questions = json.load(f)
+        else:
+            corpus = os.path.join(tmp, "corpus")
+            os.makedirs(corpus)
+            questions = build_fixture(corpus, args.scale)
+
+        index, bm25_build = _measure_build(lambda: _build_index(corpus, tmp))
+        docs = index.chunks
+        loaded, simple_build = _measure_build(lambda: _load_documents_from_folder(corpus))
+
+        results = [
+            evaluate("bm25", lambda q: _bm25_search(q, docs, top_k=args.top_k, bm25=index), questions, bm25_build),
+            evaluate("simple", lambda q: _simple_search(q, loaded, top_k=args.top_k), questions, simple_build),
+        ]
+
+        if args.embedder == "ollama":
+            from knowledge_bot.embeddings import OllamaEmbedder
+            embedder = OllamaEmbedder()
+            embed = embedder.embed
+        else:
+            embed = lambda texts: [hash_embed(t) for t in texts]
+        try:
+            collection, chroma_build = _measure_build(lambda: build_chroma(docs, embed))
+        except ImportError as e:
+            results.append({"retriever": "chroma", "skipped": f"chromadb not installed ({e})"})
+        else:
+            chroma_build["build_peak_mb_note"] = "Python allocations only; the HNSW index lives in native memory"
+            vector = chroma_searcher(collection, embed, args.top_k)
+            results.append(evaluate("chroma", vector, questions, chroma_build))
+            results.append(evaluate(
+                "hybrid_rrf", lambda q: _hybrid_search(q, docs, top_k=args.top_k, bm25=index,
+                                                       vector_search=lambda text, k: vector(text)[:k]),
+                questions, {}))
+
+        report = {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "corpus": args.corpus or f"fixture(scale={args.scale})",
+            "files": len(index.files),
+            "chunks": len(docs),
+            "questions": len(questions),
+            "embedder": args.embedder,
+            "numpy": crew_simple.HAS_NUMPY,
+            "results": results,
+        }
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                report["delta"] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
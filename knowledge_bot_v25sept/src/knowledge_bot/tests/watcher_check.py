@@ -0,0 +1,94 @@
+"""
+Self-check for the index watcher: add, rewrite and delete files in a temporary knowledge
+folder and confirm the BM25 index and the (stub) vector collection follow within the debounce
+window, without queries rescanning the folder, and that a failed vector sync is retried.
+
+Run: python -m knowledge_bot.tests.watcher_check
+"""
+import json
+import os
+import tempfile
+import time
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="kb_watch_")
+    os.environ["KB_INDEX_DIR"] = os.path.join(tmp, "index")
+    os.environ["KB_VECTOR_SEARCH"] = "0"
+
+    from knowledge_bot.chunking import CHUNKER_VERSION, chunk_document
+    from knowledge_bot.crew_simple import _retrieve
+    from knowledge_bot.embeddings import EmbeddingCache, OllamaEmbedder, chunk_id
+    from knowledge_bot.index_store import get_index
+    from knowledge_bot.tests.ollama_stub import _ListCollection, start_stub
+    from knowledge_bot.watcher import IndexWatcher
+
+    server = start_stub()
+    embedder = OllamaEmbedder(base_url=f"http://127.0.0.1:{server.server_address[1]}",
+                              cache=EmbeddingCache(os.path.join(tmp, "embeddings.db")))
+    folder = os.path.join(tmp, "knowledge")
+    os.makedirs(folder)
+
+    def write(name, text):
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    for i in range(5):
+        write(f"doc{i}.txt", f"Document {i} explains the zeta{i} procedure in detail. " * 20)
+
+    index = get_index(folder, chunk_document, CHUNKER_VERSION)
+    collection = _ListCollection()
+    watcher = IndexWatcher(index, collection=collection, embedder=embedder, debounce=0.3,
+                           poll_interval=0.2, retry_delay=0.5, use_inotify=False).start()
+
+    def wait_for(batches):
+        deadline = time.monotonic() + 10
+        while watcher.metrics["batches"] < batches and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    # The catch-up rescan runs on the apply thread, not inside start()
+    wait_for(1)
+    assert {chunk_id(d) for d in index.chunks} == set(collection.rows)
+
+    write("doc5.txt", "Brand new quokka runbook describes restarts. " * 20)
+    write("doc1.txt", "Rewritten omega text about failover. " * 20)
+    os.remove(os.path.join(folder, "doc2.txt"))
+    wait_for(2)
+
+    status = watcher.status()
+    assert status["batches"] == 2 and status["pending"] == 0, status
+    assert status["files_changed"] == 7 and status["files_removed"] == 1, status
+    # Chroma mirrors the index: no chunks of the deleted file or the old text of the rewritten one
+    assert {chunk_id(d) for d in index.chunks} == set(collection.rows)
+    assert not any("zeta1" in doc or "zeta2" in doc for _, doc, _ in collection.rows.values())
+
+    refreshes = []
+    original = index.refresh
+    index.refresh = lambda *a, **k: refreshes.append(1) or original(*a, **k)
+    retrieved = _retrieve("quokka restarts", folder)
+    assert not refreshes, "queries should not rescan a watched folder"
+    assert retrieved["docs"][0]["metadata"]["name"] == "doc5.txt", retrieved["docs"][0]["metadata"]
+    index.refresh = original
+
+    # Chroma is down for one batch: the file is indexed at once and its vectors follow on retry
+    upsert = collection.upsert
+
+    def failing_upsert(*a, **k):
+        collection.upsert = upsert
+        raise ConnectionError("chroma unavailable")
+
+    collection.upsert = failing_upsert
+    write("doc6.txt", "Late arriving walrus checklist for upgrades. " * 20)
+    wait_for(4)
+    retried = watcher.status()
+    assert retried["retries"] == 1 and retried["errors"] == 1 and retried["retrying"] == 0, retried
+    assert {chunk_id(d) for d in index.chunks} == set(collection.rows)
+
+    watcher.stop()
+    server.shutdown()
+    print(json.dumps({"status": "ok", "lag_s": status["last_lag_s"], "batch_s": status["last_batch_s"],
+                      "chunks_embedded": status["chunks_embedded"], "chunks_deleted": status["chunks_deleted"]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 # src/knowledge_bot/tools/custom_tool.py
 import os
-from typing import List, Dict, Any
+import time
+import multiprocessing
+import queue
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 
 # Optional imports with graceful fallbacks
 try:
@@ -36,6 +40,7 @@ def _read_pdf_per_page(path: str) -> List[Dict[str, Any]]:
     """
     docs: List[Dict[str, Any]] = []
     name = os.path.basename(path)
+    st = os.stat(path)
 
     # Preferred: pdfplumber
     if HAS_PDFPLUMBER:
@@ -47,7 +52,6 @@ def _read_pdf_per_page(path: str) -> List[Dict[str, Any]]:
                     except Exception:
                         text = ""
                     if text.strip():
-                        st = os.stat(path)
                         docs.append({
                             "content": text,
                             "metadata": {
@@ -75,7 +79,6 @@ def _read_pdf_per_page(path: str) -> List[Dict[str, Any]]:
                     except Exception:
                         text = ""
                     if text.strip():
-                        st = os.stat(path)
                         docs.append({
                             "content": text,
                             "metadata": {
@@ -128,54 +131,234 @@ def _read_xlsx(path: str) -> str:
     except Exception:
         return ""
 
-def LocalFileReader(folder: str) -> List[Dict[str, Any]]:
+def iter_local_files(folder: str) -> Iterator[str]:
     """
-    Read and parse supported files from a local folder with per-page PDFs.
-    Returns a list of documents with content and metadata.
+    Yield the paths of supported files under a folder.
     """
-    docs: List[Dict[str, Any]] = []
     if not folder or not os.path.isdir(folder):
-        return docs
-
+        return
     for root, _, files in os.walk(folder):
         for fn in files:
-            ext = os.path.splitext(fn)[1].lower()
-            if ext not in SUPPORTED_LOCAL:
-                continue
-            full_path = os.path.join(root, fn)
+            if os.path.splitext(fn)[1].lower() in SUPPORTED_LOCAL:
+                yield os.path.join(root, fn)
+
+def read_local_file(full_path: str) -> List[Dict[str, Any]]:
+    """
+    Parse a single supported file into documents (one per PDF page).
+    Returns an empty list for unreadable or empty files.
+    """
+    ext = os.path.splitext(full_path)[1].lower()
+    try:
+        if ext == ".pdf":
+            return _read_pdf_per_page(full_path)
+
+        if ext == ".docx":
+            content = _read_docx(full_path)
+        elif ext in {".txt", ".md"}:
+            content = _read_txt(full_path)
+        elif ext == ".csv":
+            content = _read_csv(full_path)
+        elif ext == ".xlsx":
+            content = _read_xlsx(full_path)
+        else:
+            content = ""
+
+        if content and content.strip():
+            st = os.stat(full_path)
+            return [{
+                "content": content,
+                "metadata": {
+                    "source": full_path,
+                    "path": full_path,
+                    "name": os.path.basename(full_path),
+                    "type": ext,
+                    "size": st.st_size,
+                    "last_modified": st.st_mtime,
+                }
+            }]
+    except Exception:
+        # Skip unreadable file
+        pass
+    return []
+
+DEFAULT_MAX_FILE_MB = float(os.getenv("KB_MAX_FILE_MB", "50"))
+DEFAULT_FILE_TIMEOUT = float(os.getenv("KB_FILE_TIMEOUT", "120"))
+
+@dataclass
+class IngestStats:
+    """Progress and throughput of one ingestion run."""
+    files_total: int = 0
+    files_parsed: int = 0
+    files_empty: int = 0
+    files_too_large: List[str] = field(default_factory=list)
+    files_timed_out: List[str] = field(default_factory=list)
+    files_failed: List[str] = field(default_factory=list)
+    documents: int = 0
+    bytes_parsed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def files_done(self) -> int:
+        return (self.files_parsed + self.files_empty + len(self.files_too_large)
+                + len(self.files_timed_out) + len(self.files_failed))
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "files_parsed": self.files_parsed,
+            "files_empty": self.files_empty,
+            "files_too_large": len(self.files_too_large),
+            "files_timed_out": len(self.files_timed_out),
+            "files_failed": len(self.files_failed),
+            "documents": self.documents,
+            "elapsed_s": round(elapsed, 2),
+            "files_per_s": round(self.files_done / elapsed, 2),
+            "mb_per_s": round(self.bytes_parsed / elapsed / 1e6, 2),
+        }
+
+def _default_workers() -> int:
+    return int(os.getenv("KB_INGEST_WORKERS", "0")) or (os.cpu_count() or 1)
+
+def parse_files(
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    max_file_mb: float = DEFAULT_MAX_FILE_MB,
+    timeout: float = DEFAULT_FILE_TIMEOUT,
+    progress: Optional[Callable[[IngestStats], None]] = None,
+    stats: Optional[IngestStats] = None,
+) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Parse files in a process pool, yielding (path, documents) as each file finishes.
+
+    At most `workers` files are in flight, so memory stays bounded and a file's timeout
+    runs from when it started parsing. Files over `max_file_mb` are skipped without being
+    opened. A file that exceeds `timeout` is reported and skipped, and the pool is replaced
+    so its stuck worker cannot delay the files behind it. With a single worker, files are
+    parsed inline and only the size limit applies.
+    """
+    stats = stats or IngestStats()
+    workers = workers or _default_workers()
+    max_bytes = int(max_file_mb * 1024 * 1024)
+
+    def admitted(path: str) -> bool:
+        stats.files_total += 1
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            stats.files_failed.append(path)
+            return False
+        if size > max_bytes:
+            print(f"[INGEST] Skipping {path}: {size / 1e6:.1f} MB exceeds {max_file_mb} MB")
+            stats.files_too_large.append(path)
+            return False
+        return True
+
+    def finished(path: str, docs: List[Dict[str, Any]]) -> None:
+        if docs:
+            stats.files_parsed += 1
+            stats.documents += len(docs)
+            stats.bytes_parsed += docs[0]["metadata"].get("size", 0)
+        else:
+            stats.files_empty += 1
+        if progress:
+            progress(stats)
+
+    if workers <= 1:
+        for path in paths:
+            if admitted(path):
+                docs = read_local_file(path)
+                finished(path, docs)
+                yield path, docs
+        return
+
+    pending = iter(paths)
+    results: "queue.Queue" = queue.Queue()
+    pool = None
+    generation = 0
+    in_flight: Dict[str, float] = {}
+
+    def submit(path: str) -> None:
+        # Results are tagged with the pool generation so a recycled pool's late replies are ignored
+        tag = (generation, path)
+        pool.apply_async(read_local_file, (path,),
+                         callback=lambda docs, tag=tag: results.put((tag, docs, None)),
+                         error_callback=lambda e, tag=tag: results.put((tag, None, e)))
+        in_flight[path] = time.monotonic()
+
+    try:
+        pool = multiprocessing.Pool(workers)
+        while True:
+            # In-flight files never outnumber workers, so each one starts as soon as it is submitted
+            while len(in_flight) < workers:
+                path = next(pending, None)
+                if path is None:
+                    break
+                if admitted(path):
+                    submit(path)
+            if not in_flight:
+                break
 
             try:
-                if ext == ".pdf":
-                    docs.extend(_read_pdf_per_page(full_path))
-                else:
-                    if ext == ".docx":
-                        content = _read_docx(full_path)
-                    elif ext in {".txt", ".md"}:
-                        content = _read_txt(full_path)
-                    elif ext == ".csv":
-                        content = _read_csv(full_path)
-                    elif ext == ".xlsx":
-                        content = _read_xlsx(full_path)
+                (gen, path), docs, error = results.get(timeout=1.0)
+            except queue.Empty:
+                pass
+            else:
+                if gen == generation and path in in_flight:
+                    in_flight.pop(path)
+                    if error is not None:
+                        print(f"[INGEST] Failed {path}: {error}")
+                        stats.files_failed.append(path)
+                        if progress:
+                            progress(stats)
                     else:
-                        content = ""
+                        finished(path, docs)
+                        yield path, docs
 
-                    if content and content.strip():
-                        st = os.stat(full_path)
-                        docs.append({
-                            "content": content,
-                            "metadata": {
-                                "source": full_path,
-                                "path": full_path,
-                                "name": fn,
-                                "type": ext,
-                                "size": st.st_size,
-                                "last_modified": st.st_mtime,
-                            }
-                        })
-            except Exception:
-                # Skip unreadable file but continue others
-                continue
+            now = time.monotonic()
+            expired = [p for p, started in in_flight.items() if now - started > timeout]
+            if expired:
+                for path in expired:
+                    print(f"[INGEST] Timed out after {timeout:.0f}s: {path}")
+                    in_flight.pop(path)
+                    stats.files_timed_out.append(path)
+                    if progress:
+                        progress(stats)
+                # A parser stuck in C code cannot be interrupted: replace the whole pool so no hung
+                # worker holds a slot, and restart the other in-flight files with fresh clocks
+                pool.terminate()
+                pool.join()
+                generation += 1
+                pool = multiprocessing.Pool(workers)
+                for path in list(in_flight):
+                    submit(path)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+def iter_documents(folder: str, **kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    Stream documents from a folder as files are parsed in parallel.
+    Accepts the same options as parse_files.
+    """
+    for _, docs in parse_files(iter_local_files(folder), **kwargs):
+        yield from docs
 
+def _log_progress(stats: IngestStats) -> None:
+    if stats.files_done % 25 == 0:
+        print(f"[INGEST] {stats.as_dict()}")
+
+def LocalFileReader(folder: str, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Read and parse supported files from a local folder with per-page PDFs.
+    Returns a list of documents with content and metadata.
+    """
+    stats = IngestStats()
+    docs = list(iter_documents(folder, workers=workers, progress=_log_progress, stats=stats))
+    if stats.files_total:
+        print(f"[INGEST] Done: {stats.as_dict()}")
     return docs
 
 def GitHubRepoCloner(repo_url: str) -> tuple[str, List[Dict[str, Any]]]:
@@ -0,0 +1,389 @@
+# src/knowledge_bot/watcher.py
+"""
+Background watcher that keeps a knowledge folder's index live.
+
+File system events come from inotify through watchdog when it is installed; otherwise the
+folder is polled and files are compared by size and mtime. Events are debounced: a batch is
+applied once the folder has been quiet for `debounce` seconds (or `max_delay` seconds after
+the first event while writes keep coming), so a copy of fifty files is one refresh.
+
+A batch re-parses only the changed files (KnowledgeIndex.refresh with explicit paths), drops
+removed files from the BM25 index, and mirrors both into the Chroma collection: stale chunk
+ids of a changed or removed file are deleted and new chunks are embedded. Paths whose refresh
+or vector sync failed (Chroma or Ollama down) are retried after `retry_delay` seconds. While a
+watcher runs, queries use the index as it is instead of rescanning the folder on every question.
+
+Run standalone to keep the on-disk index and Chroma fresh:
+    python -m knowledge_bot.watcher ./knowledge
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+import argparse
+import json
+import os
+import threading
+import time
+
+from .index_store import KnowledgeIndex
+from .tools.custom_tool import SUPPORTED_LOCAL, iter_local_files
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAS_WATCHDOG = True
+except Exception:
+    HAS_WATCHDOG = False
+    FileSystemEventHandler = object
+
+DEFAULT_DEBOUNCE = float(os.getenv("KB_WATCH_DEBOUNCE", "1.0"))
+DEFAULT_MAX_DELAY = float(os.getenv("KB_WATCH_MAX_DELAY", "10.0"))
+DEFAULT_POLL_INTERVAL = float(os.getenv("KB_WATCH_POLL", "2.0"))
+DEFAULT_RETRY_DELAY = float(os.getenv("KB_WATCH_RETRY", "15.0"))
+
+
+def _supported(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in SUPPORTED_LOCAL
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events to the watcher as dirty paths."""
+
+    def __init__(self, watcher: "IndexWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "") or ""]
+        if event.is_directory:
+            # A renamed or deleted directory takes its files with it: rescan everything
+            if event.event_type in ("moved", "deleted"):
+                self.watcher.mark_dirty(None)
+            return
+        self.watcher.mark_dirty([p for p in paths if p and _supported(p)])
+
+
+class IndexWatcher:
+    """
+    Watches one folder and applies debounced changes to its KnowledgeIndex and, when a
+    collection is given, to the Chroma collection that vector search reads.
+    """
+
+    def __init__(
+        self,
+        index: KnowledgeIndex,
+        collection=None,
+        embedder=None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        use_inotify: Optional[bool] = None,
+    ):
+        self.index = index
+        self.folder = index.folder
+        self.collection = collection
+        self.embedder = embedder
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.use_inotify = HAS_WATCHDOG if use_inotify is None else (use_inotify and HAS_WATCHDOG)
+
+        self._dirty: Set[str] = set()
+        self._rescan = False
+        self._first_event = 0.0
+        self._last_event = 0.0
+        # Failed paths (and a failed rescan) wait here until _retry_at
+        self._retry: Set[str] = set()
+        self._retry_rescan = False
+        self._retry_at = 0.0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._observer = None
+        self._snapshot: Dict[str, tuple] = {}
+
+        self.metrics: Dict[str, Any] = {
+            "mode": "inotify" if self.use_inotify else "poll",
+            "events": 0,
+            "batches": 0,
+            "files_changed": 0,
+            "files_removed": 0,
+            "chunks_embedded": 0,
+            "chunks_deleted": 0,
+            "errors": 0,
+            "retries": 0,
+            "last_event_at": 0.0,
+            "last_applied_at": 0.0,
+            "last_batch_s": 0.0,
+            "last_lag_s": 0.0,
+            "max_lag_s": 0.0,
+        }
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> "IndexWatcher":
+        # Catch up with whatever changed while nothing was watching. The apply thread runs it
+        # first; until it is done, queries keep refreshing the index themselves
+        with self._cond:
+            self._rescan = True
+        if self.use_inotify:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.folder, recursive=True)
+            self._observer.start()
+        else:
+            self._snapshot = self._scan()
+            self._spawn(self._poll_loop, "kb-watch-poll")
+        self._spawn(self._apply_loop, "kb-watch-apply")
+        print(f"[WATCH] Watching {self.folder} ({self.metrics['mode']}, debounce {self.debounce}s)")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        for t in self._threads:
+            t.join(timeout=5)
+        self.index.watched = False
+
+    def _spawn(self, target, name: str) -> None:
+        t = threading.Thread(target=target, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    # ---------- change detection ----------
+
+    def mark_dirty(self, paths: Optional[List[str]]) -> None:
+        """Queue changed paths; None asks for a full rescan of the folder."""
+        if paths is not None and not paths:
+            return
+        now = time.monotonic()
+        with self._cond:
+            if paths is None:
+                self._rescan = True
+            else:
+                self._dirty.update(os.path.abspath(p) for p in paths)
+            if not self._first_event:
+                self._first_event = now
+            self._last_event = now
+            self.metrics["events"] += 1
+            self.metrics["last_event_at"] = time.time()
+            self._cond.notify_all()
+
+    def _scan(self) -> Dict[str, tuple]:
+        snapshot: Dict[str, tuple] = {}
+        for path in iter_local_files(self.folder):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_size, st.st_mtime)
+        return snapshot
+
+    def _poll_loop(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                current = self._scan()
+            except Exception as e:
+                print(f"[WATCH] Scan failed: {e}")
+                continue
+            changed = [p for p, sig in current.items() if self._snapshot.get(p) != sig]
+            changed += [p for p in self._snapshot if p not in current]
+            self._snapshot = current
+            self.mark_dirty(changed)
+
+    # ---------- applying batches ----------
+
+    def _apply_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                now = time.monotonic()
+                retrying = bool(self._retry or self._retry_rescan)
+                retry_due = retrying and now >= self._retry_at
+                if not self._dirty and not self._rescan and not retry_due:
+                    self._cond.wait(self._retry_at - now if retrying else None)
+                    continue
+                quiet_for = now - self._last_event
+                waited = now - self._first_event
+                if self._first_event and quiet_for < self.debounce and waited < self.max_delay:
+                    self._cond.wait(min(self.debounce - quiet_for, self.max_delay - waited))
+                    continue
+                dirty, rescan, first_event = self._dirty, self._rescan, self._first_event
+                self._dirty, self._rescan, self._first_event = set(), False, 0.0
+                retry: Set[str] = set()
+                if retry_due:
+                    retry, rescan = self._retry, rescan or self._retry_rescan
+                    self._retry, self._retry_rescan = set(), False
+                    self.metrics["retries"] += 1
+            self._apply(dirty | retry, rescan, first_event, retry)
+
+    def _retry_later(self, paths: Iterable[str], rescan: bool = False) -> None:
+        with self._cond:
+            self._retry.update(paths)
+            self._retry_rescan = self._retry_rescan or rescan
+            self._retry_at = time.monotonic() + self.retry_delay
+            self._cond.notify_all()
+
+    def _apply(self, dirty: Set[str], rescan: bool = False, first_event: float = 0.0,
+               retry: Iterable[str] = ()) -> None:
+        started = time.monotonic()
+        try:
+            before = {p: e["sha1"] for p, e in self.index.files.items()}
+            if rescan:
+                stats = self.index.refresh()
+            else:
+                present = [p for p in dirty if os.path.isfile(p)]
+                removed = [p for p in dirty if not os.path.exists(p)]
+                stats = self.index.refresh(paths=present, removed=removed)
+        except Exception as e:
+            self.metrics["errors"] += 1
+            print(f"[WATCH] Refresh failed, retrying in {self.retry_delay:g}s: {e}")
+            self._retry_later(dirty, rescan)
+            return
+        self.index.watched = True
+        self.metrics["files_changed"] += stats["added"] + stats["updated"]
+        self.metrics["files_removed"] += stats["removed"]
+
+        # Files whose content changed, and files that left the index
+        touched = [p for p, e in self.index.files.items() if e["sha1"] != before.get(p)]
+        gone = [p for p in before if p not in self.index.files]
+        # A retried path is synced again even though the index already has its new content
+        for path in retry:
+            if path in self.index.files:
+                if path not in touched:
+                    touched.append(path)
+            elif path not in gone:
+                gone.append(path)
+        failed = self._sync_vectors(touched, gone)
+        if failed:
+            self._retry_later(failed)
+
+        done = time.monotonic()
+        self.metrics["batches"] += 1
+        self.metrics["last_applied_at"] = time.time()
+        self.metrics["last_batch_s"] = round(done - started, 3)
+        if first_event:
+            lag = done - first_event
+            self.metrics["last_lag_s"] = round(lag, 3)
+            self.metrics["max_lag_s"] = round(max(self.metrics["max_lag_s"], lag), 3)
+
+    def _sync_vectors(self, touched: List[str], gone: List[str]) -> List[str]:
+        """
+        Mirror changed and removed files into Chroma: delete stale chunk ids, embed new chunks.
+        Returns the paths that could not be synced.
+        """
+        if self.collection is None or not (touched or gone):
+            return []
+        from .embeddings import chunk_id, embed_chunks
+
+        failed = []
+        for path in gone + touched:
+            try:
+                chunks = self.index.file_chunks(path) if path in touched else []
+                keep = {chunk_id(c) for c in chunks}
+                existing = self.collection.get(where={"path": path}, include=[]).get("ids", [])
+                stale = [i for i in existing if i not in keep]
+                if stale:
+                    self.collection.delete(ids=stale)
+                    self.metrics["chunks_deleted"] += len(stale)
+                if chunks and self.embedder is not None:
+                    stats = embed_chunks(self.collection, chunks, self.embedder)
+                    self.metrics["chunks_embedded"] += stats.upserted
+            except Exception as e:
+                self.metrics["errors"] += 1
+                print(f"[WATCH] Vector sync failed for {path}: {e}")
+                failed.append(path)
+        print(f"[WATCH] Synced vectors for {len(touched)} changed and {len(gone)} removed files"
+              + (f", {len(failed)} to retry in {self.retry_delay:g}s" if failed else ""))
+        return failed
+
+    # ---------- metrics ----------
+
+    def status(self) -> Dict[str, Any]:
+        """Freshness of the index: what is pending and how far behind the folder it has been."""
+        with self._cond:
+            pending = len(self._dirty) + (1 if self._rescan else 0)
+            retrying = len(self._retry) + (1 if self._retry_rescan else 0)
+            oldest = time.monotonic() - self._first_event if self._first_event else 0.0
+        now = time.time()
+        last = self.metrics["last_applied_at"]
+        return {
+            **self.index.freshness(),
+            **self.metrics,
+            "pending": pending,
+            "retrying": retrying,
+            "pending_for_s": round(oldest, 3),
+            "since_last_apply_s": round(now - last, 3) if last else None,
+        }
+
+
+_WATCHERS: Dict[str, IndexWatcher] = {}
+
+
+def _open_collection():
+    """The Chroma collection vector search reads, or None when chromadb is unavailable."""
+    if os.getenv("KB_VECTOR_SEARCH", "1") == "0":
+        return None
+    try:
+        import chromadb
+        client = chromadb.PersistentClient(path=os.path.abspath(os.getenv("KB_CHROMA_DIR", "./kb_chroma")))
+        return client.get_or_create_collection("knowledgebot_collection")
+    except Exception as e:
+        print(f"[WATCH] Vector sync disabled: {e}")
+        return None
+
+
+def start_watcher(folder: str, **kwargs) -> IndexWatcher:
+    """Start (once per folder) a watcher for the index the direct RAG path queries."""
+    from .chunking import CHUNKER_VERSION, chunk_document
+    from .index_store import get_index
+
+    key = os.path.abspath(folder)
+    watcher = _WATCHERS.get(key)
+    if watcher is None:
+        index = get_index(key, chunk_document, CHUNKER_VERSION)
+        if "collection" not in kwargs:
+            kwargs["collection"] = _open_collection()
+        if kwargs["collection"] is not None and "embedder" not in kwargs:
+            from .embeddings import OllamaEmbedder
+            kwargs["embedder"] = OllamaEmbedder(model=os.getenv("KB_EMBED_MODEL", "nomic-embed-text"))
+        watcher = _WATCHERS[key] = IndexWatcher(index, **kwargs).start()
+    return watcher
+
+
+def watcher_status(folder: Optional[str] = None) -> Dict[str, Any]:
+    """Status of one watched folder, or of all of them keyed by folder."""
+    if folder is not None:
+        watcher = _WATCHERS.get(os.path.abspath(folder))
+        return watcher.status() if watcher else {"folder": os.path.abspath(folder), "watching": False}
+    return {key: w.status() for key, w in _WATCHERS.items()}
+
+
+def stop_watchers() -> None:
+    for watcher in list(_WATCHERS.values()):
+        watcher.stop()
+    _WATCHERS.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a knowledge folder's index and vectors up to date")
+    parser.add_argument("folder", nargs="?", default=os.getenv("KNOWLEDGE_DIR", "./knowledge"))
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE)
+    parser.add_argument("--poll", action="store_true", help="Poll mtimes even if inotify is available")
+    parser.add_argument("--status-every", type=float, default=30.0, help="Seconds between status lines")
+    args = parser.parse_args()
+
+    watcher = start_watcher(args.folder, debounce=args.debounce, use_inotify=not args.poll)
+    try:
+        while True:
+            time.sleep(args.status_every)
+            print(f"[WATCH] {json.dumps(watcher.status())}")
+    except KeyboardInterrupt:
+        stop_watchers()
+
+
+if __name__ == "__main__":
+    main()
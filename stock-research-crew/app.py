@@ -1,7 +1,6 @@
 import json
-import re
 import streamlit as st
-from src.orchestrator import build_crew
+from src.orchestrator import run_with_review
 
 st.set_page_config(page_title="CrewAI Stock Research", layout="wide")
 
@@ -17,6 +16,8 @@ with st.sidebar:
 	horizon = st.selectbox("Horizon", ["1 year", "2 years"], index=1)
 	keywords = st.text_input("Keywords", "earnings buyback IPO demerger uptrend setup")
 	tickers_hint = st.text_input("Optional tickers hint (comma-separated)", "")
+	universe = st.text_input("Screening universe (a file name in data/universes, or comma-separated tickers; optional)", "")
+	max_iterations = st.slider("Max review iterations", 1, 5, 3)
 	go = st.button("Run Crew")
 
 if go:
@@ -28,27 +29,46 @@ if go:
 		"horizon": horizon,
 		"keywords": keywords,
 		"tickers_hint": [t.strip() for t in tickers_hint.split(",") if t.strip()],
+		"universe": universe.strip(),
 	}
-	crew = build_crew(user_prefs)
-	with st.spinner("Running agents (research → analysis → review)..."):
-		out = crew.kickoff()
+	progress = st.empty()
 
-	text = str(out)
-	approved = bool(re.search(r"\bAPPROVE\b", text, re.IGNORECASE))
+	def show_iteration(entry):
+		status = "approved" if entry["approved"] else f"{len(entry['actions'])} revision action(s)"
+		progress.info(f"Review iteration {entry['iteration']}: {status}")
+
+	with st.spinner("Running agents (research → analysis → review, revising until approved)..."):
+		try:
+			result = run_with_review(user_prefs, max_iterations=max_iterations, on_iteration=show_iteration)
+		except ValueError as e:
+			st.error(str(e))
+			st.stop()
+
+	text = result["text"]
+	approved = result["approved"]
 
 	st.subheader("Reviewer Decision")
 	if approved:
 		st.success("APPROVED by Agent3 - showing final results")
 	else:
-		st.error("Reviewer requested revisions. Showing feedback for iteration.")
+		st.error(f"Reviewer still requested revisions after {result['iterations']} iteration(s). Showing latest feedback.")
 
 	st.code(text)
 
+	with st.expander(f"Review history ({result['iterations']} iteration(s))"):
+		for entry in result["history"]:
+			st.markdown(f"**Iteration {entry['iteration']}** - {'APPROVE' if entry['approved'] else 'REQUEST-REVISIONS'}")
+			for action in entry["actions"]:
+				st.markdown(f"- {action['kind']} ({', '.join(action['tickers']) or 'all'}): {action['reason']}")
+		st.caption(
+			"Stage runs: " + ", ".join(f"{k.replace('_', ' ')} {v}" for k, v in result["stats"].items())
+		)
+
 	if approved:
 		st.markdown("Download result")
 		st.download_button(
 			label="Download JSON",
-			data=json.dumps({"result": text, "inputs": user_prefs}, indent=2),
+			data=json.dumps({"result": text, "analysis": result["analysis"], "history": result["history"], "inputs": user_prefs}, indent=2),
 			file_name="crewai_stock_research.json",
 			mime="application/json",
 		)
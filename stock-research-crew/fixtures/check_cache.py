@@ -0,0 +1,93 @@
+"""Offline check of the fundamentals and price caches against the fixtures in this folder.
+
+	python fixtures/check_cache.py
+
+Covers a cache hit, TTL expiry after a restart, the stale fallback when the source fails,
+and an incremental price read through CsvSource. Nothing touches the network or ./data.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.tools.fundamentals import FIELD_TTL, FundamentalsCache, JsonFundamentalsSource  # noqa: E402
+from src.tools.price_store import CsvSource, PriceStore  # noqa: E402
+
+FIXTURES = os.path.dirname(os.path.abspath(__file__))
+
+
+class FlakySource(JsonFundamentalsSource):
+	"""Fixture source that counts calls and raises while `down` is set."""
+
+	def __init__(self, folder: str):
+		super().__init__(folder)
+		self.calls = 0
+		self.down = False
+
+	def fetch(self, ticker):
+		self.calls += 1
+		if self.down:
+			raise ConnectionError("source unavailable")
+		return super().fetch(ticker)
+
+
+def age_rows(data_dir: str, seconds: float) -> None:
+	"""Move every stored fetch time back, as if the cache had been written `seconds` ago."""
+	with sqlite3.connect(os.path.join(data_dir, "fundamentals.db")) as conn:
+		conn.execute("UPDATE fundamentals SET fetched_at = fetched_at - ?", (seconds,))
+
+
+def check_fundamentals(data_dir: str) -> None:
+	source = FlakySource(os.path.join(FIXTURES, "fundamentals"))
+	cache = FundamentalsCache(data_dir=data_dir, source=source)
+	first = cache.get("aapl")
+	assert first["forwardPE"] == 28.4 and "shortName" not in first, first
+	assert cache.get("AAPL") == first and source.calls == 1, "second read should be a cache hit"
+	assert cache.stats["hits"] == 1
+	print(f"[fundamentals] hit: {cache.stats}")
+
+	# A new process reads the SQLite rows; once the daily fields outlive their TTL the ticker is refetched
+	age_rows(data_dir, min(FIELD_TTL.values()) + 60)
+	cache = FundamentalsCache(data_dir=data_dir, source=source)
+	assert not cache.get("AAPL").get("stale") and source.calls == 2, "expired fields should trigger a fetch"
+	print(f"[fundamentals] expiry: {cache.stats}")
+
+	# Expired again, and now the source fails: the stored values come back marked stale
+	age_rows(data_dir, max(FIELD_TTL.values()) + 60)
+	cache = FundamentalsCache(data_dir=data_dir, source=source)
+	source.down = True
+	stale = cache.get("AAPL")
+	assert stale.get("stale") is True and stale["forwardPE"] == 28.4, stale
+	assert cache.stats["stale_served"] == 1 and cache.stats["errors"] == 1
+	print(f"[fundamentals] stale fallback: {cache.stats}")
+
+	# Nothing stored to fall back on: the error surfaces
+	try:
+		cache.get("MSFT")
+	except ConnectionError:
+		pass
+	else:
+		raise AssertionError("a ticker with no cached values should raise when the source fails")
+
+
+def check_prices(data_dir: str) -> None:
+	store = PriceStore(data_dir=data_dir, source=CsvSource(os.path.join(FIXTURES, "prices")))
+	bars = store.get("MSFT", period="max")
+	assert len(bars) > 250 and list(bars.columns)[:4] == ["Open", "High", "Low", "Close"], bars.columns
+	downloads = store.stats["downloads"]
+	again = store.get("MSFT", period="max")
+	assert store.stats["downloads"] == downloads and len(again) == len(bars), "repeat read should not download"
+	# A new process reads the bars from SQLite without asking the source again
+	store = PriceStore(data_dir=data_dir, source=CsvSource(os.path.join(FIXTURES, "prices")))
+	assert len(store.get("MSFT", period="max")) == len(bars) and store.stats["downloads"] == 0
+	print(f"[prices] {len(bars)} bars, {downloads} download(s), reload from disk: {store.stats}")
+
+
+if __name__ == "__main__":
+	with tempfile.TemporaryDirectory() as data_dir:
+		check_fundamentals(data_dir)
+		check_prices(data_dir)
+	print("OK")
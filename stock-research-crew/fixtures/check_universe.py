@@ -0,0 +1,61 @@
+"""Offline check that an unknown universe name reaches the app instead of being screened away.
+
+	python fixtures/check_universe.py
+
+app.py reports a ValueError from run_with_review with st.error; run_with_review gets it from
+prepare_context. Data errors, by contrast, only skip the pre-screen. Prices come from the CSV
+fixtures in this folder and the store lives in a temporary directory.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = tempfile.mkdtemp(prefix="stock-check-")
+UNIVERSE_DIR = os.path.join(DATA_DIR, "universes")
+
+# Read at import time by the tools modules
+os.environ["STOCK_DATA_DIR"] = DATA_DIR
+os.environ["STOCK_UNIVERSE_DIR"] = UNIVERSE_DIR
+os.environ["STOCK_PRICE_FIXTURES"] = os.path.join(FIXTURES, "prices")
+sys.path.insert(0, ROOT)
+
+from src.orchestrator import prepare_context, prescreen  # noqa: E402
+
+
+def check_unknown_universe() -> None:
+	try:
+		prepare_context({"universe": "nifty5OO", "tickers_hint": []})
+	except ValueError as e:
+		assert "nifty5OO" in str(e) and "megacaps" in str(e), e
+		print(f"[universe] unknown name reported: {e}")
+	else:
+		raise AssertionError("an unknown universe should raise ValueError for the app to show")
+
+
+def check_known_universe() -> None:
+	shortlist = prescreen({"universe": "megacaps"}, top_n=5)
+	assert all(c["ticker"] in ("AAPL", "MSFT") for c in shortlist), shortlist
+	ranked = prescreen({"universe": "AAPL,"})
+	print(f"[universe] megacaps shortlist: {[c['ticker'] for c in shortlist]}, 'AAPL,' ranks {len(ranked)} ticker(s)")
+
+
+def check_data_errors_skip() -> None:
+	# Hints with no price data are a data problem, not a user error: the screen comes back empty
+	assert prescreen({"universe": "", "tickers_hint": ["NOPE"]}) == []
+	print("[universe] tickers without data: pre-screen skipped, no error")
+
+
+if __name__ == "__main__":
+	os.makedirs(UNIVERSE_DIR, exist_ok=True)
+	with open(os.path.join(UNIVERSE_DIR, "megacaps.csv"), "w", encoding="utf-8") as f:
+		f.write("ticker\nAAPL\nMSFT\n")
+	try:
+		check_unknown_universe()
+		check_known_universe()
+		check_data_errors_skip()
+	finally:
+		shutil.rmtree(DATA_DIR, ignore_errors=True)
+	print("OK")
@@ -4,10 +4,12 @@ from crewai import Agent
 from .tools.wrappers import (
 	WEB_SEARCH,
 	FETCH_PAGE_SUMMARY,
+	FETCH_MANY,
 	FETCH_PRICE_HISTORY,
 	COMPUTE_TREND_METRICS,
 	SIMPLE_TECH_FLAGS,
 	FETCH_FUNDAMENTALS,
+	SCREEN_UNIVERSE,
 )
 from .llm import get_llm
 
@@ -26,7 +28,7 @@ def create_researcher() -> Agent:
 		),
 		allow_delegation=False,
 		allow_code_execution=False,
-		tools=[WEB_SEARCH, FETCH_PAGE_SUMMARY, FETCH_PRICE_HISTORY, COMPUTE_TREND_METRICS, SIMPLE_TECH_FLAGS, FETCH_FUNDAMENTALS],
+		tools=[SCREEN_UNIVERSE, WEB_SEARCH, FETCH_PAGE_SUMMARY, FETCH_MANY, FETCH_PRICE_HISTORY, COMPUTE_TREND_METRICS, SIMPLE_TECH_FLAGS, FETCH_FUNDAMENTALS],
 		llm=get_llm(),
 	)
 
@@ -62,6 +64,6 @@ def create_reviewer() -> Agent:
 		),
 		allow_delegation=False,
 		allow_code_execution=False,
-		tools=[FETCH_PRICE_HISTORY, COMPUTE_TREND_METRICS, SIMPLE_TECH_FLAGS, FETCH_FUNDAMENTALS, WEB_SEARCH, FETCH_PAGE_SUMMARY],
+		tools=[FETCH_PRICE_HISTORY, COMPUTE_TREND_METRICS, SIMPLE_TECH_FLAGS, FETCH_FUNDAMENTALS, WEB_SEARCH, FETCH_PAGE_SUMMARY, FETCH_MANY],
 		llm=get_llm(),
 	)
@@ -0,0 +1,139 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List
+
+from .tools.fundamentals import fetch_fundamentals
+from .tools.prices import compute_trend_metrics, fetch_price_history, simple_technical_flags, summarize_prices
+from .tools.search import fetch_page_summary, web_search
+
+
+# Concurrent requests per data source; each source gets its own pool so a slow one cannot starve the others
+PRICE_WORKERS = int(os.getenv("STOCK_DOSSIER_PRICE_WORKERS", "8"))
+FUNDAMENTAL_WORKERS = int(os.getenv("STOCK_DOSSIER_FUNDAMENTAL_WORKERS", "4"))
+WEB_WORKERS = int(os.getenv("STOCK_DOSSIER_WEB_WORKERS", "6"))
+DEFAULT_TIMEOUT = float(os.getenv("STOCK_DOSSIER_TIMEOUT", "120"))
+SECTIONS = ("technicals", "fundamentals", "news")
+
+
+def _technicals(ticker: str, refresh: bool = False) -> Dict[str, Any]:
+	prices = fetch_price_history(ticker, period="5y", interval="1d", refresh=refresh)
+	metrics = compute_trend_metrics(prices)
+	return {
+		**summarize_prices(ticker, prices),
+		**{k: round(v, 4) if isinstance(v, float) else v for k, v in metrics.items()},
+		"flags": simple_technical_flags(prices, metrics),
+	}
+
+
+def _news_query(ticker: str) -> str:
+	return f"{ticker} stock news earnings buyback"
+
+
+def build_dossiers(
+	tickers: List[str],
+	news_results: int = 5,
+	summaries: int = 2,
+	timeout: float = DEFAULT_TIMEOUT,
+	sections: Iterable[str] = SECTIONS,
+	refresh: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+	"""Gather technicals, fundamentals and news for every ticker concurrently.
+
+	Prices, fundamentals and web requests run in separate bounded pools; page summaries for a
+	ticker's top news hits are queued as soon as its search returns. A failure or timeout is
+	recorded under the dossier's "errors" instead of failing the whole stage. `sections` limits
+	what is gathered and `refresh` bypasses the price, fundamentals, search and page caches, for
+	targeted re-runs.
+	"""
+	sections = set(sections)
+	started = time.perf_counter()
+	tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+	dossiers: Dict[str, Dict[str, Any]] = {
+		t: {"ticker": t, "technicals": None, "fundamentals": None, "news": [], "errors": {}} for t in tickers
+	}
+	pools = {
+		"prices": ThreadPoolExecutor(max_workers=PRICE_WORKERS),
+		"fundamentals": ThreadPoolExecutor(max_workers=FUNDAMENTAL_WORKERS),
+		"web": ThreadPoolExecutor(max_workers=WEB_WORKERS),
+	}
+	jobs = {}
+	try:
+		for t in tickers:
+			if "technicals" in sections:
+				jobs[pools["prices"].submit(_technicals, t, refresh)] = (t, "technicals")
+			if "fundamentals" in sections:
+				jobs[pools["fundamentals"].submit(fetch_fundamentals, t, refresh)] = (t, "fundamentals")
+			if "news" in sections:
+				jobs[pools["web"].submit(web_search, _news_query(t), news_results, refresh)] = (t, "news")
+
+		pending = set(jobs)
+		deadline = started + timeout
+		while pending:
+			done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+			if not done:
+				break
+			for future in done:
+				ticker, kind = jobs[future]
+				dossier = dossiers[ticker]
+				try:
+					value = future.result()
+				except Exception as e:
+					dossier["errors"][kind if isinstance(kind, str) else "news"] = str(e)
+					continue
+				if kind == "news":
+					dossier["news"] = [{"title": r.get("title", ""), "href": r.get("href", ""), "body": r.get("body", "")} for r in value]
+					for i, item in enumerate(dossier["news"][:summaries]):
+						if item["href"]:
+							follow_up = pools["web"].submit(fetch_page_summary, item["href"], 800, refresh)
+							jobs[follow_up] = (ticker, ("summary", i))
+							pending.add(follow_up)
+				elif isinstance(kind, tuple):
+					dossier["news"][kind[1]]["summary"] = value
+				else:
+					dossier[kind] = value
+
+		for future in pending:
+			future.cancel()
+			ticker, kind = jobs[future]
+			dossiers[ticker]["errors"][kind if isinstance(kind, str) else "news"] = f"timed out after {timeout:g}s"
+	finally:
+		for pool in pools.values():
+			pool.shutdown(wait=False, cancel_futures=True)
+
+	elapsed = time.perf_counter() - started
+	print(f"Built {len(dossiers)} dossiers in {elapsed:.1f}s")
+	return dossiers
+
+
+def merge_dossiers(dossiers: Dict[str, Dict[str, Any]], updates: Dict[str, Dict[str, Any]], sections: Iterable[str]) -> None:
+	"""Copy refreshed sections into existing dossiers in place; new tickers are added whole."""
+	for ticker, update in updates.items():
+		current = dossiers.get(ticker)
+		if current is None:
+			dossiers[ticker] = update
+			continue
+		for section in sections:
+			current[section] = update[section]
+			current["errors"].pop(section, None)
+			if section in update["errors"]:
+				current["errors"][section] = update["errors"][section]
+
+
+def compact_dossier(dossier: Dict[str, Any], body_chars: int = 200, summary_chars: int = 400) -> Dict[str, Any]:
+	"""Dossier trimmed for an LLM prompt: short news bodies and summaries, no empty fields."""
+	news = []
+	for item in dossier.get("news") or []:
+		entry = {"title": item.get("title"), "href": item.get("href"), "body": (item.get("body") or "")[:body_chars]}
+		if item.get("summary"):
+			entry["summary"] = item["summary"][:summary_chars]
+		news.append(entry)
+	out = {
+		"ticker": dossier["ticker"],
+		"technicals": dossier.get("technicals"),
+		"fundamentals": dossier.get("fundamentals"),
+		"news": news,
+	}
+	if dossier.get("errors"):
+		out["missing"] = dossier["errors"]
+	return {k: v for k, v in out.items() if v not in (None, [], {})}
@@ -1,55 +1,218 @@
-from typing import Dict, Any
+import json
+from typing import Callable, Dict, Any, List, Optional
 from crewai import Crew, Task
 
 from .agents import create_researcher, create_analyst, create_reviewer
+from .dossier import build_dossiers, compact_dossier, merge_dossiers
+from .review import REVIEW_FORMAT, parse_review
+from .tools.screener import load_universe, screen_universe
 
 
-def build_crew(user_prefs: Dict[str, Any]) -> Crew:
-	researcher = create_researcher()
-	analyst = create_analyst()
-	reviewer = create_reviewer()
+def prescreen(user_prefs: Dict[str, Any], top_n: int = 12) -> List[Dict[str, Any]]:
+	"""Run the technical screener over the user's universe (or ticker hints) before the agents start.
+
+	An unknown universe name raises ValueError for the app to report; data and network errors only skip the screen.
+	"""
+	universe = user_prefs.get("universe")
+	if universe:
+		tickers, options = load_universe(universe), {}
+	else:
+		# Hints are the user's own picks: rank them all rather than filtering on flags
+		tickers, options = user_prefs.get("tickers_hint") or [], {"min_flags": 0}
+	if not tickers:
+		return []
+	try:
+		return screen_universe(tickers, top_n=top_n, **options)
+	except Exception as e:
+		print(f"Pre-screen skipped: {e}")
+		return []
+
+
+def candidate_tickers(user_prefs: Dict[str, Any], shortlist: List[Dict[str, Any]], limit: int = 12) -> List[str]:
+	"""Tickers to build dossiers for: the screened shortlist, then the user's hints."""
+	tickers = [c["ticker"] for c in shortlist] + [t.strip().upper() for t in user_prefs.get("tickers_hint") or []]
+	return list(dict.fromkeys(tickers))[:limit]
+
+
+PROMPT_PREAMBLE = (
+	"You are collaborating to find positional uptrend opportunities for 1-2 years. "
+	"User constraints: market/theme/risk prefs/filters are provided. Be concise, factual, reproducible."
+)
+
+
+def _screened_text(shortlist: List[Dict[str, Any]]) -> str:
+	if not shortlist:
+		return ""
+	compact = [
+		{k: c.get(k) for k in ("ticker", "score", "flags", "off_high_pct", "ret_126d_pct", "ret_252d_pct")}
+		for c in shortlist
+	]
+	return (
+		"\n\nPre-screened technical shortlist (ranked; start from these, verify fundamentals and catalysts, "
+		f"drop any that do not hold up): {json.dumps(compact)}"
+	)
+
 
-	prompt_preamble = (
-		"You are collaborating to find positional uptrend opportunities for 1-2 years. "
-		"User constraints: market/theme/risk prefs/filters are provided. Be concise, factual, reproducible."
+def _dossier_text(dossiers: Dict[str, Dict[str, Any]]) -> str:
+	if not dossiers:
+		return ""
+	return (
+		"\n\nCandidate dossiers (technicals, fundamentals and recent news already gathered; do not fetch these "
+		"again, use tools only for gaps listed under 'missing' or for new candidates): "
+		f"{json.dumps([compact_dossier(d) for d in dossiers.values()], default=str)}"
 	)
 
-	research_task = Task(
+
+def prepare_context(user_prefs: Dict[str, Any], dossiers: Optional[Dict[str, Dict[str, Any]]] = None):
+	"""Screened shortlist and candidate dossiers the agents start from."""
+	shortlist = prescreen(user_prefs)
+	# Fan out data gathering for all candidates at once so the agents reason over ready dossiers
+	if dossiers is None:
+		tickers = candidate_tickers(user_prefs, shortlist)
+		dossiers = build_dossiers(tickers) if tickers else {}
+	return shortlist, dossiers
+
+
+def _research_task(agent, user_prefs: Dict[str, Any], context: str, feedback: str = "") -> Task:
+	revision = f"\n\nReviewer feedback on the previous list, address it: {feedback}" if feedback else ""
+	return Task(
 		description=(
-			f"{prompt_preamble}\n\n"
+			f"{PROMPT_PREAMBLE}\n\n"
 			f"Research mandate: Based on user input {user_prefs}, shortlist 5-12 liquid stocks/ETFs. "
 			"For each candidate provide: ticker, market, summary of catalysts (earnings, buybacks, IPO, demerger, setup), "
 			"basic fundamentals (marketCap, PE, PB, ROE if available), and simple technicals "
 			"(52w range, above 100/200DMA, 6m momentum). Prefer reliable sources and include URLs."
+			f"{context}{revision}"
 		),
-		agent=researcher,
+		agent=agent,
 		expected_output=(
 			"A JSON-like list of candidates with fields: ticker, name, market, catalysts, fundamentals, technicals, sources."
 		),
 	)
 
-	analysis_task = Task(
+
+def _analysis_task(agent, depends_on: List[Task], research: str = "", feedback: str = "", previous: str = "") -> Task:
+	# Re-runs get the cached research and refreshed dossiers in the prompt instead of a live research task
+	given = f"\n\nResearch list:{research}" if research else ""
+	# The analyst revises its own shortlist rather than starting over from the research
+	earlier = f"\n\nYour previous analysis:\n{previous}" if previous else ""
+	revision = (
+		f"\n\nThe reviewer asked for revisions to your previous analysis; address every point: {feedback}"
+		if feedback else ""
+	)
+	return Task(
 		description=(
 			"Analyze the research list and select top 3-6 opportunities suitable for 1-2 year positional trend following. "
 			"Explain rationale: fundamental durability, trend health, risk factors, and proposed entry/invalidations."
+			f"{given}{earlier}{revision}"
 		),
-		agent=analyst,
-		dependencies=[research_task],
+		agent=agent,
+		dependencies=depends_on,
 		expected_output=(
 			"A ranked shortlist with rationale and checklist: trend state, valuation sanity, catalysts, risks, and monitoring plan."
 		),
 	)
 
-	review_task = Task(
+
+def _review_task(agent, depends_on: List[Task]) -> Task:
+	return Task(
 		description=(
 			"Review the analysis. Either: APPROVE with bullet reasons and any cautions; or REQUEST-REVISIONS with clear actions "
-			"(e.g., missing fundamentals, weak trend evidence, lack of sources)."
+			"(e.g., missing fundamentals, weak trend evidence, lack of sources). "
+			f"{REVIEW_FORMAT}"
 		),
-		agent=reviewer,
-		dependencies=[analysis_task],
+		agent=agent,
+		dependencies=depends_on,
 		expected_output=(
 			"One of: 'APPROVE: <reasons and final list>' or 'REQUEST-REVISIONS: <what to redo and why>'."
 		),
 	)
 
+
+def build_crew(user_prefs: Dict[str, Any], dossiers: Optional[Dict[str, Dict[str, Any]]] = None) -> Crew:
+	researcher = create_researcher()
+	analyst = create_analyst()
+	reviewer = create_reviewer()
+
+	shortlist, dossiers = prepare_context(user_prefs, dossiers)
+	research_task = _research_task(researcher, user_prefs, _screened_text(shortlist) + _dossier_text(dossiers))
+	analysis_task = _analysis_task(analyst, [research_task])
+	review_task = _review_task(reviewer, [analysis_task])
+
 	return Crew(agents=[researcher, analyst, reviewer], tasks=[research_task, analysis_task, review_task])
+
+
+def _kickoff(agents: list, tasks: List[Task]) -> List[str]:
+	"""Run a partial crew and return the raw output of each task."""
+	out = Crew(agents=agents, tasks=tasks).kickoff()
+	outputs = [str(getattr(t, "raw", t)) for t in (getattr(out, "tasks_output", None) or [])]
+	return outputs if len(outputs) == len(tasks) else [str(out)] * len(tasks)
+
+
+def run_with_review(
+	user_prefs: Dict[str, Any],
+	max_iterations: int = 3,
+	on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+	"""Research, analyse and review, then revise until the reviewer approves or the budget runs out.
+
+	Stage outputs are kept between iterations. A revision refetches only the dossier sections the
+	reviewer named, for the tickers it named, and re-runs analysis and review on top of the cached
+	research; research itself is only repeated when the reviewer asks for different candidates.
+	"""
+	researcher = create_researcher()
+	analyst = create_analyst()
+	reviewer = create_reviewer()
+	shortlist, dossiers = prepare_context(user_prefs)
+	screened = _screened_text(shortlist)
+	stats = {"research_runs": 1, "analysis_runs": 1, "review_runs": 1, "dossier_refreshes": 0}
+
+	# The first pass is the ordinary three-stage crew
+	research_task = _research_task(researcher, user_prefs, screened + _dossier_text(dossiers))
+	analysis_task = _analysis_task(analyst, [research_task])
+	research, analysis, review = _kickoff(
+		[researcher, analyst, reviewer], [research_task, analysis_task, _review_task(reviewer, [analysis_task])]
+	)
+
+	history: List[Dict[str, Any]] = []
+	decision = None
+	for iteration in range(1, max(1, max_iterations) + 1):
+		decision = parse_review(review, list(dossiers))
+		entry = {
+			"iteration": iteration,
+			"approved": decision.approved,
+			"actions": [{"kind": a.kind, "tickers": a.tickers, "reason": a.reason} for a in decision.actions],
+			"review": review,
+		}
+		history.append(entry)
+		if on_iteration:
+			on_iteration(entry)
+		if decision.approved or iteration == max_iterations:
+			break
+
+		for section, tickers in decision.refresh_plan(list(dossiers)).items():
+			updates = build_dossiers(sorted(tickers), sections=[section], refresh=True, news_results=8)
+			merge_dossiers(dossiers, updates, [section])
+			stats["dossier_refreshes"] += len(updates)
+
+		if decision.needs_research:
+			research = _kickoff(
+				[researcher], [_research_task(researcher, user_prefs, screened + _dossier_text(dossiers), decision.feedback)]
+			)[0]
+			stats["research_runs"] += 1
+
+		analysis_task = _analysis_task(analyst, [], research + _dossier_text(dossiers), decision.feedback, analysis)
+		analysis, review = _kickoff([analyst, reviewer], [analysis_task, _review_task(reviewer, [analysis_task])])
+		stats["analysis_runs"] += 1
+		stats["review_runs"] += 1
+
+	return {
+		"text": review,
+		"approved": bool(decision and decision.approved),
+		"iterations": len(history),
+		"research": research,
+		"analysis": analysis,
+		"history": history,
+		"stats": stats,
+		"dossiers": dossiers,
+	}
@@ -0,0 +1,125 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+
+ACTION_KINDS = ("fundamentals", "technicals", "news", "analysis", "research")
+# Dossier sections a data action refreshes
+DATA_SECTIONS = {"fundamentals": "fundamentals", "technicals": "technicals", "news": "news"}
+
+# Used when the reviewer ignores the structured format
+_KEYWORDS = {
+	"fundamentals": ("fundamental", "valuation", "p/e", " pe ", "pe ratio", "roe", "margin", "earnings growth", "market cap", "book"),
+	"technicals": ("technical", "trend", "dma", "moving average", "momentum", "52-week", "52w", "price data", "price history"),
+	"news": ("source", "news", "catalyst", "url", "citation", "evidence", "reference"),
+	"research": ("more candidates", "new candidates", "other candidates", "replace", "broaden", "additional stocks"),
+	"analysis": ("rationale", "risk", "entry", "invalidation", "stop", "position siz", "monitoring", "ranking"),
+}
+_ACTION_RE = re.compile(
+	r"ACTION:\s*(?P<kind>[A-Za-z]+)\s*\|\s*TICKERS:\s*(?P<tickers>[^|\n]*?)\s*(?:\|\s*WHY:\s*(?P<why>[^\n]*))?$",
+	re.IGNORECASE | re.MULTILINE,
+)
+_REVISE_RE = re.compile(r"REQUEST[-_ ]REVISIONS?", re.IGNORECASE)
+_APPROVE_RE = re.compile(r"\bAPPROVE[D]?\b", re.IGNORECASE)
+
+REVIEW_FORMAT = (
+	"If revisions are needed, list one action per line as "
+	"'- ACTION: <fundamentals|technicals|news|analysis|research> | TICKERS: <comma-separated tickers or ALL> | WHY: <reason>'. "
+	"Use fundamentals/technicals/news when data for specific tickers is missing or doubtful, analysis when only the "
+	"reasoning needs work, and research only when different candidates are needed."
+)
+
+
+@dataclass
+class RevisionAction:
+	kind: str
+	tickers: List[str]
+	reason: str = ""
+
+
+@dataclass
+class ReviewDecision:
+	approved: bool
+	actions: List[RevisionAction] = field(default_factory=list)
+	feedback: str = ""
+
+	def refresh_plan(self, all_tickers: List[str]) -> Dict[str, Set[str]]:
+		"""Dossier sections to refetch, with the tickers for each."""
+		plan: Dict[str, Set[str]] = {}
+		for action in self.actions:
+			section = DATA_SECTIONS.get(action.kind)
+			if section:
+				plan.setdefault(section, set()).update(action.tickers or all_tickers)
+		return plan
+
+	@property
+	def needs_research(self) -> bool:
+		return any(a.kind == "research" for a in self.actions)
+
+
+def _find_tickers(text: str, known: List[str]) -> List[str]:
+	"""Known tickers mentioned in the text, also matching a bare symbol for suffixed ones (TCS for TCS.NS)."""
+	found = []
+	for ticker in known:
+		for symbol in {ticker, ticker.split(".")[0]}:
+			if re.search(r"(?<![A-Za-z0-9.])" + re.escape(symbol) + r"(?![A-Za-z0-9])", text):
+				found.append(ticker)
+				break
+	return found
+
+
+def _parse_ticker_list(raw: str, known: List[str]) -> List[str]:
+	raw = raw.strip()
+	if not raw or raw.upper() in ("ALL", "*", "ANY", "N/A"):
+		return []
+	tickers = []
+	for part in re.split(r"[,\s]+", raw):
+		part = part.strip().strip(".;'\"").upper()
+		if not part:
+			continue
+		# Map a bare symbol back to the suffixed ticker it came from
+		match = next((k for k in known if k == part or k.split(".")[0] == part), part)
+		tickers.append(match)
+	return list(dict.fromkeys(tickers))
+
+
+def parse_review(text: str, known_tickers: List[str]) -> ReviewDecision:
+	"""Decision and requested actions from the reviewer's output.
+
+	Structured 'ACTION: ... | TICKERS: ... | WHY: ...' lines are read first. Otherwise each line of
+	feedback is classified by keywords, with the tickers it mentions; feedback that matches nothing
+	becomes a single analysis action.
+	"""
+	text = text or ""
+	revise = _REVISE_RE.search(text)
+	if not revise:
+		return ReviewDecision(approved=bool(_APPROVE_RE.search(text)), feedback=text.strip())
+	feedback = text[revise.end():].strip(" :\n")
+
+	actions: List[RevisionAction] = []
+	for m in _ACTION_RE.finditer(feedback):
+		kind = m.group("kind").lower()
+		if kind in ACTION_KINDS:
+			actions.append(RevisionAction(kind, _parse_ticker_list(m.group("tickers"), known_tickers), (m.group("why") or "").strip()))
+
+	if not actions:
+		for line in re.split(r"\n+|(?<=[.;])\s+", feedback):
+			lowered = f" {line.lower()} "
+			kinds = [kind for kind, words in _KEYWORDS.items() if any(w in lowered for w in words)]
+			tickers = _find_tickers(line, known_tickers)
+			for kind in kinds:
+				actions.append(RevisionAction(kind, tickers, line.strip()))
+		if not actions:
+			actions.append(RevisionAction("analysis", [], feedback))
+
+	# Collapse repeats of the same kind
+	merged: Dict[str, RevisionAction] = {}
+	for action in actions:
+		if action.kind in merged:
+			existing = merged[action.kind]
+			# An action without tickers applies to all of them
+			existing.tickers = [] if not existing.tickers or not action.tickers else list(dict.fromkeys(existing.tickers + action.tickers))
+			existing.reason = "; ".join(r for r in (existing.reason, action.reason) if r)
+		else:
+			merged[action.kind] = action
+	return ReviewDecision(approved=False, actions=list(merged.values()), feedback=feedback)
@@ -1,5 +1,13 @@
-from typing import Dict, Any
-import yfinance as yf
+import datetime as dt
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from .price_store import DEFAULT_DATA_DIR
 
 
 KEYS = [
@@ -14,12 +22,25 @@ KEYS = [
 	"earningsGrowth",
 ]
 
+# Price-dependent fields move daily; reported figures only change with a new quarter
+_DAILY = float(os.getenv("STOCK_FUNDAMENTALS_TTL_HOURS", "24")) * 3600
+_QUARTERLY = float(os.getenv("STOCK_FUNDAMENTALS_REPORTED_TTL_HOURS", "168")) * 3600
+FIELD_TTL = {
+	"marketCap": _DAILY,
+	"forwardPE": _DAILY,
+	"trailingPE": _DAILY,
+	"priceToBook": _DAILY,
+	"pegRatio": _DAILY,
+	"profitMargins": _QUARTERLY,
+	"returnOnEquity": _QUARTERLY,
+	"revenueGrowth": _QUARTERLY,
+	"earningsGrowth": _QUARTERLY,
+}
+
 
-def fetch_fundamentals(ticker: str) -> Dict[str, Any]:
-	"""Fetch a subset of fundamentals and normalize types."""
-	info = yf.Ticker(ticker).info or {}
+def _normalize(info: Dict[str, Any]) -> Dict[str, Any]:
+	"""The KEYS subset of a yfinance info dict as python primitives."""
 	result: Dict[str, Any] = {k: info.get(k) for k in KEYS}
-	# Normalize to python primitives
 	for k, v in list(result.items()):
 		if hasattr(v, "item"):
 			try:
@@ -27,3 +48,138 @@ def fetch_fundamentals(ticker: str) -> Dict[str, Any]:
 			except Exception:
 				pass
 	return result
+
+
+class YFinanceFundamentalsSource:
+	"""Reads Ticker.info from Yahoo Finance."""
+
+	def fetch(self, ticker: str) -> Dict[str, Any]:
+		import yfinance as yf
+		return yf.Ticker(ticker).info or {}
+
+
+class JsonFundamentalsSource:
+	"""Serves <folder>/<TICKER>.json fixture files holding an info-style dict."""
+
+	def __init__(self, folder: str):
+		self.folder = folder
+
+	def fetch(self, ticker: str) -> Dict[str, Any]:
+		path = os.path.join(self.folder, f"{ticker}.json")
+		if not os.path.exists(path):
+			return {}
+		with open(path, "r", encoding="utf-8") as f:
+			return json.load(f)
+
+
+class FundamentalsCache:
+	"""Fundamentals per ticker and field, persisted in SQLite, refreshed when any field outlives its TTL.
+
+	One info call returns every field, so a stale field refreshes the whole ticker. If that call
+	fails, the last stored values are returned with "stale": true rather than an error.
+	"""
+
+	def __init__(self, data_dir: str = DEFAULT_DATA_DIR, source=None):
+		os.makedirs(data_dir, exist_ok=True)
+		self.path = os.path.join(data_dir, "fundamentals.db")
+		self.source = source or YFinanceFundamentalsSource()
+		self._memory: Dict[str, Dict[str, tuple]] = {}
+		self._locks: Dict[str, threading.Lock] = {}
+		self._guard = threading.Lock()
+		self.stats = {"fetches": 0, "hits": 0, "stale_served": 0, "errors": 0}
+		with self._connect() as conn:
+			conn.execute(
+				"CREATE TABLE IF NOT EXISTS fundamentals (ticker TEXT, field TEXT, value TEXT, fetched_at REAL, "
+				"PRIMARY KEY (ticker, field))"
+			)
+
+	def _connect(self) -> sqlite3.Connection:
+		return sqlite3.connect(self.path, timeout=30)
+
+	def _lock(self, ticker: str) -> threading.Lock:
+		with self._guard:
+			return self._locks.setdefault(ticker, threading.Lock())
+
+	def _stored(self, ticker: str) -> Dict[str, tuple]:
+		entry = self._memory.get(ticker)
+		if entry is None:
+			with self._connect() as conn:
+				rows = conn.execute("SELECT field, value, fetched_at FROM fundamentals WHERE ticker = ?", (ticker,)).fetchall()
+			entry = self._memory[ticker] = {field: (json.loads(value), fetched_at) for field, value, fetched_at in rows}
+		return entry
+
+	def _is_fresh(self, stored: Dict[str, tuple], now: float) -> bool:
+		return all(k in stored and now - stored[k][1] <= FIELD_TTL.get(k, _DAILY) for k in KEYS)
+
+	def get(self, ticker: str, refresh: bool = False) -> Dict[str, Any]:
+		"""Cached fundamentals; `refresh` refetches even when every field is still fresh."""
+		ticker = ticker.strip().upper()
+		with self._lock(ticker):
+			stored = self._stored(ticker)
+			now = time.time()
+			if not refresh and self._is_fresh(stored, now):
+				self.stats["hits"] += 1
+				return self._result(stored)
+			try:
+				values = _normalize(self.source.fetch(ticker))
+				self.stats["fetches"] += 1
+			except Exception as e:
+				self.stats["errors"] += 1
+				if not stored:
+					raise
+				print(f"Fundamentals for {ticker} unavailable ({e}); serving cached values")
+				self.stats["stale_served"] += 1
+				return {**self._result(stored), "stale": True}
+			stored.update({k: (v, now) for k, v in values.items()})
+			with self._connect() as conn:
+				conn.executemany(
+					"INSERT OR REPLACE INTO fundamentals VALUES (?, ?, ?, ?)",
+					[(ticker, k, json.dumps(v), now) for k, v in values.items()],
+				)
+			return self._result(stored)
+
+	def _result(self, stored: Dict[str, tuple]) -> Dict[str, Any]:
+		result: Dict[str, Any] = {k: stored[k][0] if k in stored else None for k in KEYS}
+		oldest = min((stored[k][1] for k in KEYS if k in stored), default=None)
+		if oldest:
+			result["as_of"] = dt.datetime.fromtimestamp(oldest).strftime("%Y-%m-%d")
+		return result
+
+	def prefetch(self, tickers: List[str], workers: int = 4) -> Dict[str, Dict[str, Any]]:
+		"""Warm the cache for a ticker list concurrently; tickers that fail are left out."""
+		def load(ticker: str):
+			try:
+				return ticker, self.get(ticker)
+			except Exception as e:
+				print(f"Fundamentals prefetch failed for {ticker}: {e}")
+				return ticker, None
+
+		with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+			return {t: v for t, v in pool.map(load, tickers) if v is not None}
+
+
+_CACHE: Optional[FundamentalsCache] = None
+
+
+def get_fundamentals_cache() -> FundamentalsCache:
+	"""Process-wide cache; STOCK_FUNDAMENTALS_FIXTURES=<dir> reads <dir>/<TICKER>.json instead of Yahoo."""
+	global _CACHE
+	if _CACHE is None:
+		fixtures = os.getenv("STOCK_FUNDAMENTALS_FIXTURES")
+		_CACHE = FundamentalsCache(source=JsonFundamentalsSource(fixtures) if fixtures else None)
+	return _CACHE
+
+
+def set_fundamentals_cache(cache: Optional[FundamentalsCache]) -> None:
+	global _CACHE
+	_CACHE = cache
+
+
+def fetch_fundamentals(ticker: str, refresh: bool = False) -> Dict[str, Any]:
+	"""Fetch a subset of fundamentals and normalize types (cached, see FundamentalsCache)."""
+	return get_fundamentals_cache().get(ticker, refresh=refresh)
+
+
+def prefetch_fundamentals(tickers: List[str], workers: int = 4) -> Dict[str, Dict[str, Any]]:
+	"""Bulk-load fundamentals for a ticker list into the cache."""
+	return get_fundamentals_cache().prefetch(tickers, workers=workers)
@@ -0,0 +1,209 @@
+import datetime as dt
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+
+COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+DEFAULT_DATA_DIR = os.getenv("STOCK_DATA_DIR", "./data")
+# Hours before a ticker is checked for new bars again
+DEFAULT_REFRESH_HOURS = float(os.getenv("STOCK_PRICE_REFRESH_HOURS", "12"))
+
+_PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+
+def period_start(period: str, today: Optional[dt.date] = None) -> Optional[dt.date]:
+	"""First date covered by a yfinance-style period such as 5y, 6mo or 5d; None for max."""
+	period = (period or "max").strip().lower()
+	if period in ("max", ""):
+		return None
+	if period == "ytd":
+		return dt.date((today or dt.date.today()).year, 1, 1)
+	for unit, days in sorted(_PERIOD_DAYS.items(), key=lambda u: -len(u[0])):
+		if period.endswith(unit) and period[: -len(unit)].isdigit():
+			return (today or dt.date.today()) - dt.timedelta(days=int(period[: -len(unit)]) * days)
+	raise ValueError(f"Unsupported period: {period}")
+
+
+def _normalize(data: pd.DataFrame) -> pd.DataFrame:
+	"""OHLCV frame with a naive DatetimeIndex and the standard column set."""
+	if isinstance(data.columns, pd.MultiIndex):
+		# Newer yfinance returns (field, ticker) columns even for one ticker
+		data = data.copy()
+		data.columns = data.columns.get_level_values(0)
+	data = data.copy()
+	data.index = pd.to_datetime(data.index)
+	if data.index.tz is not None:
+		data.index = data.index.tz_convert(None)
+	if "Adj Close" not in data and "Close" in data:
+		data["Adj Close"] = data["Close"]
+	data = data[[c for c in COLUMNS if c in data]]
+	return data[~data.index.duplicated(keep="last")].sort_index()
+
+
+class YFinanceSource:
+	"""Downloads bars from Yahoo Finance."""
+
+	def download(self, ticker: str, start: Optional[dt.date], end: Optional[dt.date], interval: str = "1d") -> pd.DataFrame:
+		import yfinance as yf
+		kwargs = {"start": start, "end": end} if start else {"period": "max"}
+		data = yf.download(ticker, interval=interval, auto_adjust=False, progress=False, **kwargs)
+		if not isinstance(data, pd.DataFrame) or data.empty:
+			return pd.DataFrame(columns=COLUMNS)
+		return _normalize(data)
+
+
+class CsvSource:
+	"""Serves bars from <folder>/<TICKER>.csv fixture files (Date index plus OHLCV columns)."""
+
+	def __init__(self, folder: str):
+		self.folder = folder
+
+	def download(self, ticker: str, start: Optional[dt.date], end: Optional[dt.date], interval: str = "1d") -> pd.DataFrame:
+		path = os.path.join(self.folder, f"{ticker}.csv")
+		if not os.path.exists(path):
+			return pd.DataFrame(columns=COLUMNS)
+		data = _normalize(pd.read_csv(path, index_col=0, parse_dates=True))
+		if start:
+			data = data[data.index >= pd.Timestamp(start)]
+		if end:
+			data = data[data.index < pd.Timestamp(end)]
+		return data
+
+
+class PriceStore:
+	"""Local OHLCV store: bars live in SQLite, recently used frames in memory.
+
+	A read only goes to the source for the range that is missing: older history when a longer
+	period is asked for, and bars after the last stored one once the refresh interval has passed.
+	"""
+
+	def __init__(self, data_dir: str = DEFAULT_DATA_DIR, source=None, refresh_hours: float = DEFAULT_REFRESH_HOURS):
+		os.makedirs(data_dir, exist_ok=True)
+		self.path = os.path.join(data_dir, "prices.db")
+		self.source = source or YFinanceSource()
+		self.refresh_seconds = refresh_hours * 3600
+		self._memory: Dict[Tuple[str, str], pd.DataFrame] = {}
+		self._checked: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+		self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+		self._guard = threading.Lock()
+		self.stats = {"downloads": 0, "rows_downloaded": 0, "memory_hits": 0, "disk_reads": 0}
+		with self._connect() as conn:
+			conn.execute(
+				"CREATE TABLE IF NOT EXISTS bars (ticker TEXT, interval TEXT, ts TEXT, open REAL, high REAL, low REAL, "
+				"close REAL, adj_close REAL, volume REAL, PRIMARY KEY (ticker, interval, ts))"
+			)
+			conn.execute(
+				"CREATE TABLE IF NOT EXISTS coverage (ticker TEXT, interval TEXT, first_ts TEXT, checked_at REAL, "
+				"PRIMARY KEY (ticker, interval))"
+			)
+
+	def _connect(self) -> sqlite3.Connection:
+		return sqlite3.connect(self.path, timeout=30)
+
+	def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+		with self._guard:
+			return self._locks.setdefault(key, threading.Lock())
+
+	def get(self, ticker: str, period: str = "5y", interval: str = "1d", refresh: bool = False) -> pd.DataFrame:
+		"""Bars for the period, fetching only what the store does not have yet.
+
+		`refresh` asks the source for bars since the last stored one even inside the refresh interval.
+		"""
+		ticker = ticker.strip().upper()
+		key = (ticker, interval)
+		start = period_start(period)
+		with self._lock(key):
+			data = self._memory.get(key)
+			if data is None:
+				data = self._read(ticker, interval)
+				self.stats["disk_reads"] += 1
+			else:
+				self.stats["memory_hits"] += 1
+			first_ts, checked_at = self._checked.get(key) or self._coverage(ticker, interval)
+			fetched = []
+
+			# History older than anything stored (everything, on first use)
+			if not checked_at or (first_ts and (start is None or pd.Timestamp(start) < pd.Timestamp(first_ts))):
+				end = data.index[0].date() if not data.empty else None
+				fetched.append(self._download(ticker, start, end, interval))
+				first_ts = str(start) if start else None
+				if data.empty:
+					checked_at = time.time()
+			# Bars since the last stored one; the last bar is fetched again in case it was still forming
+			if refresh or time.time() - checked_at > self.refresh_seconds:
+				since = data.index[-1].date() if not data.empty else start
+				fetched.append(self._download(ticker, since, None, interval))
+				checked_at = time.time()
+
+			new_rows = [f for f in fetched if not f.empty]
+			if fetched:
+				if new_rows:
+					data = pd.concat([data] + new_rows) if not data.empty else pd.concat(new_rows)
+					data = data[~data.index.duplicated(keep="last")].sort_index()
+				self._write(ticker, interval, pd.concat(new_rows) if new_rows else data.iloc[:0], first_ts, checked_at)
+			self._memory[key] = data
+			self._checked[key] = (first_ts, checked_at)
+
+		if start is not None:
+			data = data[data.index >= pd.Timestamp(start)]
+		return data
+
+	def _download(self, ticker: str, start: Optional[dt.date], end: Optional[dt.date], interval: str) -> pd.DataFrame:
+		data = self.source.download(ticker, start, end, interval)
+		self.stats["downloads"] += 1
+		self.stats["rows_downloaded"] += len(data)
+		return data
+
+	def _coverage(self, ticker: str, interval: str) -> Tuple[Optional[str], float]:
+		with self._connect() as conn:
+			row = conn.execute(
+				"SELECT first_ts, checked_at FROM coverage WHERE ticker = ? AND interval = ?", (ticker, interval)
+			).fetchone()
+		if not row:
+			return None, 0.0
+		# "max" means the full history is stored
+		return (None if row[0] == "max" else row[0]), row[1]
+
+	def _read(self, ticker: str, interval: str) -> pd.DataFrame:
+		with self._connect() as conn:
+			data = pd.read_sql_query(
+				"SELECT ts, open, high, low, close, adj_close, volume FROM bars WHERE ticker = ? AND interval = ? ORDER BY ts",
+				conn, params=(ticker, interval), index_col="ts", parse_dates=["ts"],
+			)
+		data.columns = COLUMNS
+		data.index.name = "Date"
+		return data
+
+	def _write(self, ticker: str, interval: str, data: pd.DataFrame, first_ts: Optional[str], checked_at: float) -> None:
+		rows = [
+			(ticker, interval, ts.isoformat(), *(None if pd.isna(v) else float(v) for v in values))
+			for ts, values in zip(data.index, data.reindex(columns=COLUMNS).itertuples(index=False, name=None))
+		]
+		with self._connect() as conn:
+			conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+			conn.execute(
+				"INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)", (ticker, interval, first_ts or "max", checked_at)
+			)
+
+
+_STORE: Optional[PriceStore] = None
+
+
+def get_price_store() -> PriceStore:
+	"""Process-wide store; STOCK_PRICE_FIXTURES=<dir> serves bars from CSV fixtures instead of Yahoo."""
+	global _STORE
+	if _STORE is None:
+		fixtures = os.getenv("STOCK_PRICE_FIXTURES")
+		_STORE = PriceStore(source=CsvSource(fixtures) if fixtures else None)
+	return _STORE
+
+
+def set_price_store(store: Optional[PriceStore]) -> None:
+	global _STORE
+	_STORE = store
@@ -2,21 +2,39 @@ import datetime as dt
 from typing import List, Optional
 
 import pandas as pd
-import yfinance as yf
 
+from .price_store import get_price_store
 
-def fetch_price_history(ticker: str, period: str = "5y", interval: str = "1d") -> pd.DataFrame:
-	"""Fetch historical OHLCV price data using yfinance.
 
+def fetch_price_history(ticker: str, period: str = "5y", interval: str = "1d", refresh: bool = False) -> pd.DataFrame:
+	"""Fetch historical OHLCV price data through the local price store.
+
+	Only bars missing from the store are downloaded (yfinance by default); `refresh` also fetches
+	the latest bars when the store checked recently.
 	Returns a DataFrame with columns: Open, High, Low, Close, Adj Close, Volume.
 	"""
-	data = yf.download(ticker, period=period, interval=interval, auto_adjust=False, progress=False)
-	if not isinstance(data, pd.DataFrame) or data.empty:
+	data = get_price_store().get(ticker, period=period, interval=interval, refresh=refresh)
+	if data.empty:
 		raise ValueError(f"No price data for {ticker}")
-	data.index = pd.to_datetime(data.index)
 	return data
 
 
+def summarize_prices(ticker: str, prices: pd.DataFrame) -> dict:
+	"""Compact description of a price history: range covered and where the last close sits."""
+	close = prices["Adj Close"].dropna() if "Adj Close" in prices else prices["Close"].dropna()
+	last_252 = close.tail(252)
+	return {
+		"ticker": ticker.strip().upper(),
+		"bars": int(len(close)),
+		"first_date": str(close.index[0].date()) if len(close) else None,
+		"last_date": str(close.index[-1].date()) if len(close) else None,
+		"last_close": round(float(close.iloc[-1]), 4) if len(close) else None,
+		"wk52_high": round(float(last_252.max()), 4) if len(last_252) else None,
+		"wk52_low": round(float(last_252.min()), 4) if len(last_252) else None,
+		"avg_volume_63d": float(prices["Volume"].tail(63).mean()) if "Volume" in prices else None,
+	}
+
+
 def compute_trend_metrics(prices: pd.DataFrame) -> dict:
 	"""Compute simple trend metrics for positional trading horizon (1-2 years)."""
 	close = prices["Adj Close"].dropna() if "Adj Close" in prices else prices["Close"].dropna()
@@ -42,14 +60,23 @@ def compute_trend_metrics(prices: pd.DataFrame) -> dict:
 	return result
 
 
-def simple_technical_flags(prices: pd.DataFrame) -> List[str]:
-	"""Return a list of simple bullish flags for positional uptrend bias."""
+FLAG_ABOVE_MA = "Price above 100/200 DMA"
+FLAG_MOMENTUM = "6-month positive momentum > 10%"
+FLAG_NEAR_HIGH = "Within 15% of 52-week high"
+
+
+def simple_technical_flags(prices: pd.DataFrame, metrics: Optional[dict] = None) -> List[str]:
+	"""Return a list of simple bullish flags for positional uptrend bias.
+
+	Pass `metrics` when compute_trend_metrics has already run to avoid computing them twice.
+	"""
 	flags: List[str] = []
-	metrics = compute_trend_metrics(prices)
+	if metrics is None:
+		metrics = compute_trend_metrics(prices)
 	if metrics.get("above_ma_200") and metrics.get("above_ma_100"):
-		flags.append("Price above 100/200 DMA")
+		flags.append(FLAG_ABOVE_MA)
 	if metrics.get("ret_126d_pct", 0) > 10:
-		flags.append("6-month positive momentum > 10%")
+		flags.append(FLAG_MOMENTUM)
 	if metrics.get("off_high_pct", 0) > -15:
-		flags.append("Within 15% of 52-week high")
+		flags.append(FLAG_NEAR_HIGH)
 	return flags
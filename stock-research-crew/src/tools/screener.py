@@ -0,0 +1,150 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .price_store import PriceStore, get_price_store
+from .prices import FLAG_ABOVE_MA, FLAG_MOMENTUM, FLAG_NEAR_HIGH
+
+
+DEFAULT_UNIVERSE_DIR = os.getenv("STOCK_UNIVERSE_DIR", "./data/universes")
+MA_WINDOWS = [50, 100, 200]
+RETURN_LOOKBACKS = [21, 63, 126, 252]
+
+
+def available_universes() -> List[str]:
+	"""Names of the universe files in STOCK_UNIVERSE_DIR."""
+	if not os.path.isdir(DEFAULT_UNIVERSE_DIR):
+		return []
+	return sorted({os.path.splitext(f)[0] for f in os.listdir(DEFAULT_UNIVERSE_DIR) if f.endswith((".csv", ".txt"))})
+
+
+def load_universe(name: str) -> List[str]:
+	"""Tickers of a named universe (<STOCK_UNIVERSE_DIR>/<name>.csv or .txt), a file path, or a comma-separated list.
+
+	A single name without a comma must be a universe file; a lone ticker is written with a trailing comma ("AAPL,").
+	"""
+	name = name.strip()
+	candidates = [name] + [os.path.join(DEFAULT_UNIVERSE_DIR, f"{name}{ext}") for ext in (".csv", ".txt")]
+	path = next((p for p in candidates if os.path.isfile(p)), None)
+	if path is None:
+		if "," not in name:
+			known = ", ".join(available_universes()) or "none"
+			raise ValueError(
+				f"Unknown universe '{name}': no {name}.csv or {name}.txt in {DEFAULT_UNIVERSE_DIR} (available: {known}). "
+				"Add the file, or pass comma-separated tickers (a single ticker as 'AAPL,')."
+			)
+		return [t.strip().upper() for t in name.split(",") if t.strip()]
+	tickers = []
+	with open(path, "r", encoding="utf-8") as f:
+		for line in f:
+			first = line.split(",")[0].strip().upper()
+			if first and first not in ("TICKER", "SYMBOL"):
+				tickers.append(first)
+	return tickers
+
+
+def load_panel(tickers: List[str], period: str = "2y", store: Optional[PriceStore] = None, workers: int = 8) -> pd.DataFrame:
+	"""Wide panel of adjusted closes: one row per date, one column per ticker. Tickers without data are left out."""
+	store = store or get_price_store()
+
+	def load(ticker: str) -> Optional[pd.Series]:
+		try:
+			data = store.get(ticker, period=period)
+		except Exception:
+			return None
+		if data.empty:
+			return None
+		close = data["Adj Close"] if "Adj Close" in data else data["Close"]
+		return close.rename(ticker.strip().upper())
+
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+		series = [s for s in pool.map(load, tickers) if s is not None]
+	if not series:
+		return pd.DataFrame()
+	return pd.concat(series, axis=1).sort_index()
+
+
+def _bottom_align(values: np.ndarray) -> np.ndarray:
+	"""Move each column's NaNs to the top so its valid closes end at the last row, in order.
+
+	Tickers from different exchanges have gaps on each other's holidays; after this the last w rows
+	of a column are its last w valid closes, which is what the single-ticker metrics use.
+	"""
+	order = np.argsort(~np.isnan(values), axis=0, kind="stable")
+	return np.take_along_axis(values, order, axis=0)
+
+
+def screen_panel(panel: pd.DataFrame) -> pd.DataFrame:
+	"""Trend metrics and flags for every ticker of a panel in one vectorized pass.
+
+	Columns match compute_trend_metrics and simple_technical_flags, plus flag_count and score.
+	"""
+	values = _bottom_align(panel.to_numpy(dtype=float))
+	counts = (~np.isnan(values)).sum(axis=0)
+	last = values[-1]
+	out: Dict[str, np.ndarray] = {"bars": counts}
+
+	with np.errstate(invalid="ignore", divide="ignore"):
+		for window in MA_WINDOWS:
+			ma = values[-window:].mean(axis=0) if len(values) >= window else np.full(len(last), np.nan)
+			ma = np.where(counts >= window, ma, np.nan)
+			out[f"ma_{window}"] = ma
+			out[f"above_ma_{window}"] = last > ma
+
+		year = values[-252:]
+		out["wk52_high"] = np.nanmax(year, axis=0)
+		out["wk52_low"] = np.nanmin(year, axis=0)
+		out["off_high_pct"] = (last / out["wk52_high"] - 1) * 100
+		out["from_low_pct"] = (last / out["wk52_low"] - 1) * 100
+
+		for lookback in RETURN_LOOKBACKS:
+			if len(values) > lookback:
+				ret = (last / values[-lookback - 1] - 1) * 100
+				out[f"ret_{lookback}d_pct"] = np.where(counts >= lookback + 1, ret, np.nan)
+			else:
+				out[f"ret_{lookback}d_pct"] = np.full(len(last), np.nan)
+
+	result = pd.DataFrame(out, index=panel.columns)
+	flags = pd.DataFrame({
+		FLAG_ABOVE_MA: result["above_ma_200"] & result["above_ma_100"],
+		FLAG_MOMENTUM: result["ret_126d_pct"] > 10,
+		FLAG_NEAR_HIGH: result["off_high_pct"] > -15,
+	})
+	result["flag_count"] = flags.sum(axis=1)
+	result["flags"] = [list(flags.columns[row]) for row in flags.to_numpy()]
+	# Ties on flags are broken by momentum: average percentile of 6- and 12-month returns
+	momentum = result[["ret_126d_pct", "ret_252d_pct"]].rank(pct=True).mean(axis=1).fillna(0)
+	result["score"] = (result["flag_count"] + momentum).round(4)
+	return result.sort_values(["score", "ret_126d_pct"], ascending=False)
+
+
+def screen_universe(
+	tickers: List[str],
+	top_n: int = 12,
+	min_flags: int = 2,
+	period: str = "2y",
+	store: Optional[PriceStore] = None,
+) -> List[Dict]:
+	"""Ranked candidates from a ticker universe: those with at least `min_flags` bullish flags, best first."""
+	panel = load_panel(tickers, period=period, store=store)
+	if panel.empty:
+		return []
+	ranked = screen_panel(panel)
+	ranked = ranked[ranked["flag_count"] >= min_flags].head(top_n)
+	rows = []
+	for ticker, row in ranked.iterrows():
+		item = {"ticker": ticker}
+		for key, value in row.items():
+			if isinstance(value, (np.floating, float)):
+				item[key] = None if np.isnan(value) else round(float(value), 4)
+			elif isinstance(value, (np.bool_, bool)):
+				item[key] = bool(value)
+			elif isinstance(value, np.integer):
+				item[key] = int(value)
+			else:
+				item[key] = value
+		rows.append(item)
+	return rows
@@ -1,27 +1,216 @@
-from typing import List, Dict
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Optional
+
 from duckduckgo_search import DDGS
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .price_store import DEFAULT_DATA_DIR
+
+try:
+	import lxml.html
+	HAS_LXML = True
+except Exception:
+	HAS_LXML = False
+
+
+USER_AGENT = "Mozilla/5.0 (compatible; stock-research-crew/1.0)"
+MAX_PAGE_BYTES = int(os.getenv("STOCK_FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+# Pages younger than this are served from the cache without asking the server
+PAGE_FRESH_SECONDS = float(os.getenv("STOCK_PAGE_FRESH_MINUTES", "60")) * 60
+SEARCH_TTL_SECONDS = float(os.getenv("STOCK_SEARCH_TTL_MINUTES", "15")) * 60
+SEARCH_CACHE_SIZE = int(os.getenv("STOCK_SEARCH_CACHE_SIZE", "256"))
+FETCH_WORKERS = int(os.getenv("STOCK_FETCH_WORKERS", "8"))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# DDGS keeps per-client state, so each thread gets its own instead of queueing on a shared one
+_ddgs_local = threading.local()
+_search_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_search_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+	"""Shared HTTP session: one connection pool for all page fetches, with retries on transient errors."""
+	global _session
+	with _session_lock:
+		if _session is None:
+			session = requests.Session()
+			retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+			adapter = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS * 2, max_retries=retry)
+			session.mount("http://", adapter)
+			session.mount("https://", adapter)
+			session.headers["User-Agent"] = USER_AGENT
+			_session = session
+	return _session
+
 
+def _get_ddgs() -> DDGS:
+	ddgs = getattr(_ddgs_local, "client", None)
+	if ddgs is None:
+		ddgs = _ddgs_local.client = DDGS()
+	return ddgs
 
-def web_search(query: str, max_results: int = 10) -> List[Dict[str, str]]:
-	"""Cheap meta-search via DuckDuckGo. Returns list of {title, href, body}."""
-	with DDGS() as ddgs:
-		results = ddgs.text(query, max_results=max_results)
-	return [
+
+def web_search(query: str, max_results: int = 10, refresh: bool = False) -> List[Dict[str, str]]:
+	"""Cheap meta-search via DuckDuckGo. Returns list of {title, href, body}.
+
+	Results are kept for SEARCH_TTL_SECONDS in an LRU of at most SEARCH_CACHE_SIZE queries;
+	`refresh` skips the cached result and stores the new one.
+	"""
+	key = (query.strip().lower(), max_results)
+	now = time.time()
+	with _search_lock:
+		cached = _search_cache.get(key)
+		if cached and not refresh and now - cached[0] < SEARCH_TTL_SECONDS:
+			_search_cache.move_to_end(key)
+			return cached[1]
+	# The lock is not held during the request, so searches from different threads run in parallel
+	results = _get_ddgs().text(query, max_results=max_results) or []
+	out = [
 		{"title": r.get("title", ""), "href": r.get("href", ""), "body": r.get("body", "")}
 		for r in results
 	]
+	with _search_lock:
+		_search_cache[key] = (time.time(), out)
+		_search_cache.move_to_end(key)
+		expired = [k for k, (at, _) in _search_cache.items() if now - at >= SEARCH_TTL_SECONDS]
+		for k in expired:
+			del _search_cache[k]
+		while len(_search_cache) > SEARCH_CACHE_SIZE:
+			_search_cache.popitem(last=False)
+	return out
 
 
-def fetch_page_summary(url: str, max_chars: int = 800) -> str:
-	"""Fetch page and return a short text summary (first paragraphs)."""
+def extract_text(html: bytes) -> str:
+	"""Paragraph text of an HTML page; lxml when available, else BeautifulSoup's html.parser."""
+	if HAS_LXML:
+		try:
+			doc = lxml.html.fromstring(html)
+			paras = (" ".join(p.text_content().split()) for p in doc.iter("p"))
+			return " ".join(p for p in paras if p)
+		except Exception:
+			pass
+	from bs4 import BeautifulSoup
+	soup = BeautifulSoup(html, "html.parser")
+	return " ".join(p.get_text(" ", strip=True) for p in soup.find_all("p"))
+
+
+class PageCache:
+	"""Extracted page text keyed by URL, with the validators needed to revalidate it (SQLite)."""
+
+	def __init__(self, data_dir: str = DEFAULT_DATA_DIR):
+		os.makedirs(data_dir, exist_ok=True)
+		self.path = os.path.join(data_dir, "pages.db")
+		self._lock = threading.Lock()
+		with self._connect() as conn:
+			conn.execute(
+				"CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, text TEXT, etag TEXT, last_modified TEXT, fetched_at REAL)"
+			)
+
+	def _connect(self) -> sqlite3.Connection:
+		return sqlite3.connect(self.path, timeout=30)
+
+	def get(self, url: str) -> Optional[Dict[str, Any]]:
+		with self._lock, self._connect() as conn:
+			row = conn.execute("SELECT text, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+		if not row:
+			return None
+		return {"text": row[0], "etag": row[1], "last_modified": row[2], "fetched_at": row[3]}
+
+	def put(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+		with self._lock, self._connect() as conn:
+			conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", (url, text, etag, last_modified, time.time()))
+
+	def touch(self, url: str) -> None:
+		with self._lock, self._connect() as conn:
+			conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+
+_page_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> PageCache:
+	global _page_cache
+	with _session_lock:
+		if _page_cache is None:
+			_page_cache = PageCache()
+	return _page_cache
+
+
+def fetch_page(url: str, timeout: float = 10, max_bytes: int = MAX_PAGE_BYTES, refresh: bool = False) -> Dict[str, Any]:
+	"""Fetch a page's paragraph text through the cache.
+
+	Returns {url, text, status, cached}; status is "fresh", "revalidated", "fetched" or an error.
+	Bodies larger than `max_bytes` and non-HTML responses are not parsed. `refresh` always asks
+	the server, revalidating a cached copy instead of serving it while it is fresh.
+	"""
+	cache = get_page_cache()
+	entry = cache.get(url)
+	if entry and not refresh and time.time() - entry["fetched_at"] < PAGE_FRESH_SECONDS:
+		return {"url": url, "text": entry["text"], "status": "fresh", "cached": True}
+
+	headers = {}
+	if entry and entry["etag"]:
+		headers["If-None-Match"] = entry["etag"]
+	if entry and entry["last_modified"]:
+		headers["If-Modified-Since"] = entry["last_modified"]
 	try:
-		resp = requests.get(url, timeout=10)
-		resp.raise_for_status()
-		soup = BeautifulSoup(resp.text, "html.parser")
-		paras = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
-		text = " ".join(paras)
-		return text[:max_chars]
-	except Exception:
-		return ""
+		with get_session().get(url, headers=headers, timeout=timeout, stream=True) as resp:
+			if resp.status_code == 304 and entry:
+				cache.touch(url)
+				return {"url": url, "text": entry["text"], "status": "revalidated", "cached": True}
+			resp.raise_for_status()
+			ctype = resp.headers.get("Content-Type", "").lower()
+			if ctype and "html" not in ctype and "text" not in ctype:
+				return {"url": url, "text": "", "status": f"skipped: {ctype}", "cached": False}
+			length = int(resp.headers.get("Content-Length") or 0)
+			if length > max_bytes:
+				return {"url": url, "text": "", "status": f"skipped: {length} bytes", "cached": False}
+			body = bytearray()
+			for block in resp.iter_content(64 * 1024):
+				body.extend(block)
+				if len(body) > max_bytes:
+					# Keep what fits; the opening paragraphs are the useful part anyway
+					del body[max_bytes:]
+					break
+			text = extract_text(bytes(body))
+			cache.put(url, text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+			return {"url": url, "text": text, "status": "fetched", "cached": False}
+	except Exception as e:
+		if entry:
+			return {"url": url, "text": entry["text"], "status": f"stale: {e}", "cached": True}
+		return {"url": url, "text": "", "status": f"error: {e}", "cached": False}
+
+
+def fetch_many(urls: List[str], max_chars: int = 800, workers: int = FETCH_WORKERS) -> List[Dict[str, Any]]:
+	"""Fetch several pages concurrently over the shared pool; results keep the order of `urls`."""
+	unique = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+	with ThreadPoolExecutor(max_workers=max(1, min(workers, len(unique) or 1))) as pool:
+		pages = list(pool.map(fetch_page, unique))
+	for page in pages:
+		page["text"] = page["text"][:max_chars]
+	return pages
+
+
+def fetch_page_summary(url: str, max_chars: int = 800, refresh: bool = False) -> str:
+	"""Fetch page and return a short text summary (first paragraphs)."""
+	return fetch_page(url, refresh=refresh)["text"][:max_chars]
+
+
+def parse_url_list(urls: str) -> List[str]:
+	"""URLs from a JSON list or a comma/whitespace separated string, as agents pass them either way."""
+	urls = (urls or "").strip()
+	if urls.startswith("["):
+		try:
+			return [str(u) for u in json.loads(urls)]
+		except ValueError:
+			pass
+	return [u for u in urls.replace(",", " ").split() if u]
@@ -1,16 +1,19 @@
 import json
-import pandas as pd
 from crewai.tools import tool
 
 from .prices import (
 	fetch_price_history as _fetch_price_history,
+	summarize_prices as _summarize_prices,
 	compute_trend_metrics as _compute_trend_metrics,
 	simple_technical_flags as _simple_technical_flags,
 )
 from .fundamentals import fetch_fundamentals as _fetch_fundamentals
+from .screener import load_universe as _load_universe, screen_universe as _screen_universe
 from .search import (
 	web_search as _web_search,
 	fetch_page_summary as _fetch_page_summary,
+	fetch_many as _fetch_many,
+	parse_url_list as _parse_url_list,
 )
 
 
@@ -28,29 +31,51 @@ def FETCH_PAGE_SUMMARY(url: str) -> str:
 	return text
 
 
+@tool("fetch_many")
+def FETCH_MANY(urls: str) -> str:
+	"""Fetch and summarize several webpages at once. Pass a JSON list or comma-separated URLs;
+	returns JSON list of {url, text, status} with a short text snippet per page."""
+	pages = _fetch_many(_parse_url_list(urls), max_chars=800)
+	return json.dumps([{"url": p["url"], "text": p["text"], "status": p["status"]} for p in pages])
+
+
 @tool("fetch_price_history")
 def FETCH_PRICE_HISTORY(ticker: str) -> str:
-	"""Download historical OHLCV price data for a ticker via yfinance; returns JSON DataFrame tail."""
-	df = _fetch_price_history(ticker, period="5y", interval="1d").tail(500)
-	return df.to_json()
+	"""Load 5y of daily prices for a ticker into the shared price cache; returns a short JSON summary
+	(bars, date range, last close, 52-week range). Follow up with compute_trend_metrics(ticker) or
+	simple_technical_flags(ticker); there is no need to pass price data around."""
+	df = _fetch_price_history(ticker, period="5y", interval="1d")
+	return json.dumps(_summarize_prices(ticker, df))
 
 
 @tool("compute_trend_metrics")
-def COMPUTE_TREND_METRICS(prices_json: str) -> str:
-	"""Compute trend metrics from a price history DataFrame JSON; returns JSON dict."""
-	df = pd.read_json(prices_json)
+def COMPUTE_TREND_METRICS(ticker: str) -> str:
+	"""Compute trend metrics (moving averages, 52-week range, momentum) for a ticker; returns JSON dict."""
+	df = _fetch_price_history(ticker, period="5y", interval="1d")
 	metrics = _compute_trend_metrics(df)
-	return json.dumps(metrics)
+	return json.dumps({"ticker": ticker.strip().upper(), **metrics})
 
 
 @tool("simple_technical_flags")
-def SIMPLE_TECH_FLAGS(prices_json: str) -> str:
-	"""Return simple bullish flags from a price history DataFrame JSON; returns JSON list."""
-	df = pd.read_json(prices_json)
+def SIMPLE_TECH_FLAGS(ticker: str) -> str:
+	"""Return simple bullish flags for a ticker's price trend; returns JSON list."""
+	df = _fetch_price_history(ticker, period="5y", interval="1d")
 	flags = _simple_technical_flags(df)
 	return json.dumps(flags)
 
 
+@tool("screen_universe")
+def SCREEN_UNIVERSE(universe: str) -> str:
+	"""Rank a universe of tickers by trend and momentum in one pass. Accepts the name of a universe
+	file in data/universes or a comma-separated ticker list; returns JSON list of the top candidates
+	with their metrics and flags, or {"error": ...} for an unknown universe name."""
+	try:
+		tickers = _load_universe(universe)
+	except ValueError as e:
+		return json.dumps({"error": str(e)})
+	return json.dumps(_screen_universe(tickers, top_n=12))
+
+
 @tool("fetch_fundamentals")
 def FETCH_FUNDAMENTALS(ticker: str) -> str:
 	"""Fetch a subset of fundamentals for a ticker via yfinance; returns JSON dict."""